@@ -0,0 +1 @@
+from benchmarks.synthetic_data import generate_sheet_values
\ No newline at end of file
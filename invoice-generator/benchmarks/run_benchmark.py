@@ -0,0 +1,330 @@
+"""
+End-to-end benchmark of the invoice pipeline on synthetic sheet data, with local stand-ins for Google Sheets and
+Google Drive.
+
+The real pipeline (generate_invoices_for_months, or the asynchronous pipeline with --async-pipeline) runs with its
+stage spans recorded (see tracing), and the time of every stage is written as JSON, so runs can be compared across
+commits. Run it from the invoice-generator directory (the Jasper template is read from resources/):
+
+    python -m benchmarks.run_benchmark --lenders 200 --rows-per-invoice 30 --output before.json
+    python -m benchmarks.run_benchmark --lenders 200 --rows-per-invoice 30 --compare before.json
+
+Rendering needs a JVM and is only benchmarked with --render; without it every invoice gets a placeholder PDF, so
+the uploads are the same either way.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager, nullcontext, redirect_stdout
+from datetime import datetime
+from unittest import mock
+
+import builder.drive_uploader as drive_uploader
+import builder.invoice_fingerprint as invoice_fingerprint
+import builder.invoice_ledger as invoice_ledger
+import builder.report_builder as report_builder
+import data.google_ds_reader as google_ds_reader
+import pipeline.async_pipeline as async_pipeline
+from benchmarks.synthetic_data import generate_sheet_values, get_months
+from builder.drive_uploader import DriveUploader
+from builder.einvoice_export import DEFAULT_EINVOICE_FORMAT, EINVOICE_FORMATS
+from builder.report_builder import get_report_output_path
+from pipeline.async_pipeline import generate_invoices_for_months_async
+from pipeline.invoice_pipeline import generate_invoices_for_months
+from tracing import disable_tracing, enable_tracing, increment, span
+
+# Stages that only do work when the PDFs are rendered with Jasper
+RENDER_STAGES = ('compile_template', 'render', 'render_wait', 'fill', 'combined_export', 'split')
+INVOICE_DATE = "28-10-2025"
+# Minimal PDF, uploaded in place of a rendered invoice without --render
+PLACEHOLDER_PDF = (b"%PDF-1.4\n1 0 obj<</Type/Catalog/Pages 2 0 R>>endobj\n"
+                   b"2 0 obj<</Type/Pages/Kids[]/Count 0>>endobj\n"
+                   b"trailer<</Root 1 0 R>>\n%%EOF\n")
+
+
+class LocalSheetsStandIn:
+    """Serves the synthetic values in place of get_data_from_google_sheet_ranges, after an optional delay."""
+
+    def __init__(self, sheet_values, latency_seconds=0.0):
+        self.sheet_values = sheet_values
+        self.latency_seconds = latency_seconds
+
+    def get_data_from_google_sheet_ranges(self, data_ranges, offline=False):
+        time.sleep(self.latency_seconds)
+        return {data_range: {'range': data_range, 'values': self.sheet_values[data_range]}
+                for data_range in data_ranges}
+
+
+class LocalDriveStandIn:
+    """Copies uploaded files into a local folder per lender in place of Drive, after an optional delay per file."""
+
+    def __init__(self, target_dir, latency_seconds=0.0):
+        self.target_dir = target_dir
+        self.latency_seconds = latency_seconds
+
+    def upload(self, file_path, target_folder_name, content_hash=None):
+        # Recorded as DriveUploader.upload records it, which this replaces
+        with span('upload', lender=target_folder_name):
+            time.sleep(self.latency_seconds)
+            folder_path = os.path.join(self.target_dir, target_folder_name)
+            os.makedirs(folder_path, exist_ok=True)
+            shutil.copy(file_path, folder_path)
+        increment('uploads_created')
+        return {'file_path': file_path, 'folder_name': target_folder_name, 'file_id': file_path,
+                'status': 'created', 'error': None}
+
+
+@contextmanager
+def stand_in_services(sheets, drive):
+    """
+    Routes the sheet reads and Drive uploads of the pipeline to the given stand-ins.
+    """
+    def upload(uploader, file_path, target_folder_name, content_hash=None):
+        return drive.upload(file_path, target_folder_name, content_hash)
+
+    with mock.patch.object(google_ds_reader, 'get_data_from_google_sheet_ranges',
+                           sheets.get_data_from_google_sheet_ranges), \
+            mock.patch.object(drive_uploader, 'upload_file_to_drive', drive.upload), \
+            mock.patch.object(DriveUploader, 'upload', upload):
+        yield
+
+
+def write_placeholder_pdf(invoice, output_dir):
+    """
+    Stands in for render_invoice without a JVM: writes a small placeholder PDF where Jasper would write the invoice,
+    so every invoice still has a file to upload.
+    """
+    pdf_path = f"{get_report_output_path(invoice['report_name'], output_dir)}.pdf"
+    with open(pdf_path, "wb") as f:
+        f.write(PLACEHOLDER_PDF)
+    return {"report_name": invoice["report_name"], "application_name": invoice["application_name"],
+            "pdf_path": pdf_path, "content_hash": invoice["content_hash"]}
+
+
+@contextmanager
+def stand_in_renderer():
+    """
+    Replaces the Jasper rendering of both pipelines with write_placeholder_pdf, and the template compilation and
+    warm-up with no-ops.
+    """
+    with mock.patch.object(report_builder, 'render_invoice', write_placeholder_pdf), \
+            mock.patch.object(async_pipeline, 'render_invoice', write_placeholder_pdf), \
+            mock.patch.object(report_builder, 'compile_template', lambda template_path: None), \
+            mock.patch.object(async_pipeline, '_load_report_template', lambda: None):
+        yield
+
+
+@contextmanager
+def local_run_files(work_dir):
+    """
+    Keeps the files a run leaves behind (rendered PDFs, fingerprints, invoice ledger) under work_dir instead of the
+    current directory and the system temporary directory, so every run starts from an empty state.
+    """
+    def get_run_output_dir():
+        return tempfile.mkdtemp(prefix='invoices_', dir=work_dir)
+
+    # Both names are joined to the current directory, which an absolute path replaces
+    with mock.patch.object(invoice_fingerprint, 'FINGERPRINT_DIR_NAME', os.path.join(work_dir, 'fingerprints')), \
+            mock.patch.object(invoice_ledger, 'LEDGER_FILE_NAME', os.path.join(work_dir, 'ledger.sqlite')), \
+            mock.patch.object(report_builder, 'get_run_output_dir', get_run_output_dir), \
+            mock.patch.object(async_pipeline, 'get_run_output_dir', get_run_output_dir):
+        yield
+
+
+def run_pipeline_once(work_dir, months, upload_workers, render, async_pipeline_run=False,
+                      einvoice_format=DEFAULT_EINVOICE_FORMAT, combined_pdf=False):
+    """
+    Generates every month of the synthetic sheet once with generate_invoices_for_months (or
+    generate_invoices_for_months_async), recording the stage spans of the run.
+
+    Returns:
+    - dict: The trace of the run, see Tracer.get_trace.
+    """
+    options = {'upload_workers': upload_workers, 'einvoice_format': einvoice_format,
+               'einvoice_dir': os.path.join(work_dir, 'einvoices')}
+    with local_run_files(work_dir), stand_in_renderer() if not render else nullcontext():
+        enable_tracing()
+        try:
+            if async_pipeline_run:
+                generate_invoices_for_months_async(months, INVOICE_DATE, **options)
+            else:
+                generate_invoices_for_months(months, INVOICE_DATE, combined_pdf=combined_pdf,
+                                             combined_pdf_dir=work_dir, **options)
+        finally:
+            tracer = disable_tracing()
+    return tracer.get_trace()
+
+
+def _get_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(lenders=50, apis=20, rows_per_invoice=10, months=3, repeat=3, upload_workers=4, render=False,
+                  fetch_latency_ms=0.0, upload_latency_ms=0.0, seed=0, einvoice_format=DEFAULT_EINVOICE_FORMAT,
+                  combined_pdf=False, async_pipeline_run=False):
+    """
+    Runs the pipeline repeat times on the same synthetic sheet and reports the time of every stage.
+
+    The stage times are the spans the pipeline records itself (see tracing), summed per span name, so nested stages
+    such as 'fetch' within 'fetch_and_warm_up' are each reported in full. Every invoice is uploaded as one file,
+    whatever the e-invoice format, so the upload stage does the same work on every commit.
+
+    Parameters:
+    - lenders, apis, rows_per_invoice, months, seed: Size and seed of the synthetic sheet, see generate_sheet_values.
+    - repeat (int): Number of runs; every stage reports its best and mean time.
+    - upload_workers (int): Maximum number of concurrent uploads to the Drive stand-in.
+    - render (bool): If True, render the PDFs with Jasper (needs a JVM), otherwise placeholder PDFs are written and
+                     the rendering stages are reported as None.
+    - fetch_latency_ms (float): Simulated duration of the sheet read.
+    - upload_latency_ms (float): Simulated duration of every upload.
+    - einvoice_format (str): How the NIC payloads are written, see builder.einvoice_export.
+    - combined_pdf (bool): If True, render every month's PDFs with a single export, see render_invoice_batch.
+    - async_pipeline_run (bool): If True, run the asynchronous pipeline, see pipeline.async_pipeline.
+
+    Returns:
+    - dict: The benchmark result: 'commit', 'timestamp', 'python', 'parameters', 'dataset' (sizes), 'stages' (best and
+            mean seconds, item count and best milliseconds per item of every stage), 'counters' and 'total_seconds'.
+
+    Raises:
+    - ValueError: If combined_pdf is given without render, or with async_pipeline_run.
+    """
+    if combined_pdf and (not render or async_pipeline_run):
+        raise ValueError("A combined PDF is only benchmarked with --render, in the synchronous pipeline")
+    sheet_values = generate_sheet_values(lender_count=lenders, api_count=apis, rows_per_invoice=rows_per_invoice,
+                                         month_count=months, seed=seed)
+    month_names = get_months(months)
+    runs = []
+    for _ in range(repeat):
+        work_dir = tempfile.mkdtemp(prefix='invoice-benchmark-')
+        try:
+            # The pipeline prints as it goes, keep that cost but out of the JSON written to standard output
+            with stand_in_services(LocalSheetsStandIn(sheet_values, fetch_latency_ms / 1000),
+                                   LocalDriveStandIn(os.path.join(work_dir, 'drive'), upload_latency_ms / 1000)), \
+                    open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+                start = time.perf_counter()
+                trace = run_pipeline_once(work_dir, month_names, upload_workers, render, async_pipeline_run,
+                                          einvoice_format, combined_pdf)
+                total_seconds = time.perf_counter() - start
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        runs.append((trace, total_seconds))
+
+    stages = {}
+    for stage in dict.fromkeys(stage for trace, _ in runs for stage in trace['stages']):
+        if stage in RENDER_STAGES and not render:
+            stages[stage] = None
+            continue
+        stage_seconds = [trace['stages'].get(stage, {}).get('seconds', 0.0) for trace, _ in runs]
+        items = runs[0][0]['stages'].get(stage, {}).get('count', 0)
+        stages[stage] = {
+            'best_seconds': round(min(stage_seconds), 6),
+            'mean_seconds': round(statistics.mean(stage_seconds), 6),
+            'items': items,
+            'best_ms_per_item': round(min(stage_seconds) * 1000 / items, 6) if items else None,
+        }
+    counters = runs[0][0]['counters']
+    return {
+        'commit': _get_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'parameters': {'lenders': lenders, 'apis': apis, 'rows_per_invoice': rows_per_invoice, 'months': months,
+                       'repeat': repeat, 'upload_workers': upload_workers, 'render': render,
+                       'fetch_latency_ms': fetch_latency_ms, 'upload_latency_ms': upload_latency_ms, 'seed': seed,
+                       'einvoice_format': einvoice_format, 'combined_pdf': combined_pdf,
+                       'async_pipeline': async_pipeline_run},
+        'dataset': {'months': len(month_names), 'invoices': counters.get('invoices_built', 0),
+                    'billing_rows': len(sheet_values[google_ds_reader.SP_INVOICES_RANGE]) - 1,
+                    'custom_rows': len(sheet_values[google_ds_reader.TEAL_AND_MP_BHULEKH_RANGE]) - 1},
+        'stages': stages,
+        'counters': counters,
+        'total_seconds': {'best': round(min(total for _, total in runs), 6),
+                          'mean': round(statistics.mean(total for _, total in runs), 6)},
+    }
+
+
+def compare_results(result, baseline, tolerance):
+    """
+    Compares the best stage times of a result with a baseline result, for the stages both have timed.
+
+    Returns:
+    - list: The (stage, baseline seconds, seconds, ratio) of every stage slower than baseline * (1 + tolerance).
+    """
+    regressions = []
+    for stage, current in result['stages'].items():
+        previous = baseline['stages'].get(stage)
+        if not current or not previous or not previous['best_seconds']:
+            continue
+        ratio = current['best_seconds'] / previous['best_seconds']
+        print(f"{stage:<24} {previous['best_seconds']:>10.4f}s -> {current['best_seconds']:>10.4f}s  x{ratio:.2f}")
+        if ratio > 1 + tolerance:
+            regressions.append((stage, previous['best_seconds'], current['best_seconds'], ratio))
+    return regressions
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(prog='benchmark', description="Benchmark the invoice pipeline on synthetic data.")
+    parser.add_argument('--lenders', type=int, default=50, help="Number of lenders (default: 50)")
+    parser.add_argument('--apis', type=int, default=20, help="Number of SP APIs in the rate card (default: 20)")
+    parser.add_argument('--rows-per-invoice', type=int, default=10,
+                        help="Billing rows per lender and month (default: 10)")
+    parser.add_argument('--months', type=int, default=3, help="Months of billing history (default: 3)")
+    parser.add_argument('--repeat', type=int, default=3, help="Number of runs (default: 3)")
+    parser.add_argument('--upload-workers', type=int, default=4, help="Concurrent uploads (default: 4)")
+    parser.add_argument('--render', action='store_true', help="Also render the PDFs with Jasper (needs a JVM)")
+    parser.add_argument('--fetch-latency-ms', type=float, default=0.0, help="Simulated sheet read time")
+    parser.add_argument('--upload-latency-ms', type=float, default=0.0, help="Simulated time of every upload")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the synthetic data (default: 0)")
+    parser.add_argument('--einvoice-format', choices=EINVOICE_FORMATS, default=DEFAULT_EINVOICE_FORMAT,
+                        help=f"How the NIC payloads are written (default: {DEFAULT_EINVOICE_FORMAT})")
+    parser.add_argument('--combined-pdf', action='store_true',
+                        help="With --render, export every month's PDFs together and split them")
+    parser.add_argument('--async-pipeline', action='store_true',
+                        help="Run the asynchronous pipeline instead of generate_invoices_for_months")
+    parser.add_argument('--output', help="Write the JSON result to this file instead of standard output")
+    parser.add_argument('--compare', help="JSON result of an earlier run to compare the stage times with")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="Slowdown over --compare that counts as a regression (default: 0.2 = 20%%)")
+    return parser
+
+
+def main(argv=None):
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    if args.combined_pdf and (not args.render or args.async_pipeline):
+        parser.error("--combined-pdf needs --render and cannot be used with --async-pipeline")
+    result = run_benchmark(lenders=args.lenders, apis=args.apis, rows_per_invoice=args.rows_per_invoice,
+                           months=args.months, repeat=args.repeat, upload_workers=args.upload_workers,
+                           render=args.render, fetch_latency_ms=args.fetch_latency_ms,
+                           upload_latency_ms=args.upload_latency_ms, seed=args.seed,
+                           einvoice_format=args.einvoice_format, combined_pdf=args.combined_pdf,
+                           async_pipeline_run=args.async_pipeline)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    else:
+        print(json.dumps(result, indent=2))
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_results(result, baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} stages slower than the baseline by more than {args.tolerance:.0%}: "
+                  f"{', '.join(stage for stage, *_ in regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""
+Synthetic spreadsheet values for the benchmarks, in the shape the Sheets API returns for each tab.
+"""
+import random
+from datetime import date
+
+from data.google_ds_reader import API_DETAILS_RANGE, LENDERS_RANGE, PAYMENT_DETAILS_RANGE, RATE_CARD_RANGE, \
+    SP_INVOICES_RANGE, TEAL_AND_MP_BHULEKH_RANGE
+from data.records import ApiDetail, BillingRow, CustomBillingRow, Lender, PaymentDetail, RateCardEntry
+
+STATES = ['Karnataka', 'Maharashtra', 'Tamil Nadu', 'Gujarat', 'Delhi', 'Kerala']
+PROVIDERS = ['PROTEAN', 'SATSURE', 'NSDL', 'KARZA', 'SIGNZY']
+SLAB_PRICES = ['4.5', '3.25', '2.5', '1.75', '1.2']
+FLAT_PRICES = ['1.5', '2', '3.333', '12', '0.75']
+CUSTOM_UNIT_COSTS = ['12.5', '8', '5.25']
+
+
+def _header(record_type):
+    return [header for header, _ in record_type.COLUMNS]
+
+
+def get_months(month_count, last_month=date(2025, 10, 1)):
+    """
+    Returns the month_count months up to last_month, oldest first, formatted as 'Month-Year'.
+    """
+    months = []
+    year, month = last_month.year, last_month.month
+    for _ in range(month_count):
+        months.append(date(year, month, 1).strftime("%B-%Y"))
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    return months[::-1]
+
+
+def generate_sheet_values(lender_count=50, api_count=20, rows_per_invoice=10, month_count=3,
+                          custom_lender_share=0.2, seed=0):
+    """
+    Generates the values of every tab read by get_all_sheet_data.
+
+    Every lender gets one invoice per month with rows_per_invoice billing rows spread over the APIs (think per-day
+    line items when rows_per_invoice is large). A share of the lenders also gets Teal and MP Bhulekh rows, some of
+    them billed by amount. Half of the APIs are priced by slabs, the other half with a flat price.
+
+    Parameters:
+    - lender_count (int): Number of lenders.
+    - api_count (int): Number of SP APIs in the rate card.
+    - rows_per_invoice (int): Billing rows per lender and month.
+    - month_count (int): Number of months of billing history, ending with October 2025.
+    - custom_lender_share (float): Share of the lenders with Teal and MP Bhulekh rows.
+    - seed (int): Seed of the random generator, the same arguments always give the same values.
+
+    Returns:
+    - dict: The values (list of rows, header first) keyed by sheet range, as in the 'values' of a batchGet response.
+    """
+    rng = random.Random(seed)
+    months = get_months(month_count)
+
+    lenders = [_header(Lender)]
+    for lender_id in range(1, lender_count + 1):
+        state = STATES[lender_id % len(STATES)]
+        lenders.append([str(lender_id), f"Bank {lender_id}", f"Bank {lender_id} Limited", f"PAN{lender_id:06d}",
+                        f"29GST{lender_id:06d}", f"{lender_id} Main Road", "Central", "City", "560001", state,
+                        "India", "29", f"BANK{lender_id}"])
+
+    api_details = [_header(ApiDetail)]
+    rate_card = [_header(RateCardEntry)]
+    apis = []
+    for api_number in range(api_count):
+        provider = PROVIDERS[api_number % len(PROVIDERS)]
+        lender_api_name, sp_api_name = f"API{api_number}", f"{provider}_API{api_number}"
+        apis.append((provider, lender_api_name))
+        api_details.append([provider, lender_api_name, sp_api_name])
+        if api_number % 2:
+            rate_card.append([provider, lender_api_name, sp_api_name, 'flat', '0', '0',
+                              FLAT_PRICES[api_number % len(FLAT_PRICES)]])
+        else:
+            min_hits = 1
+            for slab, price in enumerate(SLAB_PRICES):
+                max_hits = 0 if slab == len(SLAB_PRICES) - 1 else min_hits + 10 ** (slab + 3) - 1
+                rate_card.append([provider, lender_api_name, sp_api_name, 'slab', str(min_hits), str(max_hits), price])
+                min_hits = max_hits + 1
+
+    payment_details = [_header(PaymentDetail)]
+    sp_invoices = [_header(BillingRow)]
+    teal_and_mp_bhulekh = [_header(CustomBillingRow)]
+    for month in months:
+        for lender_id in range(1, lender_count + 1):
+            bank_name = f"Bank {lender_id}"
+            invoice_number = f"RBIH/{month[:3].upper()}/{lender_id:05d}"
+            payment_details.append([month, bank_name, str(rng.randint(0, 500000)), str(rng.randint(0, 500000)),
+                                    str(rng.choice([0, 0, 0, 100, -250])), f"PO-{lender_id}"])
+            for _ in range(rows_per_invoice):
+                provider, lender_api_name = rng.choice(apis)
+                sp_invoices.append([month, bank_name, str(rng.randint(0, 50000)), str(rng.randint(0, 500)),
+                                    lender_api_name, provider, invoice_number])
+            if rng.random() < custom_lender_share:
+                provider, lender_api_name = rng.choice(apis)
+                teal_and_mp_bhulekh.append([month, bank_name, lender_api_name, provider, 'Land record',
+                                            str(rng.randint(0, 5000)), str(rng.randint(0, 50)),
+                                            rng.choice(CUSTOM_UNIT_COSTS), invoice_number, '', ''])
+                teal_and_mp_bhulekh.append([month, bank_name, lender_api_name, provider, 'Land record', '0', '0',
+                                            '0', invoice_number, f"{rng.randint(1000, 99999)}.{rng.randint(0, 99)}",
+                                            'Y'])
+
+    return {
+        LENDERS_RANGE: lenders,
+        API_DETAILS_RANGE: api_details,
+        RATE_CARD_RANGE: rate_card,
+        PAYMENT_DETAILS_RANGE: payment_details,
+        SP_INVOICES_RANGE: sp_invoices,
+        TEAL_AND_MP_BHULEKH_RANGE: teal_and_mp_bhulekh,
+    }
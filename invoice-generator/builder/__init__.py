@@ -1 +1,4 @@
-from builder.report_builder import generate_report
+from builder.report_builder import generate_report, render_invoice_batch
+
+from builder.invoice_ledger import InvoiceLedger
+from builder.einvoice_export import EInvoiceWriter, dump_compact
\ No newline at end of file
@@ -0,0 +1,96 @@
+from decimal import Decimal
+from functools import lru_cache
+
+from babel.numbers import format_currency
+from num2words import num2words
+
+# Indian digit grouping: the last three digits, then groups of two (lakh, crore), e.g. 1,23,45,678.00
+FIRST_GROUP_SIZE = 3
+GROUP_SIZE = 2
+GROUP_SYMBOL = ','
+DECIMAL_SYMBOL = '.'
+PAISE_QUANTUM = Decimal('0.01')
+FORMAT_CACHE_SIZE = 4096
+
+
+def _group_digits(integer_digits):
+    if len(integer_digits) <= FIRST_GROUP_SIZE:
+        return integer_digits
+    head, tail = integer_digits[:-FIRST_GROUP_SIZE], integer_digits[-FIRST_GROUP_SIZE:]
+    groups = []
+    while len(head) > GROUP_SIZE:
+        groups.append(head[-GROUP_SIZE:])
+        head = head[:-GROUP_SIZE]
+    groups.append(head)
+    return GROUP_SYMBOL.join(reversed(groups)) + GROUP_SYMBOL + tail
+
+
+@lru_cache(maxsize=FORMAT_CACHE_SIZE)
+def _format_inr(text):
+    # Keyed by the text of the value rather than the value, 0.0 and -0.0 are equal but are formatted differently.
+    # Decimal(str(value)) is also how babel reads non-Decimal values, and gives back any Decimal unchanged
+    value = Decimal(text)
+    if not value.is_finite():
+        # Infinity and NaN are rare enough to leave to babel
+        return format_currency(value, 'INR', locale='en_IN').replace('₹', '')
+    # Same steps as babel's NumberPattern.apply for the en_IN currency pattern '¤#,##,##0.00': the sign is taken
+    # before rounding and the absolute value is rounded half-even to paise
+    sign = '-' if value.is_signed() else ''
+    integer_digits, _, paise = f"{abs(value).normalize().quantize(PAISE_QUANTUM):f}".partition(DECIMAL_SYMBOL)
+    return f"{sign}{_group_digits(integer_digits)}{DECIMAL_SYMBOL}{paise}"
+
+
+def format_inr(value) -> str:
+    """
+    Formats a numeric value in Indian Rupees with lakh/crore grouping, excluding the currency symbol.
+
+    The output is identical to babel's format_currency(value, 'INR', locale='en_IN') without the '₹', without the
+    locale lookup on every call. Results are memoised, invoices format the same few amounts over and over.
+
+    Parameters:
+    - value (int, float, Decimal or str): The amount to format.
+
+    Returns:
+    - str: The formatted amount, e.g. '1,23,456.70'.
+    """
+    return _format_inr(str(value))
+
+
+def format_inr_batch(values):
+    """
+    Formats several amounts at once, see format_inr.
+
+    Parameters:
+    - values (iterable): The amounts to format.
+
+    Returns:
+    - list: The formatted amounts, in the order of values.
+    """
+    return [_format_inr(str(value)) for value in values]
+
+
+@lru_cache(maxsize=FORMAT_CACHE_SIZE, typed=True)
+def _amount_to_words(amount, _representation):
+    # Convert the amount to words in Indian currency (INR)
+    amount_in_words = num2words(amount, to='currency', lang='en_IN')
+    # Replace "euro" with "rupees" and "cents" with "paise", remove "zero paise" and commas
+    amount_in_words = amount_in_words.replace("euro", "rupees").replace("cents", "paise")
+    amount_in_words = amount_in_words.replace(" zero paise", "").replace(',', '')
+    # Capitalize the first letter
+    return str(amount_in_words.capitalize())
+
+
+def amount_to_words(amount):
+    """
+    Spells out an amount in Indian Rupees, e.g. 'One thousand two hundred and thirty-four rupees'.
+
+    Results are memoised. Equal amounts written differently (Decimal('1.5') and Decimal('1.50')) are cached apart,
+    so the output is always the one num2words gives for the exact value passed.
+
+    Parameters:
+    - amount (int, float or Decimal): The amount to spell out.
+
+    Returns:
+    - str: The amount in words.
+    """
+    return _amount_to_words(amount, str(amount))
@@ -0,0 +1,256 @@
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from googleapiclient.http import MediaFileUpload
+
+from data.google_clients import get_drive_service
+from tracing import increment, span
+
+PARENT_FOLDER_ID = "1ixhKIqNF1ep-JmjAl887VEGYepQjDgy2"
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+DEFAULT_UPLOAD_WORKERS = 4
+# appProperties key holding the content hash an uploaded file was created from
+CONTENT_HASH_PROPERTY = 'content_hash'
+
+
+# Function to check if a folder exists and return its ID
+def get_folder_id(service, folder_name, parent_folder_id=None):
+    query = f"name = '{folder_name}' and mimeType = '{FOLDER_MIME_TYPE}'"
+    if parent_folder_id:
+        query += f" and '{parent_folder_id}' in parents"
+
+    results = service.files().list(q=query, spaces='drive', fields="files(id, name)").execute()
+    items = results.get('files', [])
+
+    if items:
+        return items[0]['id']
+    return None
+
+
+# Function to create a folder
+def create_folder(service, folder_name, parent_folder_id=None):
+    folder_metadata = {
+        'name': folder_name,
+        'mimeType': FOLDER_MIME_TYPE
+    }
+    if parent_folder_id:
+        folder_metadata['parents'] = [parent_folder_id]
+
+    folder = service.files().create(body=folder_metadata, fields='id').execute()
+    return folder.get('id')
+
+
+def list_child_folders(service, parent_folder_id):
+    """
+    Lists every folder directly under a Drive folder.
+
+    Parameters:
+    - service: The Google Drive v3 service.
+    - parent_folder_id (str): The ID of the parent folder.
+
+    Returns:
+    - dict: Folder ID keyed by folder name; for duplicate names the first folder returned wins, as in get_folder_id.
+    """
+    folder_ids = {}
+    page_token = None
+    while True:
+        results = service.files().list(q=f"'{parent_folder_id}' in parents and mimeType = '{FOLDER_MIME_TYPE}' "
+                                         f"and trashed = false",
+                                       spaces='drive', fields="nextPageToken, files(id, name)", pageSize=1000,
+                                       pageToken=page_token).execute()
+        for item in results.get('files', []):
+            folder_ids.setdefault(item['name'], item['id'])
+        page_token = results.get('nextPageToken')
+        if not page_token:
+            return folder_ids
+
+
+def list_folder_files(service, folder_id):
+    """
+    Lists the files (not folders) directly in a Drive folder.
+
+    Parameters:
+    - service: The Google Drive v3 service.
+    - folder_id (str): The ID of the folder.
+
+    Returns:
+    - dict: File metadata ('id', 'name', 'md5Checksum', 'appProperties') keyed by file name; for duplicate names the
+            first file returned wins.
+    """
+    files = {}
+    page_token = None
+    while True:
+        results = service.files().list(q=f"'{folder_id}' in parents and mimeType != '{FOLDER_MIME_TYPE}' "
+                                         f"and trashed = false",
+                                       spaces='drive',
+                                       fields="nextPageToken, files(id, name, md5Checksum, appProperties)",
+                                       pageSize=1000, pageToken=page_token).execute()
+        for item in results.get('files', []):
+            files.setdefault(item['name'], item)
+        page_token = results.get('nextPageToken')
+        if not page_token:
+            return files
+
+
+def get_file_md5(file_path):
+    md5 = hashlib.md5()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+class DriveUploader:
+    """
+    Uploads files into per-lender folders under a parent Drive folder on a bounded pool of threads.
+
+    The folders under the parent are listed once per uploader and missing ones are created once, instead of a Drive
+    query per uploaded file. Each upload thread uses its own Drive service, see data.google_clients.
+
+    A file whose name already exists in the target folder is not uploaded again when its content hash matches the
+    existing file (the hash stored in its appProperties, or Drive's md5Checksum), and is updated in place otherwise,
+    so regenerating a month does not leave duplicate files behind.
+
+    Usage:
+        with DriveUploader() as uploader:
+            uploader.submit(pdf_path, application_name)
+        results = uploader.results()
+    """
+
+    def __init__(self, parent_folder_id=PARENT_FOLDER_ID, max_workers=DEFAULT_UPLOAD_WORKERS):
+        self.parent_folder_id = parent_folder_id
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix='drive-upload')
+        self._folder_lock = threading.Lock()
+        self._folder_ids = None
+        # Existing files of each target folder, listed on first use of the folder
+        self._folder_files = {}
+        self._folder_files_locks = {}
+        # Files created by this uploader, which are never replaced: another upload with the same name is a different
+        # file
+        self._created_file_ids = set()
+        self._futures = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._executor.shutdown(wait=True)
+        return False
+
+    def get_folder_id(self, folder_name):
+        """
+        Returns the ID of the folder with the given name under the parent folder, creating it if it does not exist.
+        """
+        with self._folder_lock:
+            if self._folder_ids is None:
+                self._folder_ids = list_child_folders(get_drive_service(), self.parent_folder_id)
+            folder_id = self._folder_ids.get(folder_name)
+            if folder_id is None:
+                folder_id = create_folder(get_drive_service(), folder_name, self.parent_folder_id)
+                self._folder_ids[folder_name] = folder_id
+            return folder_id
+
+    def _get_folder_files(self, folder_id):
+        with self._folder_lock:
+            folder_files_lock = self._folder_files_locks.setdefault(folder_id, threading.Lock())
+        with folder_files_lock:
+            folder_files = self._folder_files.get(folder_id)
+            if folder_files is None:
+                folder_files = self._folder_files[folder_id] = list_folder_files(get_drive_service(), folder_id)
+            return folder_files
+
+    def _set_folder_file(self, folder_id, file):
+        # Keeps the listing of the folder up to date, so a second upload of the same name in this run finds the file
+        with self._folder_files_locks[folder_id]:
+            self._folder_files[folder_id][file['name']] = file
+
+    def upload(self, file_path, target_folder_name, content_hash=None):
+        """
+        Uploads one file into the target folder in the calling thread, unless an identical file is already there.
+
+        Parameters:
+        - file_path (str): Path of the file to upload.
+        - target_folder_name (str): Name of the folder under the parent folder.
+        - content_hash (str): Hash identifying the file content. Defaults to the MD5 of the file; pass a hash of
+                              the inputs for files such as PDFs whose bytes change with every render.
+
+        Returns:
+        - dict: The upload result with 'file_path', 'folder_name', 'file_id', 'status' ('created', 'updated',
+                'skipped' or 'failed') and 'error'.
+        """
+        result = {'file_path': file_path, 'folder_name': target_folder_name, 'file_id': None, 'status': None,
+                  'error': None}
+        with span('upload', lender=target_folder_name):
+            try:
+                if content_hash is None:
+                    content_hash = get_file_md5(file_path)
+                folder_id = self.get_folder_id(target_folder_name)
+                file_name = os.path.basename(file_path)
+                existing_file = self._get_folder_files(folder_id).get(file_name)
+                if existing_file is not None and content_hash in (
+                        (existing_file.get('appProperties') or {}).get(CONTENT_HASH_PROPERTY),
+                        existing_file.get('md5Checksum')):
+                    result['file_id'] = existing_file['id']
+                    result['status'] = 'skipped'
+                    increment('uploads_skipped')
+                    print(f"File unchanged, upload skipped. File ID: {existing_file['id']}")
+                    return result
+
+                media = MediaFileUpload(file_path, resumable=True)
+                app_properties = {CONTENT_HASH_PROPERTY: content_hash}
+                if existing_file is not None and existing_file['id'] not in self._created_file_ids:
+                    # Replace the content of the existing file instead of adding a duplicate next to it
+                    file = get_drive_service().files().update(fileId=existing_file['id'],
+                                                              body={'appProperties': app_properties},
+                                                              media_body=media, fields='id').execute()
+                    result['status'] = 'updated'
+                else:
+                    file_metadata = {'name': file_name, 'parents': [folder_id], 'appProperties': app_properties}
+                    # Upload the file to Google Drive
+                    file = get_drive_service().files().create(body=file_metadata, media_body=media,
+                                                              fields='id').execute()
+                    self._created_file_ids.add(file.get('id'))
+                    result['status'] = 'created'
+                result['file_id'] = file.get('id')
+                self._set_folder_file(folder_id, {'id': file.get('id'), 'name': file_name,
+                                                  'appProperties': app_properties})
+                increment('bytes_uploaded', os.path.getsize(file_path))
+                print(f"File uploaded successfully! File ID: {file.get('id')}")
+            except Exception as ex:
+                result['status'] = 'failed'
+                result['error'] = str(ex)
+                print(f"Upload of {file_path} failed: {ex}")
+        increment(f"uploads_{result['status']}")
+        return result
+
+    def submit(self, file_path, target_folder_name, content_hash=None):
+        """
+        Queues a file for upload and returns immediately with a future of its upload result, see upload.
+        """
+        future = self._executor.submit(self.upload, file_path, target_folder_name, content_hash)
+        self._futures.append(future)
+        return future
+
+    def results(self):
+        """
+        Waits for every submitted upload and returns their results in submission order.
+        """
+        return [future.result() for future in self._futures]
+
+
+_default_uploader = None
+_default_uploader_lock = threading.Lock()
+
+
+def upload_file_to_drive(file_path, target_folder_name, content_hash=None):
+    """
+    Uploads one file into the target lender folder, sharing one folder cache for the whole process, see
+    DriveUploader.upload.
+    """
+    global _default_uploader
+    with _default_uploader_lock:
+        if _default_uploader is None:
+            _default_uploader = DriveUploader(max_workers=1)
+    return _default_uploader.upload(file_path, target_folder_name, content_hash)
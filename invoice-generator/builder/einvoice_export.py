@@ -0,0 +1,165 @@
+import json
+import os
+import tempfile
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, the standard library serialiser gives the same compact output
+    orjson = None
+
+# One compact payload per line
+NDJSON_FORMAT = 'ndjson'
+# One JSON array of every payload, the shape of the NIC bulk upload
+BULK_FORMAT = 'bulk'
+# One pretty-printed file per invoice
+FILES_FORMAT = 'files'
+EINVOICE_FORMATS = (NDJSON_FORMAT, BULK_FORMAT, FILES_FORMAT)
+DEFAULT_EINVOICE_FORMAT = NDJSON_FORMAT
+DEFAULT_EINVOICE_DIR = 'einvoices'
+
+
+def dump_compact(payload):
+    """
+    Serialises a NIC payload as compact UTF-8 JSON, with orjson when it is installed.
+
+    Returns:
+    - bytes: The JSON, without whitespace between tokens and with non-ASCII characters kept as they are.
+    """
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def get_einvoice_number(payload):
+    """
+    Returns the invoice number of a NIC payload (DocDtls.No).
+    """
+    return (payload.get('DocDtls') or {}).get('No')
+
+
+class EInvoiceWriter:
+    """
+    Writes the NIC e-invoice payloads of a run into an output directory.
+
+    In the 'ndjson' and 'bulk' formats every payload goes into one batch file, '<batch name>.ndjson' or
+    '<batch name>.json'. The batch is written to a temporary file and only replaces the previous batch of the same name
+    once the writer is closed without an error, so a failed run never leaves half a batch to submit. A run of the whole
+    month replaces the previous batch, so invoices deleted or renumbered in the sheet leave it. With keep_previous (a
+    run of only some invoices: incremental, or a few lenders), the payloads of the previous batch whose invoice number
+    was not written again are kept in the new batch, so it still holds every invoice of the month. The 'files' format
+    writes '<report name>.json' per invoice, pretty-printed as before the batch formats existed.
+
+    Usage:
+        with EInvoiceWriter('einvoices', 'ndjson', 'EINVOICES_20251001_20251031') as einvoice_writer:
+            einvoice_writer.write(report_name, json_data)
+    """
+
+    def __init__(self, output_dir=DEFAULT_EINVOICE_DIR, export_format=DEFAULT_EINVOICE_FORMAT,
+                 batch_name='EINVOICES', keep_previous=False):
+        if export_format not in EINVOICE_FORMATS:
+            raise ValueError(f"Unknown e-invoice format '{export_format}', expected one of: "
+                             f"{', '.join(EINVOICE_FORMATS)}")
+        self.output_dir = output_dir
+        self.export_format = export_format
+        extension = '.ndjson' if export_format == NDJSON_FORMAT else '.json'
+        self.batch_path = os.path.abspath(os.path.join(output_dir, f"{batch_name}{extension}"))
+        self.keep_previous = keep_previous
+        self.payload_count = 0
+        self._batch_file = None
+        # Invoice numbers of the payloads written to the batch
+        self._invoice_numbers = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+        return False
+
+    def write(self, report_name, json_data):
+        """
+        Writes the payload of one invoice.
+
+        Parameters:
+        - report_name (str): The report name of the invoice, used as file name in the 'files' format.
+        - json_data (dict): The NIC payload, see build_invoice.
+
+        Returns:
+        - str: The path of the file holding the payload.
+        """
+        self.payload_count += 1
+        self._invoice_numbers.add(get_einvoice_number(json_data))
+        if self.export_format == FILES_FORMAT:
+            os.makedirs(self.output_dir, exist_ok=True)
+            json_path = os.path.abspath(os.path.join(self.output_dir, f"{report_name}.json"))
+            with open(json_path, "w", encoding="utf-8") as f:
+                json.dump(json_data, f, ensure_ascii=False, indent=4)
+            return json_path
+
+        if self._batch_file is None:
+            os.makedirs(self.output_dir, exist_ok=True)
+            self._batch_file = tempfile.NamedTemporaryFile("wb", dir=self.output_dir, suffix=".tmp", delete=False)
+            if self.export_format == BULK_FORMAT:
+                self._batch_file.write(b'[')
+        elif self.export_format == BULK_FORMAT:
+            self._batch_file.write(b',\n')
+        self._batch_file.write(dump_compact(json_data))
+        if self.export_format == NDJSON_FORMAT:
+            self._batch_file.write(b'\n')
+        return self.batch_path
+
+    def close(self):
+        """
+        Completes the batch file, if any payload was written. Without keep_previous, the previous batch of a month
+        that has no invoice left is removed.
+        """
+        if self._batch_file is None:
+            if not self.keep_previous and self.export_format != FILES_FORMAT and os.path.exists(self.batch_path):
+                os.remove(self.batch_path)
+            return
+        if self.export_format == BULK_FORMAT:
+            self._batch_file.write(b']\n')
+        self._batch_file.close()
+        previous_payloads = self._read_previous_payloads() if self.keep_previous else []
+        if previous_payloads:
+            self._prepend_payloads(previous_payloads)
+        os.replace(self._batch_file.name, self.batch_path)
+        self._batch_file = None
+
+    def _read_previous_payloads(self):
+        # Compact payloads of the previous batch that are not replaced by this run, in their order
+        if not os.path.exists(self.batch_path):
+            return []
+        with open(self.batch_path, 'rb') as f:
+            content = f.read()
+        if self.export_format == NDJSON_FORMAT:
+            payloads = [(json.loads(line), line) for line in content.splitlines() if line.strip()]
+        else:
+            payloads = [(payload, dump_compact(payload)) for payload in json.loads(content or b'[]')]
+        return [compact_payload for payload, compact_payload in payloads
+                if get_einvoice_number(payload) not in self._invoice_numbers]
+
+    def _prepend_payloads(self, payloads):
+        # Rewrites the batch of this run with the given payloads first
+        with open(self._batch_file.name, 'rb') as f:
+            content = f.read()
+        with open(self._batch_file.name, 'wb') as f:
+            if self.export_format == NDJSON_FORMAT:
+                f.writelines(payload + b'\n' for payload in payloads)
+                f.write(content)
+            else:
+                # Between the '[' and ']\n' of the batch of this run
+                f.write(b'[' + b',\n'.join(payloads) + b',\n' + content[1:])
+
+    def discard(self):
+        """
+        Drops the unfinished batch file, keeping the previous batch of the same name.
+        """
+        if self._batch_file is None:
+            return
+        self._batch_file.close()
+        os.remove(self._batch_file.name)
+        self._batch_file = None
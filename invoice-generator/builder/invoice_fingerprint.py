@@ -0,0 +1,68 @@
+import dataclasses
+import hashlib
+import json
+import os
+import tempfile
+
+FINGERPRINT_DIR_NAME = '.invoice_fingerprints'
+
+
+def get_invoice_key(invoice_summary):
+    """
+    Returns the key identifying an invoice within a month, the same grouping key used to combine its billing lines.
+    """
+    return (f"{invoice_summary.get('application_name')}|{invoice_summary.get('invoice_number')}|"
+            f"{invoice_summary.get('organization').get('id')}")
+
+
+def get_invoice_fingerprint(invoice_summary, payment_detail, invoice_date, template_digest):
+    """
+    Hashes every input an invoice is generated from.
+
+    Parameters:
+    - invoice_summary (dict): The combined invoice summary, see combine_invoice_summaries_and_add_billing_summary.
+    - payment_detail (PaymentDetail): The lender's payment details entry for the month, or None.
+    - invoice_date (str): The invoice date, formatted as 'dd-mm-yyyy'.
+    - template_digest (str): The digest of the report template, see get_template_digest.
+
+    Returns:
+    - str: The SHA-256 hex digest of the inputs.
+    """
+    inputs = {
+        "invoice_summary": invoice_summary,
+        "payment_detail": dataclasses.asdict(payment_detail) if payment_detail is not None else None,
+        "invoice_date": invoice_date,
+        "template": template_digest,
+    }
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _get_fingerprint_path(invoices_for_month):
+    current_dir = os.getcwd()
+    return os.path.join(os.path.join(current_dir, FINGERPRINT_DIR_NAME), f"{invoices_for_month}.json")
+
+
+def load_fingerprints(invoices_for_month):
+    """
+    Loads the fingerprints of the invoices generated for a month by earlier runs.
+
+    Returns:
+    - dict: Fingerprint keyed by invoice key (see get_invoice_key), empty if the month was never generated.
+    """
+    fingerprint_path = _get_fingerprint_path(invoices_for_month)
+    if not os.path.isfile(fingerprint_path):
+        return {}
+    with open(fingerprint_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_fingerprints(invoices_for_month, fingerprints):
+    """
+    Stores the fingerprints of the invoices generated for a month, replacing the stored ones.
+    """
+    fingerprint_path = _get_fingerprint_path(invoices_for_month)
+    fingerprint_dir = os.path.dirname(fingerprint_path)
+    os.makedirs(fingerprint_dir, exist_ok=True)
+    with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=fingerprint_dir, suffix=".tmp", delete=False) as f:
+        json.dump(fingerprints, f, indent=2, sort_keys=True)
+    os.replace(f.name, fingerprint_path)
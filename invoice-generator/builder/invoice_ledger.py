@@ -0,0 +1,199 @@
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+from data.money import ZERO, round_to_rupee, to_money
+
+LEDGER_FILE_NAME = '.invoice_ledger.sqlite'
+# Amounts of an invoice, stored as exact decimal text since SQLite has no decimal type
+AMOUNT_COLUMNS = ('taxable_value', 'sgst', 'cgst', 'igst', 'total_tax', 'current_period_charges', 'previous_balance',
+                  'payments_received', 'adjustments', 'amount_due')
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS invoices (
+    lender TEXT NOT NULL,
+    month TEXT NOT NULL,
+    invoice_number TEXT NOT NULL,
+    month_start TEXT NOT NULL,
+    application_name TEXT,
+    lender_id TEXT,
+    invoice_date TEXT,
+    {', '.join(f'{column} TEXT' for column in AMOUNT_COLUMNS)},
+    report_name TEXT,
+    json_path TEXT,
+    pdf_path TEXT,
+    drive_folder TEXT,
+    drive_file_id TEXT,
+    upload_status TEXT,
+    content_hash TEXT,
+    combined_record TEXT,
+    generated_at TEXT,
+    PRIMARY KEY (lender, month, invoice_number)
+);
+CREATE INDEX IF NOT EXISTS invoices_by_month ON invoices (month_start, lender);
+CREATE INDEX IF NOT EXISTS invoices_by_lender ON invoices (lender, month_start);
+CREATE INDEX IF NOT EXISTS invoices_by_invoice_number ON invoices (invoice_number);
+"""
+
+
+def get_ledger_path():
+    current_dir = os.getcwd()
+    return os.path.join(current_dir, LEDGER_FILE_NAME)
+
+
+def _get_month_start(month):
+    # 'October-2025' -> '2025-10-01', which sorts in calendar order
+    return datetime.strptime(month, "%B-%Y").strftime("%Y-%m-01")
+
+
+def _to_entry(row):
+    entry = dict(row)
+    for column in AMOUNT_COLUMNS:
+        if entry[column] is not None:
+            entry[column] = to_money(entry[column])
+    entry['combined_record'] = json.loads(entry['combined_record']) if entry['combined_record'] else None
+    return entry
+
+
+class InvoiceLedger:
+    """
+    Local SQLite ledger of every generated invoice, keyed by lender (bank name), month and invoice number.
+
+    Each entry holds the combined record the invoice was built from, its taxes and amounts, and where its NIC JSON,
+    PDF and Drive copy are. Regenerating an invoice replaces its entry. Amounts come back as Decimal.
+
+    Usage:
+        with InvoiceLedger() as ledger:
+            ledger.get_invoices(month='October-2025')
+    """
+
+    def __init__(self, path=None):
+        self.path = path or get_ledger_path()
+        self._connection = sqlite3.connect(self.path)
+        self._connection.row_factory = sqlite3.Row
+        self._connection.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def close(self):
+        # Whatever was recorded is kept, also when a run stops half way
+        self._connection.commit()
+        self._connection.close()
+
+    def record_invoice(self, invoice, rendered_invoice, generated_at=None):
+        """
+        Stores a rendered invoice, replacing the entry of an earlier run.
+
+        Parameters:
+        - invoice (dict): The invoice, see build_invoice.
+        - rendered_invoice (dict): Its render result, see render_invoice.
+        - generated_at (datetime): When it was rendered, now if None.
+        """
+        amounts = invoice["amounts"]
+        organization = invoice["invoice_summary"].get("organization")
+        self._connection.execute(
+            f"INSERT OR REPLACE INTO invoices (lender, month, invoice_number, month_start, application_name, "
+            f"lender_id, invoice_date, {', '.join(AMOUNT_COLUMNS)}, report_name, json_path, pdf_path, drive_folder, "
+            f"content_hash, combined_record, generated_at) "
+            f"VALUES ({', '.join('?' * (14 + len(AMOUNT_COLUMNS)))})",
+            (organization.get("name"), invoice["month"], invoice["invoice_number"], _get_month_start(invoice["month"]),
+             invoice["application_name"], organization.get("id"), invoice["invoice_date"],
+             *(str(amounts[column]) for column in AMOUNT_COLUMNS),
+             invoice["report_name"], rendered_invoice.get("json_path"), rendered_invoice.get("pdf_path"),
+             rendered_invoice.get("application_name"), rendered_invoice.get("content_hash"),
+             json.dumps(invoice["invoice_summary"], sort_keys=True, default=str),
+             (generated_at or datetime.now()).isoformat(timespec='seconds')))
+
+    def record_upload(self, lender, month, invoice_number, upload_result):
+        """
+        Stores the Drive upload result of an invoice, see DriveUploader.upload.
+        """
+        self._connection.execute(
+            "UPDATE invoices SET drive_file_id = ?, upload_status = ? "
+            "WHERE lender = ? AND month = ? AND invoice_number = ?",
+            (upload_result.get("file_id"), upload_result.get("status"), lender, month, invoice_number))
+
+    def get_invoice(self, lender, month, invoice_number):
+        """
+        Returns the entry of one invoice as a dict, or None if it was never generated.
+        """
+        row = self._connection.execute(
+            "SELECT * FROM invoices WHERE lender = ? AND month = ? AND invoice_number = ?",
+            (lender, month, invoice_number)).fetchone()
+        return _to_entry(row) if row is not None else None
+
+    def get_invoices(self, lender=None, month=None, invoice_number=None):
+        """
+        Returns the entries matching every given filter, oldest month first, then by lender and invoice number.
+
+        Parameters:
+        - lender (str): Bank name.
+        - month (str): Billed month, e.g. 'October-2025'.
+        - invoice_number (str): Invoice number.
+
+        Returns:
+        - list: The entries as dicts with the ledger columns, amounts as Decimal and 'combined_record' decoded.
+        """
+        filters = [(column, value) for column, value in
+                   (('lender', lender), ('month', month), ('invoice_number', invoice_number)) if value is not None]
+        where = f" WHERE {' AND '.join(f'{column} = ?' for column, _ in filters)}" if filters else ""
+        rows = self._connection.execute(f"SELECT * FROM invoices{where} ORDER BY month_start, lender, invoice_number",
+                                        [value for _, value in filters])
+        return [_to_entry(row) for row in rows]
+
+    def get_lenders(self):
+        """
+        Returns the bank names of every lender in the ledger, sorted.
+        """
+        return [row[0] for row in self._connection.execute("SELECT DISTINCT lender FROM invoices ORDER BY lender")]
+
+    def get_month_totals(self, month):
+        """
+        Totals the invoices of a month per lender, for reconciliation.
+
+        Returns:
+        - dict: Per lender, the number of 'invoices' and the sums of 'taxable_value', 'total_tax' and
+                'current_period_charges'.
+        """
+        totals = {}
+        for entry in self.get_invoices(month=month):
+            lender_totals = totals.setdefault(entry['lender'], {'invoices': 0, 'taxable_value': ZERO,
+                                                                'total_tax': ZERO, 'current_period_charges': ZERO})
+            lender_totals['invoices'] += 1
+            for column in ('taxable_value', 'total_tax', 'current_period_charges'):
+                lender_totals[column] += entry[column]
+        return totals
+
+    def derive_previous_balance(self, lender, month):
+        """
+        Derives the previous balance of a lender for a month from the ledger, instead of the 'Previous Balance' column
+        of the Payment Details tab.
+
+        The previous balance is what the lender owed after its latest invoiced month before month: that month's
+        previous balance, less the payments received and adjustments, plus the charges of all its invoices of that
+        month (see get_amount_due). The previous balance, payments and adjustments are per lender and month, so they
+        are only counted once when a lender has several invoices in a month.
+
+        Parameters:
+        - lender (str): Bank name.
+        - month (str): The month to derive the previous balance for, e.g. 'November-2025'.
+
+        Returns:
+        - Decimal or None: The previous balance rounded to the rupee, None if the lender has no invoice before month.
+        """
+        row = self._connection.execute(
+            "SELECT month_start FROM invoices WHERE lender = ? AND month_start < ? "
+            "ORDER BY month_start DESC LIMIT 1", (lender, _get_month_start(month))).fetchone()
+        if row is None:
+            return None
+        entries = [_to_entry(entry_row) for entry_row in self._connection.execute(
+            "SELECT * FROM invoices WHERE lender = ? AND month_start = ?", (lender, row[0]))]
+        current_period_charges = sum((entry['current_period_charges'] for entry in entries), ZERO)
+        return round_to_rupee(entries[0]['previous_balance'] - entries[0]['payments_received']
+                              - entries[0]['adjustments'] + current_period_charges)
@@ -0,0 +1,140 @@
+"""
+Dry run of the invoices of a month, to check the sheet before generating them.
+
+The invoices are computed exactly as generate_report builds them (see compute_invoice), so the taxes and amounts due
+are the ones that would be invoiced, but nothing is rendered, written or uploaded, and the report template is not
+read.
+"""
+from decimal import InvalidOperation
+
+from builder.amount_format import format_inr
+from builder.report_builder import compute_invoice, get_amount_due
+from data.money import ZERO
+
+# Columns of the preview table: (heading, row key), amounts are right aligned
+PREVIEW_COLUMNS = (('Month', 'month'), ('Lender', 'lender'), ('Invoices', 'invoices'), ('Lines', 'billing_lines'),
+                   ('Taxable value', 'taxable_value'), ('Tax', 'total_tax'),
+                   ('Current charges', 'current_period_charges'), ('Amount due', 'amount_due'),
+                   ('Anomalies', 'anomaly_count'))
+AMOUNT_KEYS = ('taxable_value', 'total_tax', 'current_period_charges', 'previous_balance', 'payments_received',
+               'adjustments', 'amount_due')
+
+
+def get_invoice_anomalies(invoice):
+    """
+    Returns what looks wrong in an invoice computed by compute_invoice, as short descriptions.
+    """
+    anomalies = []
+    organization = invoice["invoice_summary"].get("organization")
+    if not invoice["application_name"]:
+        anomalies.append("no application name in Lender Information")
+    for field, label in (('gstin', 'GSTIN'), ('pan_number', 'PAN'), ('state', 'state')):
+        if not organization.get(field):
+            anomalies.append(f"no {label} in Lender Information")
+    for billing_line in invoice["billing_summary"]:
+        # Services without a price in the rate card (or without an SP API name) are billed at 0
+        if billing_line["unit_cost"] == "0.00" and billing_line["count"]:
+            anomalies.append(f"no rate card price for {billing_line['service_name']} "
+                             f"({billing_line['provider']}), billed at 0")
+    if invoice["amounts"]["taxable_value"] <= ZERO:
+        anomalies.append("nothing to bill")
+    return anomalies
+
+
+def preview_month(invoices_for_month, invoice_summaries, payment_details, invoice_date, organization_application):
+    """
+    Builds the invoices of a month and totals them per lender, without rendering, writing or uploading anything.
+
+    The previous balance, payments received and adjustments of a lender are counted once, however many invoices it
+    has, so its amount due is what it owes after all of them (as in InvoiceLedger.derive_previous_balance).
+
+    Parameters:
+    - invoices_for_month (str): The billed month, e.g. 'October-2025'.
+    - invoice_summaries (iterable): Combined invoice summaries, see combine_invoice_summaries_and_add_billing_summary.
+    - payment_details (dict): Payment details keyed by '<Month - Year>-<Bank name>'.
+    - invoice_date (str): The invoice date, formatted as 'dd-mm-yyyy'.
+    - organization_application (dict): Application name keyed by bank name.
+
+    Returns:
+    - list: One row per lender (bank name) in the order of their first invoice, with the 'month', 'lender', number of
+            'invoices' and 'billing_lines', the amounts of AMOUNT_KEYS as Decimal and the 'anomalies' (list of str).
+    """
+    rows = {}
+    # Lenders of every invoice number, an invoice number must not be used by two lenders
+    invoice_number_lenders = {}
+    for invoice_summary in invoice_summaries:
+        organization = invoice_summary.get("organization")
+        lender = organization.get("name") if organization else invoice_summary.get("application_name")
+        invoice_number = invoice_summary.get("invoice_number")
+        row = rows.get(lender)
+        if row is None:
+            row = rows[lender] = {'month': invoices_for_month, 'lender': lender, 'invoices': 0, 'billing_lines': 0,
+                                  **{key: ZERO for key in AMOUNT_KEYS}, 'anomalies': []}
+            if f"{invoices_for_month}-{lender}" not in payment_details:
+                row['anomalies'].append("no payment details for the month, previous balance taken as 0")
+        invoice_number_lenders.setdefault(invoice_number, []).append(lender)
+        if not organization:
+            row['anomalies'].append(f"{invoice_number}: application {invoice_summary.get('application_name')} is "
+                                    f"not in Lender Information, invoice not built")
+            continue
+        try:
+            invoice = compute_invoice(invoices_for_month, invoice_summary, payment_details, invoice_date,
+                                      organization_application)
+        except (ValueError, KeyError, InvalidOperation) as ex:
+            # Bad cells of the sheet (amounts, dates, states); anything else is a problem of the environment or the
+            # code and is raised, rather than shown as a data anomaly
+            row['anomalies'].append(f"{invoice_number}: invoice not built ({ex!r})")
+            continue
+        amounts = invoice["amounts"]
+        row['invoices'] += 1
+        row['billing_lines'] += len(invoice["billing_summary"])
+        for key in ('taxable_value', 'total_tax', 'current_period_charges'):
+            row[key] += amounts[key]
+        for key in ('previous_balance', 'payments_received', 'adjustments'):
+            row[key] = amounts[key]
+        row['anomalies'].extend(f"{invoice_number}: {anomaly}" for anomaly in get_invoice_anomalies(invoice))
+
+    for invoice_number, lenders in invoice_number_lenders.items():
+        lenders = list(dict.fromkeys(lenders))
+        for lender in lenders if len(lenders) > 1 else ():
+            other_lenders = ', '.join(other for other in lenders if other != lender)
+            rows[lender]['anomalies'].append(f"{invoice_number}: invoice number also used by {other_lenders}")
+    for row in rows.values():
+        row['amount_due'] = get_amount_due(row['previous_balance'], row['payments_received'], row['adjustments'],
+                                           row['current_period_charges'])
+        if row['amount_due'] < ZERO:
+            row['anomalies'].append(f"amount due is negative ({format_inr(row['amount_due'])})")
+    return list(rows.values())
+
+
+def format_preview_table(rows):
+    """
+    Formats preview rows (see preview_month) as a plain text table with a total per month, amounts in the Indian
+    format, followed by the list of anomalies.
+    """
+    table = []
+    for month in dict.fromkeys(row['month'] for row in rows):
+        month_rows = [row for row in rows if row['month'] == month]
+        total = {'month': month, 'lender': 'Total', **{key: sum(row[key] for row in month_rows)
+                                                       for key in ('invoices', 'billing_lines', *AMOUNT_KEYS)},
+                 'anomalies': [anomaly for row in month_rows for anomaly in row['anomalies']]}
+        table.extend(month_rows + [total])
+    cells = [[heading for heading, _ in PREVIEW_COLUMNS]]
+    for row in table:
+        cells.append([format_inr(row[key]) if key in AMOUNT_KEYS
+                      else str(len(row['anomalies'])) if key == 'anomaly_count' else str(row[key])
+                      for _, key in PREVIEW_COLUMNS])
+    widths = [max(len(line[index]) for line in cells) for index in range(len(PREVIEW_COLUMNS))]
+    lines = []
+    for line in cells:
+        # Text columns are left aligned, counts and amounts right aligned
+        lines.append('  '.join(cell.ljust(width) if index < 2 else cell.rjust(width)
+                               for index, (cell, width) in enumerate(zip(line, widths))).rstrip())
+        if len(lines) == 1:
+            lines.append('  '.join('-' * width for width in widths))
+    anomalies = [f"{row['month']} {row['lender']}: {anomaly}" for row in rows for anomaly in row['anomalies']]
+    if anomalies:
+        lines.extend(['', f"Anomalies ({len(anomalies)}):", *(f"- {anomaly}" for anomaly in anomalies)])
+    else:
+        lines.extend(['', "No anomalies."])
+    return '\n'.join(lines)
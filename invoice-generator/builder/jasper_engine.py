@@ -0,0 +1,147 @@
+import hashlib
+import os
+
+import jpype
+from pyreportjasper import PyReportJasper
+from pyreportjasper.config import Config
+from pyreportjasper.report import Report
+
+COMPILED_TEMPLATE_DIR_NAME = '.jasper_cache'
+REPORT_LOCALE = 'en_US'
+
+# Per process caches: template digests keyed by (path, mtime, size) and warm engines keyed by compiled template path
+_template_digests = {}
+_engines = {}
+
+
+def get_template_digest(template_path):
+    """
+    Returns the SHA-256 digest of a report template, read once per process for as long as the file is unchanged.
+    """
+    stat = os.stat(template_path)
+    key = (os.path.abspath(template_path), stat.st_mtime_ns, stat.st_size)
+    digest = _template_digests.get(key)
+    if digest is None:
+        with open(template_path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        _template_digests[key] = digest
+    return digest
+
+
+def compile_template(template_path):
+    """
+    Compiles a JRXML template to a .jasper file, reusing the compiled file while the template content is unchanged.
+
+    Compiled templates are stored in .jasper_cache/ under the name '<template>-<content digest>.jasper', so an edited
+    template gets a new file and is compiled again exactly once.
+
+    Parameters:
+    - template_path (str): Path of the .jrxml template.
+
+    Returns:
+    - str: Path of the compiled .jasper file.
+    """
+    template_name = os.path.splitext(os.path.basename(template_path))[0]
+    compiled_dir = os.path.join(os.getcwd(), COMPILED_TEMPLATE_DIR_NAME)
+    compiled_base = os.path.join(compiled_dir, f"{template_name}-{get_template_digest(template_path)[:16]}")
+    compiled_path = f"{compiled_base}.jasper"
+    if not os.path.isfile(compiled_path):
+        os.makedirs(compiled_dir, exist_ok=True)
+        # Compile under a per-process name and move it in place, render workers may compile at the same time
+        temporary_base = f"{compiled_base}_{os.getpid()}"
+        compiler = PyReportJasper()
+        compiler.config(input_file=template_path, output_file=temporary_base, output_formats=['pdf'])
+        compiler.compile(write_jasper=True)
+        os.replace(f"{temporary_base}.jasper", compiled_path)
+    return compiled_path
+
+
+class JasperEngine:
+    """
+    Fills and exports one compiled report many times.
+
+    The compiled report is loaded into the JVM on the first render and kept, so later renders only pay for filling
+    and exporting.
+    """
+
+    def __init__(self, compiled_template_path):
+        self.compiled_template_path = compiled_template_path
+        self._report = None
+
+    def load(self):
+        """
+        Loads the compiled report into the JVM, starting the JVM if this process has none yet.
+        """
+        if self._report is None:
+            config = Config()
+            config.input = self.compiled_template_path
+            config.outputFormats = ['pdf']
+            self._report = Report(config, self.compiled_template_path)
+        return self._report
+
+    def fill(self, parameters):
+        """
+        Fills the report with the given parameters.
+
+        Returns:
+        - JasperPrint: The filled report, to export with export_pdf_batch.
+        """
+        report = self.load()
+        report.config.params = parameters
+        # fill() replaces the locale string with a Java Locale, so set it again for every render
+        report.config.locale = REPORT_LOCALE
+        report.fill()
+        return report.jasper_print
+
+    def render_pdf(self, parameters, output_path):
+        """
+        Fills the report with the given parameters and writes it to '<output_path>.pdf'.
+        """
+        self.fill(parameters)
+        self._report.config.output = output_path
+        self._report.export_pdf()
+
+    def export_pdf_batch(self, jasper_prints, output_path):
+        """
+        Exports several filled reports, one after the other, into the single PDF '<output_path>.pdf'.
+
+        The PDF exporter is set up once for all of them, instead of once per report as with render_pdf. Page numbers
+        are evaluated when a report is filled, so every report keeps its own page numbering.
+
+        Parameters:
+        - jasper_prints (list): The filled reports, see fill.
+        - output_path (str): Path of the PDF without the extension.
+
+        Returns:
+        - list: The number of pages of each report, in the order of jasper_prints.
+        """
+        exporter_inputs = jpype.JClass('java.util.ArrayList')()
+        for jasper_print in jasper_prints:
+            exporter_inputs.add(jasper_print)
+        exporter = jpype.JClass('net.sf.jasperreports.engine.export.JRPdfExporter')()
+        exporter.setExporterInput(
+            jpype.JClass('net.sf.jasperreports.export.SimpleExporterInput').getInstance(exporter_inputs))
+        exporter.setExporterOutput(
+            jpype.JClass('net.sf.jasperreports.export.SimpleOutputStreamExporterOutput')(f"{output_path}.pdf"))
+        exporter.exportReport()
+        return [int(jasper_print.getPages().size()) for jasper_print in jasper_prints]
+
+
+def detach_thread():
+    """
+    Detaches the calling thread from the JVM. A thread other than the main thread that rendered reports must call it
+    before it ends, as the JVM waits for its attached threads when the process exits.
+    """
+    if jpype.isJVMStarted():
+        jpype.java.lang.Thread.detach()
+
+
+def get_jasper_engine(template_path):
+    """
+    Returns the warm engine of this process for a JRXML template, compiling the template if needed.
+    """
+    compiled_template_path = compile_template(template_path)
+    engine = _engines.get(compiled_template_path)
+    if engine is None:
+        engine = _engines[compiled_template_path] = JasperEngine(compiled_template_path)
+    return engine
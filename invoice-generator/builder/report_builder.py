@@ -1,23 +1,39 @@
+import hashlib
+import itertools
+import json
+import multiprocessing
 import os
+import re
 import tempfile
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
-from decimal import Decimal, ROUND_HALF_UP
-
-from babel.numbers import format_currency
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
-from num2words import num2words
-from pyreportjasper import PyReportJasper
-import json
+from decimal import Decimal
+
+from PyPDF2 import PdfReader, PdfWriter
+
+from builder.amount_format import amount_to_words, format_inr, format_inr_batch
+from builder.einvoice_export import DEFAULT_EINVOICE_DIR, DEFAULT_EINVOICE_FORMAT, EInvoiceWriter
+from builder.drive_uploader import DEFAULT_UPLOAD_WORKERS, DriveUploader
+from builder.invoice_fingerprint import get_invoice_fingerprint, get_invoice_key, load_fingerprints, save_fingerprints
+from builder.invoice_ledger import InvoiceLedger
+from builder.jasper_engine import compile_template, get_jasper_engine, get_template_digest
+from data.money import ZERO, round_to_paise, round_to_rupee, to_money
+from tracing import increment, span
 
 INVOICE_DATE_FORMAT = '%d-%b-%y'
 DATE_INPUT_FORMAT = "%Y-%m-%d"
 PAYMENT_DUE_DATE_PERIOD = 15
 SAC_NO = 998319
 INVOICE_BILL_PERIOD_VIEW_FORMAT = "{start_date} - {end_date}"
+REPORT_TEMPLATE_NAME = 'invoice_template_long_service_description.jrxml'
+# Report fields holding absolute paths of images in resources, they depend on where the repository is checked out
+RESOURCE_PATH_FIELDS = ('rbih_logo_path', 'footer_path')
+DEFAULT_COMBINED_PDF_DIR = 'combined_invoices'
+# Characters of an invoice number that cannot go in a file name
+FILE_NAME_UNSAFE_CHARACTERS = re.compile(r'[\\/:*?"<>|]')
 
-late_payment_fee = 500
+late_payment_fee = Decimal('500')
 
 
 def format_to_inr(cost_value) -> str:
@@ -33,96 +49,123 @@ def format_to_inr(cost_value) -> str:
     Returns:
     - str: The formatted currency string without the INR currency symbol.
     """
-    # Format the numeric value as a currency string in INR, using the 'en_IN' locale to get the correct
-    # formatting conventions for Indian Rupees. This includes the currency symbol, decimal places, and grouping.
-    formatted_total_cost = format_currency(cost_value, 'INR', locale='en_IN')
-
-    # Remove the INR currency symbol (₹) from the formatted currency string. This is done by replacing
-    # the symbol with an empty string, leaving only the numeric part of the formatted currency value.
-    formatted_unit_cost_without_symbol = formatted_total_cost.replace('\u20B9', '')
-
-    return formatted_unit_cost_without_symbol
+    # Same output as babel's format_currency(cost_value, 'INR', locale='en_IN') without the symbol, see format_inr
+    return format_inr(cost_value)
 
 
 def round_off_amount(amount):
-    try:
-        amount = Decimal(amount)
-    except (ValueError, TypeError):
-        raise ValueError(f"Invalid amount format: {amount}")
-
-    # Round the amount to the nearest integer
-    rounded_amount = amount.quantize(Decimal('1'), rounding=ROUND_HALF_UP)
-    # Convert the rounded amount to an integer
-    rounded_amount_int = int(rounded_amount)
-    return rounded_amount_int
+    # Round the amount to the nearest integer, half-up
+    return int(round_to_rupee(amount))
 
 
 def get_amount_due(previous_balance, payments_received, adjustments, current_period_charges):
-    return round_off_amount(previous_balance - payments_received - adjustments + current_period_charges)
+    return round_to_rupee(to_money(previous_balance) - to_money(payments_received) - to_money(adjustments)
+                          + to_money(current_period_charges))
 
 
 def get_previous_balance(month, bank_name, payment_details):
-    previous_balance = payment_details.get(f"{month}-{bank_name}")
-    if previous_balance is not None:
-        return previous_balance.get("Previous Balance")
+    payment_detail = payment_details.get(f"{month}-{bank_name}")
+    if payment_detail is not None:
+        return payment_detail.previous_balance
     return 0
 
 
 def get_adjustments(month, bank_name, payment_details):
-    previous_balance = payment_details.get(f"{month}-{bank_name}")
-    if previous_balance is not None:
-        return previous_balance.get("Adjustments")
+    payment_detail = payment_details.get(f"{month}-{bank_name}")
+    if payment_detail is not None:
+        return payment_detail.adjustments
     return 0
 
 
 def get_payments_received(month, bank_name, payment_details):
-    previous_balance = payment_details.get(f"{month}-{bank_name}")
-    if previous_balance is not None:
-        return previous_balance.get("Payment Received")
+    payment_detail = payment_details.get(f"{month}-{bank_name}")
+    if payment_detail is not None:
+        return payment_detail.payment_received
     return 0
 
 
 def get_po_number(month, bank_name, payment_details):
-    previous_balance = payment_details.get(f"{month}-{bank_name}")
-    if previous_balance is not None:
-        return previous_balance.get("PO Number")
+    payment_detail = payment_details.get(f"{month}-{bank_name}")
+    if payment_detail is not None:
+        return payment_detail.po_number
     return "-"
 
 
 def get_tax_rates(org_state):
-    sgst_rate = 0.09
-    cgst_rate = 0.09
-    igst_rate = 0.18
+    sgst_rate = Decimal('0.09')
+    cgst_rate = Decimal('0.09')
+    igst_rate = Decimal('0.18')
     platform_state = "karnataka"
-    return (sgst_rate, cgst_rate, float(0.00)) if org_state.lower() == platform_state.lower() else (
-        float(0.00), float(0.00), igst_rate)
-
+    return (sgst_rate, cgst_rate, ZERO) if org_state.lower() == platform_state.lower() else (
+        ZERO, ZERO, igst_rate)
 
-def generate_report_using_jasper(parameters, bill_summaries, report_name, target_folder_name):
-    # Create an instance of PyReportJasper
-    report = PyReportJasper()
 
-    # Iterate over the list and construct the new keys
-    for index, item in enumerate(bill_summaries, start=1):  # start=1 for 1-based indexing
-        for key, value in item.items():
-            new_key = f"{key}_{index}"  # Create new key
-            print(new_key)
-            parameters[new_key] = value  # Add to the new dictionary
+def get_report_template_path():
     current_dir = os.getcwd()
     resources_path = os.path.join(current_dir, 'resources')
-    report_template_path = os.path.join(resources_path, 'invoice_template_long_service_description.jrxml')
+    return os.path.join(resources_path, REPORT_TEMPLATE_NAME)
+
+
+def get_billing_lines_json(bill_summaries):
+    """
+    Serialises the billing lines of an invoice for the JSON data source of the itemized statement.
 
-    output_report_path = os.path.join(tempfile.gettempdir(), report_name)
+    Every value is written as text, the fields of the 'billing_lines' dataset of the template are strings.
+    """
+    return json.dumps([{key: str(value) for key, value in item.items()} for item in bill_summaries],
+                      ensure_ascii=False)
+
+
+def get_report_parameters(parameters, bill_summaries):
+    # The billing lines go to the template as one JSON data source that its itemized statement list iterates, so an
+    # invoice can have any number of lines without a parameter per line and column
+    parameters = dict(parameters)
+    parameters["billing_lines_json"] = get_billing_lines_json(bill_summaries)
     parameters["net.sf.jasperreports.awt.ignore.missing.font"] = "true"
     parameters["JASPER_REPORTS_FONT_PATH"] = "/System/Library/Fonts:/Library/Fonts:~/Library/Fonts"
-    report.process(
-        input_file=report_template_path,
-        output_file=output_report_path,
-        format_list=["pdf"],
-        parameters=parameters,
-    )
+    return parameters
+
+
+def get_report_output_path(report_name, output_dir):
+    return os.path.join(output_dir, report_name)
+
+
+def get_run_output_dir():
+    """
+    Creates the directory the PDFs of a run are rendered into. Every run gets its own, so a run never writes over a
+    PDF that another run (or another render worker) is still uploading.
+    """
+    return tempfile.mkdtemp(prefix='invoices_')
+
 
-    upload_file_to_drive(file_path= f"{output_report_path}.pdf", target_folder_name=target_folder_name)
+def generate_report_using_jasper(parameters, bill_summaries, report_name, target_folder_name, output_dir):
+    output_report_path = get_report_output_path(report_name, output_dir)
+    # The template is compiled once per content version and the engine of this process stays loaded between invoices
+    get_jasper_engine(get_report_template_path()).render_pdf(get_report_parameters(parameters, bill_summaries),
+                                                             output_report_path)
+    return f"{output_report_path}.pdf"
+
+
+def split_pdf(pdf_path, page_counts, output_paths):
+    """
+    Splits a PDF into consecutive parts.
+
+    Parameters:
+    - pdf_path (str): The PDF to split.
+    - page_counts (list): The number of pages of each part, in order.
+    - output_paths (list): The path each part is written to, in the same order.
+    """
+    reader = PdfReader(pdf_path)
+    if sum(page_counts) != len(reader.pages):
+        raise ValueError(f"{pdf_path} has {len(reader.pages)} pages, expected {sum(page_counts)}")
+    start = 0
+    for page_count, output_path in zip(page_counts, output_paths):
+        writer = PdfWriter()
+        for page in reader.pages[start:start + page_count]:
+            writer.add_page(page)
+        with open(output_path, "wb") as f:
+            writer.write(f)
+        start += page_count
 
 
 def _strip_decimal_parts(cost):
@@ -132,18 +175,14 @@ def _strip_decimal_parts(cost):
     return cost
 
 
+def _to_json_amount(amount):
+    # JSON has no decimal type, amounts already rounded to the paisa are written as numbers with at most two decimals
+    return float(round_to_paise(amount))
+
+
 def convert_amount_to_words(amount):
-    # Convert the amount to words in Indian currency (INR)
-    amount_in_words = num2words(amount, to='currency', lang='en_IN')
-    # Replace "euro" with "rupees" and "cents" with "paise"
-    amount_in_words = amount_in_words.replace("euro", "rupees").replace("cents", "paise")
-    # Remove "zero paise"
-    amount_in_words = amount_in_words.replace(" zero paise", "")
-    # Remove commas
-    amount_in_words = amount_in_words.replace(',', '')
-    # Capitalize the first letter
-    amount_in_words = amount_in_words.capitalize()
-    return str(amount_in_words)
+    # Convert the amount to words in Indian currency (INR), memoised, see amount_to_words
+    return amount_to_words(amount)
 
 
 def get_future_date_ist(days, format_str, current_date_ist):
@@ -226,7 +265,49 @@ def get_month_start_end_dates_for_report_name(input_date):
     return f"{start_date_str}_{end_date_str}"
 
 
-def generate_report(invoices_for_month, invoice_summaries, payment_details, invoice_date, organization_application):
+def build_invoice(invoices_for_month, invoice_summary, payment_details, invoice_date, organization_application):
+    """
+    Computes the taxes, amounts due and report fields of one invoice (see compute_invoice) with the hashes that tell
+    whether it changed, without rendering anything. The hashes cover the report template, which is read here.
+
+    Parameters:
+    - invoices_for_month, invoice_summary, payment_details, invoice_date, organization_application: See
+      compute_invoice.
+
+    Returns:
+    - dict: The invoice of compute_invoice, plus 'content_hash' (see get_invoice_content_hash), 'invoice_key' and
+            'fingerprint' (see get_invoice_fingerprint).
+    """
+    invoice = compute_invoice(invoices_for_month, invoice_summary, payment_details, invoice_date,
+                              organization_application)
+    organization_name = invoice_summary.get("organization").get("name")
+    invoice["content_hash"] = get_invoice_content_hash(invoice["fields"], invoice["billing_summary"])
+    invoice["invoice_key"] = get_invoice_key(invoice_summary)
+    invoice["fingerprint"] = get_invoice_fingerprint(invoice_summary,
+                                                     payment_details.get(f"{invoices_for_month}-{organization_name}"),
+                                                     invoice["invoice_date"],
+                                                     get_template_digest(get_report_template_path()))
+    return invoice
+
+
+def compute_invoice(invoices_for_month, invoice_summary, payment_details, invoice_date, organization_application):
+    """
+    Computes the taxes, amounts due, report fields and NIC payload of one invoice, without reading the report
+    template, so a dry run (see builder.invoice_preview) does not need Jasper or its resources.
+
+    Parameters:
+    - invoices_for_month (str): The billed month, e.g. 'October-2025'.
+    - invoice_summary (dict): A combined invoice summary, see combine_invoice_summaries_and_add_billing_summary.
+    - payment_details (dict): Payment details keyed by '<Month - Year>-<Bank name>'.
+    - invoice_date (str): The invoice date, formatted as 'dd-mm-yyyy'.
+    - organization_application (dict): Application name keyed by bank name.
+
+    Returns:
+    - dict: The invoice with 'report_name', 'application_name', 'fields' (report parameters), 'billing_summary',
+            'json_data' (NIC e-invoice payload), and for the invoice ledger the 'month', 'invoice_number',
+            'invoice_date', 'amounts' (Decimal taxes and amounts due, see AMOUNT_COLUMNS of builder.invoice_ledger)
+            and 'invoice_summary'.
+    """
     start_date, end_date = get_month_start_end_dates(invoices_for_month)
     current_dir = os.getcwd()
     resources_path = os.path.join(current_dir, 'resources')
@@ -236,242 +317,471 @@ def generate_report(invoices_for_month, invoice_summaries, payment_details, invo
     report_footer_file_path = os.path.abspath(report_footer)
     invoice_date = datetime.strptime(invoice_date, "%d-%m-%Y")
 
-    for invoice_summary in invoice_summaries:
-        sgst_rate, cgst_rate, igst_rate = get_tax_rates(invoice_summary.get("organization").get("state"))
-        unformatted_amount = Decimal(invoice_summary.get("transaction_summary").get("total_cost"))
-        # unformatted_amount = Decimal(invoice_summary.get("transaction_summary").get("successful_transactions") * invoice_summary.get("transaction_summary").get("unit_cost"))
-        formatted_amount = format_to_inr(unformatted_amount)
-        sgst, cgst, igst = unformatted_amount * Decimal(sgst_rate), unformatted_amount * Decimal(
-            cgst_rate), unformatted_amount * Decimal(igst_rate)
-        total_tax = round_off_amount(round(sgst, 2)) + round_off_amount(round(cgst, 2)) + round_off_amount(round(igst, 2))
-        total_tax = round(total_tax, 2)
-        total_due = unformatted_amount + total_tax
-        roundedoff_total_due = round_off_amount(total_due)
-        previous_balance = get_previous_balance(invoices_for_month, invoice_summary.get("organization").get("name"),
-                                                payment_details)
-        po_number = get_po_number(invoices_for_month, invoice_summary.get("organization").get("name"),
-                                  payment_details)
-        amount_due = float(previous_balance) + float(roundedoff_total_due)
-        txt_credit_limit = format_to_inr(0)
-        payments_received = get_payments_received(invoices_for_month, invoice_summary.get("organization").get("name"),
-                                                  payment_details)
-        txt_pmnt_received = format_to_inr(payments_received)
-        adjustments = get_adjustments(invoices_for_month, invoice_summary.get("organization").get("name"),
-                                      payment_details)
-        po_number = get_po_number(invoices_for_month, invoice_summary.get("organization").get("name"), payment_details)
-        txt_pmnt_adj = format_to_inr(adjustments)
-        txt_prev_balance = format_to_inr(previous_balance)
-        txt_curr_period_charges = format_to_inr(roundedoff_total_due)
-        payment_due = get_amount_due(float(previous_balance), float(payments_received), float(adjustments),
-                                     roundedoff_total_due)
-        txt_pmnt_due = txt_curr_period_charges
-        txt_sgst = format_to_inr(round_off_amount(round(sgst, 2)))
-        txt_cgst = format_to_inr(round_off_amount(round(cgst, 2)))
-        txt_igst = format_to_inr(round_off_amount(round(igst, 2)))
-        pmnt_after_due_date = roundedoff_total_due + Decimal(late_payment_fee)
-        roundedoff_pmnt_after_due_date = round_off_amount(pmnt_after_due_date)
-        txt_pmnt_after_due_date_2 = format_to_inr(roundedoff_pmnt_after_due_date)
-        txt_total_curr_period_charges = format_to_inr(payment_due)
-        txt_pmnt_after_due_date = format_to_inr(late_payment_fee)
-        txt_taxable_value = formatted_amount
-        cbill_date = invoice_date
-        cbill_date = cbill_date.strftime(INVOICE_DATE_FORMAT)
-        pan_number = invoice_summary.get("organization").get("pan_number")
-        address = invoice_summary.get("organization").get("address")
-        gstin = invoice_summary.get("organization").get("gstin")
-        organization_name = invoice_summary.get("organization").get("name")
-        total_transactions = invoice_summary.get("transaction_summary").get("total_transactions")
-        total_successful_transactions = invoice_summary.get("transaction_summary").get("successful_transactions")
-        total_failed_transactions = invoice_summary.get("transaction_summary").get("failed_transactions")
-        state = invoice_summary.get("organization").get("state")
-        invoice_number = invoice_summary.get("invoice_number")
-        fields = {
-            'txt_bill_address': address,
-            'txt_bill_gstn': gstin,
-            'txt_bill_name': str(organization_name),
-            'txt_bill_pan': pan_number,
-            'txt_bill_po_number': po_number if po_number is not None else "-",
-            'txt_amount_words': convert_amount_to_words(Decimal(roundedoff_total_due)),
-            'txt_payment_due_date': str(
-                get_future_date_ist(int(PAYMENT_DUE_DATE_PERIOD), INVOICE_DATE_FORMAT, invoice_date)),
-            'txt_credit_limit': _strip_decimal_parts(txt_credit_limit),
-            'txt_state_code': 'No',
-            'txt_prev_balance': _strip_decimal_parts(txt_prev_balance),
-            'txt_pmnt_received': _strip_decimal_parts(txt_pmnt_received),
-            'txt_pmnt_adj': _strip_decimal_parts(txt_pmnt_adj),
-            'txt_curr_period_charges': _strip_decimal_parts(txt_curr_period_charges),
-            'txt_pmnt_due': _strip_decimal_parts(txt_total_curr_period_charges),  # amount due
-            'txt_pmnt_after_due_date': _strip_decimal_parts(txt_pmnt_after_due_date),  # late payment fee
-            'txt_total_transactions_count': total_transactions,
-            'txt_total_successful_transactions': total_successful_transactions,
-            'txt_total_failed_transactions': total_failed_transactions,
-            'txt_invoice_number': invoice_number,  # self._get_invoice_number(invoice_number, isum.invoice_number),
-            'txt_bill_period': INVOICE_BILL_PERIOD_VIEW_FORMAT.format(
-                start_date=get_formatted_date(start_date, DATE_INPUT_FORMAT,
-                                              INVOICE_DATE_FORMAT),
-                end_date=get_formatted_date(end_date, DATE_INPUT_FORMAT, INVOICE_DATE_FORMAT)),
-            # 'txt_bill_period': '01-Jan-25 - 31-Mar-25',
-            # 'txt_bill_period': 'Till December 2024',
-            'txt_bill_date': cbill_date,
-            'txt_total_curr_period_charges': _strip_decimal_parts(txt_pmnt_due),
-            'txt_sgst': _strip_decimal_parts(txt_sgst),
-            'txt_cgst': _strip_decimal_parts(txt_cgst),
-            'txt_igst': _strip_decimal_parts(txt_igst),
-            'txt_pmnt_after_due_date_2': _strip_decimal_parts(str(txt_pmnt_after_due_date_2)),
-            # total payable after due date
-            'txt_gst_number': gstin,
-            'txt_sac_no': SAC_NO,
-            'txt_liable_to_reverse_charge': "No",
-            'txt_service_description': "Other Information Technology Services",
-            'txt_late_fee': "500",
-            'txt_place_of_supply': state,
-            'txt_taxable_value': _strip_decimal_parts(txt_taxable_value),
-            'rbih_logo_path': rbih_logo_file_path,
-            'footer_path': report_footer_file_path
-        }
-        application_name = organization_application.get(organization_name)
-        start_end_date_for_report_name = get_month_start_end_dates_for_report_name(invoices_for_month)
-        provider = invoice_summary.get("transaction_summary").get("billing_summary")[0].get("provider")
-        report_name = f"{application_name}_INVOICE_{start_end_date_for_report_name}_{provider.upper()}"
-
-        nic_payload_version = "1.1"
-        invoice_type: str = "INV"
-        supply_type: str = "B2B"
-        hsn_code: str = "998319"
-
-        json_data = {
-            "Version": nic_payload_version,
-            "TranDtls": {
-                "TaxSch": "GST",
-                "SupTyp": supply_type,
-                "IgstOnIntra": "N",
-                "RegRev": "N",
-                "EcmGstin": None,
-            },
-            "DocDtls": {
-                "Typ": invoice_type,
-                "No": invoice_number,
-                "Dt": fields["txt_bill_date"],
-            },
-            "SellerDtls": {
-                "Gstin": "29AAKCR9018A1ZB",
-                "LglNm": "RESERVE BANK INNOVATION HUB",
-                "Addr1": "Regd. Office:- Keonics-K wing, 4th Floor 27th Main, Sector 1,",
-                "Addr2": "7TH Cross Road,HSR Layout",
-                "Loc": "Bengaluru",
-                "Pin": 560102,
-                "Stcd": "29",
-                "Ph": "9986032787",
-                "Em": "swethabelagodu@rbihub.in"
-            },
-            "BuyerDtls": {
-                "Gstin": fields["txt_gst_number"],
-                "LglNm": fields["txt_bill_name"],
-                "Addr1": fields["txt_bill_address"],
-                "Addr2": "",
-                "Loc": "",
-                "Pin": "",
-                "Pos": "",
-                "Stcd": "",
-                "Ph": "",
-                "Em": "",
-            },
-            "ValDtls": {
-                "AssVal": fields.get("txt_taxable_value", 0),
-                "IgstVal": fields.get("txt_igst", 0),
-                "CgstVal": fields.get("txt_cgst", 0),
-                "SgstVal": fields.get("txt_sgst", 0),
-                "CesVal": 0,
-                "StCesVal": 0,
+    sgst_rate, cgst_rate, igst_rate = get_tax_rates(invoice_summary.get("organization").get("state"))
+    unformatted_amount = round_to_paise(invoice_summary.get("transaction_summary").get("total_cost"))
+    # unformatted_amount = Decimal(invoice_summary.get("transaction_summary").get("successful_transactions") * invoice_summary.get("transaction_summary").get("unit_cost"))
+    formatted_amount = format_to_inr(unformatted_amount)
+    # Every tax is rounded to the rupee exactly once; the PDF and the NIC JSON both use these rounded values
+    sgst, cgst, igst = (round_to_rupee(unformatted_amount * tax_rate)
+                        for tax_rate in (sgst_rate, cgst_rate, igst_rate))
+    total_tax = sgst + cgst + igst
+    total_due = unformatted_amount + total_tax
+    roundedoff_total_due = round_to_rupee(total_due)
+    previous_balance = to_money(get_previous_balance(invoices_for_month,
+                                                     invoice_summary.get("organization").get("name"), payment_details))
+    txt_credit_limit = format_to_inr(ZERO)
+    payments_received = to_money(get_payments_received(invoices_for_month,
+                                                       invoice_summary.get("organization").get("name"),
+                                                       payment_details))
+    txt_pmnt_received = format_to_inr(payments_received)
+    adjustments = to_money(get_adjustments(invoices_for_month, invoice_summary.get("organization").get("name"),
+                                           payment_details))
+    po_number = get_po_number(invoices_for_month, invoice_summary.get("organization").get("name"), payment_details)
+    txt_pmnt_adj = format_to_inr(adjustments)
+    txt_prev_balance = format_to_inr(previous_balance)
+    txt_curr_period_charges = format_to_inr(roundedoff_total_due)
+    payment_due = get_amount_due(previous_balance, payments_received, adjustments, roundedoff_total_due)
+    txt_pmnt_due = txt_curr_period_charges
+    txt_sgst, txt_cgst, txt_igst = format_inr_batch((sgst, cgst, igst))
+    roundedoff_pmnt_after_due_date = roundedoff_total_due + late_payment_fee
+    txt_pmnt_after_due_date_2 = format_to_inr(roundedoff_pmnt_after_due_date)
+    txt_total_curr_period_charges = format_to_inr(payment_due)
+    txt_pmnt_after_due_date = format_to_inr(late_payment_fee)
+    txt_taxable_value = formatted_amount
+    cbill_date = invoice_date
+    cbill_date = cbill_date.strftime(INVOICE_DATE_FORMAT)
+    pan_number = invoice_summary.get("organization").get("pan_number")
+    address = invoice_summary.get("organization").get("address")
+    gstin = invoice_summary.get("organization").get("gstin")
+    organization_name = invoice_summary.get("organization").get("name")
+    total_transactions = invoice_summary.get("transaction_summary").get("total_transactions")
+    total_successful_transactions = invoice_summary.get("transaction_summary").get("successful_transactions")
+    total_failed_transactions = invoice_summary.get("transaction_summary").get("failed_transactions")
+    state = invoice_summary.get("organization").get("state")
+    invoice_number = invoice_summary.get("invoice_number")
+    fields = {
+        'txt_bill_address': address,
+        'txt_bill_gstn': gstin,
+        'txt_bill_name': str(organization_name),
+        'txt_bill_pan': pan_number,
+        'txt_bill_po_number': po_number if po_number is not None else "-",
+        'txt_amount_words': convert_amount_to_words(roundedoff_total_due),
+        'txt_payment_due_date': str(
+            get_future_date_ist(int(PAYMENT_DUE_DATE_PERIOD), INVOICE_DATE_FORMAT, invoice_date)),
+        'txt_credit_limit': _strip_decimal_parts(txt_credit_limit),
+        'txt_state_code': 'No',
+        'txt_prev_balance': _strip_decimal_parts(txt_prev_balance),
+        'txt_pmnt_received': _strip_decimal_parts(txt_pmnt_received),
+        'txt_pmnt_adj': _strip_decimal_parts(txt_pmnt_adj),
+        'txt_curr_period_charges': _strip_decimal_parts(txt_curr_period_charges),
+        'txt_pmnt_due': _strip_decimal_parts(txt_total_curr_period_charges),  # amount due
+        'txt_pmnt_after_due_date': _strip_decimal_parts(txt_pmnt_after_due_date),  # late payment fee
+        'txt_total_transactions_count': total_transactions,
+        'txt_total_successful_transactions': total_successful_transactions,
+        'txt_total_failed_transactions': total_failed_transactions,
+        'txt_invoice_number': invoice_number,  # self._get_invoice_number(invoice_number, isum.invoice_number),
+        'txt_bill_period': INVOICE_BILL_PERIOD_VIEW_FORMAT.format(
+            start_date=get_formatted_date(start_date, DATE_INPUT_FORMAT,
+                                          INVOICE_DATE_FORMAT),
+            end_date=get_formatted_date(end_date, DATE_INPUT_FORMAT, INVOICE_DATE_FORMAT)),
+        # 'txt_bill_period': '01-Jan-25 - 31-Mar-25',
+        # 'txt_bill_period': 'Till December 2024',
+        'txt_bill_date': cbill_date,
+        'txt_total_curr_period_charges': _strip_decimal_parts(txt_pmnt_due),
+        'txt_sgst': _strip_decimal_parts(txt_sgst),
+        'txt_cgst': _strip_decimal_parts(txt_cgst),
+        'txt_igst': _strip_decimal_parts(txt_igst),
+        'txt_pmnt_after_due_date_2': _strip_decimal_parts(str(txt_pmnt_after_due_date_2)),
+        # total payable after due date
+        'txt_gst_number': gstin,
+        'txt_sac_no': SAC_NO,
+        'txt_liable_to_reverse_charge': "No",
+        'txt_service_description': "Other Information Technology Services",
+        'txt_late_fee': "500",
+        'txt_place_of_supply': state,
+        'txt_taxable_value': _strip_decimal_parts(txt_taxable_value),
+        'rbih_logo_path': rbih_logo_file_path,
+        'footer_path': report_footer_file_path
+    }
+    application_name = organization_application.get(organization_name)
+    start_end_date_for_report_name = get_month_start_end_dates_for_report_name(invoices_for_month)
+    provider = invoice_summary.get("transaction_summary").get("billing_summary")[0].get("provider")
+    # The invoice number tells apart the invoices of a lender in the same month, whose PDFs go to the same Drive folder
+    report_name = (f"{application_name}_INVOICE_{start_end_date_for_report_name}_{provider.upper()}_"
+                   f"{FILE_NAME_UNSAFE_CHARACTERS.sub('-', str(invoice_number))}")
+
+    nic_payload_version = "1.1"
+    invoice_type: str = "INV"
+    supply_type: str = "B2B"
+    hsn_code: str = "998319"
+
+    json_data = {
+        "Version": nic_payload_version,
+        "TranDtls": {
+            "TaxSch": "GST",
+            "SupTyp": supply_type,
+            "IgstOnIntra": "N",
+            "RegRev": "N",
+            "EcmGstin": None,
+        },
+        "DocDtls": {
+            "Typ": invoice_type,
+            "No": invoice_number,
+            "Dt": fields["txt_bill_date"],
+        },
+        "SellerDtls": {
+            "Gstin": "29AAKCR9018A1ZB",
+            "LglNm": "RESERVE BANK INNOVATION HUB",
+            "Addr1": "Regd. Office:- Keonics-K wing, 4th Floor 27th Main, Sector 1,",
+            "Addr2": "7TH Cross Road,HSR Layout",
+            "Loc": "Bengaluru",
+            "Pin": 560102,
+            "Stcd": "29",
+            "Ph": "9986032787",
+            "Em": "swethabelagodu@rbihub.in"
+        },
+        "BuyerDtls": {
+            "Gstin": fields["txt_gst_number"],
+            "LglNm": fields["txt_bill_name"],
+            "Addr1": fields["txt_bill_address"],
+            "Addr2": "",
+            "Loc": "",
+            "Pin": "",
+            "Pos": "",
+            "Stcd": "",
+            "Ph": "",
+            "Em": "",
+        },
+        "ValDtls": {
+            "AssVal": _to_json_amount(unformatted_amount),
+            "IgstVal": _to_json_amount(igst),
+            "CgstVal": _to_json_amount(cgst),
+            "SgstVal": _to_json_amount(sgst),
+            "CesVal": 0,
+            "StCesVal": 0,
+            "Discount": 0,
+            "OthChrg": 0,
+            "RndOffAmt": _to_json_amount(roundedoff_total_due - total_due),
+            "TotInvVal": _to_json_amount(roundedoff_total_due),
+        },
+        "RefDtls": {"InvRm": "NICGEPP2.0"},
+        "ItemList": [
+            {
+                "SlNo": "1",
+                "PrdDesc": "Other Information Technology",
+                "IsServc": "Y",
+                "HsnCd": "998319",
+                "Qty": 1,
+                "FreeQty": 0,
+                "Unit": "UNT",
+                "UnitPrice": _to_json_amount(unformatted_amount),
+                "TotAmt": _to_json_amount(unformatted_amount),
                 "Discount": 0,
+                "PreTaxVal": 0,
+                "AssAmt": _to_json_amount(unformatted_amount),
+                "GstRt": 18,
+                "IgstAmt": _to_json_amount(igst),
+                "CgstAmt": _to_json_amount(cgst),
+                "SgstAmt": _to_json_amount(sgst),
+                "CesRt": 0,
+                "CesAmt": 0,
+                "CesNonAdvlAmt": 0,
+                "StateCesRt": 0,
+                "StateCesAmt": 0,
+                "StateCesNonAdvlAmt": 0,
                 "OthChrg": 0,
-                "RndOffAmt": 0,
-                "TotInvVal": fields.get("txt_taxable_value", 0),
-            },
-            "RefDtls": {"InvRm": "NICGEPP2.0"},
-            "ItemList": [
-                {
-                    "SlNo": "1",
-                    "PrdDesc": "Other Information Technology",
-                    "IsServc": "Y",
-                    "HsnCd": "998319",
-                    "Qty": 1,
-                    "FreeQty": 0,
-                    "Unit": "UNT",
-                    "UnitPrice": fields.get("txt_taxable_value", 0),
-                    "TotAmt": fields.get("txt_taxable_value", 0),
-                    "Discount": 0,
-                    "PreTaxVal": 0,
-                    "AssAmt": fields.get("txt_taxable_value", 0),
-                    "GstRt": 18,
-                    "IgstAmt": float(igst),
-                    "CgstAmt": float(cgst),
-                    "SgstAmt": float(sgst),
-                    "CesRt": 0,
-                    "CesAmt": 0,
-                    "CesNonAdvlAmt": 0,
-                    "StateCesRt": 0,
-                    "StateCesAmt": 0,
-                    "StateCesNonAdvlAmt": 0,
-                    "OthChrg": 0,
-                    "TotItemVal": fields.get("txt_total_curr_period_charges", 0),
-                }
-            ],
-        }
-        with open(f"{report_name}.json", "w", encoding="utf-8") as f:
-            json.dump(json_data, f, ensure_ascii=False, indent=4)
-        generate_report_using_jasper(fields, invoice_summary.get("transaction_summary").get("billing_summary"),
-                                     report_name, application_name)
-
-
-# Function to check if a folder exists and return its ID
-def get_folder_id(service, folder_name, parent_folder_id=None):
-    query = f"name = '{folder_name}' and mimeType = 'application/vnd.google-apps.folder'"
-    if parent_folder_id:
-        query += f" and '{parent_folder_id}' in parents"
-
-    results = service.files().list(q=query, spaces='drive', fields="files(id, name)").execute()
-    items = results.get('files', [])
-
-    if items:
-        return items[0]['id']
-    return None
-
-
-# Function to create a folder
-def create_folder(service, folder_name, parent_folder_id=None):
-    folder_metadata = {
-        'name': folder_name,
-        'mimeType': 'application/vnd.google-apps.folder'
+                "TotItemVal": _to_json_amount(total_due),
+            }
+        ],
+    }
+    billing_summary = invoice_summary.get("transaction_summary").get("billing_summary")
+    return {
+        "report_name": report_name,
+        "application_name": application_name,
+        "fields": fields,
+        "billing_summary": billing_summary,
+        "json_data": json_data,
+        "month": invoices_for_month,
+        "invoice_number": invoice_number,
+        "invoice_date": invoice_date.strftime("%d-%m-%Y"),
+        "amounts": {
+            "taxable_value": unformatted_amount,
+            "sgst": sgst,
+            "cgst": cgst,
+            "igst": igst,
+            "total_tax": total_tax,
+            "current_period_charges": roundedoff_total_due,
+            "previous_balance": previous_balance,
+            "payments_received": payments_received,
+            "adjustments": adjustments,
+            "amount_due": payment_due,
+        },
+        "invoice_summary": invoice_summary,
     }
-    if parent_folder_id:
-        folder_metadata['parents'] = [parent_folder_id]
 
-    folder = service.files().create(body=folder_metadata, fields='id').execute()
-    return folder.get('id')
 
+def get_invoice_content_hash(fields, billing_summary):
+    """
+    Hashes everything that ends up in an invoice PDF: the report fields, the billing lines and the template version.
+
+    Rendered PDFs embed their creation time, so two renders of the same invoice never have the same bytes; this hash
+    is what identifies an unchanged invoice on Drive instead. The paths of the resource images are left out, so the
+    hash is the same on every machine and checkout.
+    """
+    fields = {name: value for name, value in fields.items() if name not in RESOURCE_PATH_FIELDS}
+    content = json.dumps({"fields": fields, "billing_summary": billing_summary,
+                          "template": get_template_digest(get_report_template_path())},
+                         sort_keys=True, default=str)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
 
-def upload_file_to_drive(file_path, target_folder_name):
-    current_dir = os.getcwd()
-    creds_template_path = os.path.join(os.path.join(current_dir, 'creds'),
-                                       'invoice-generation-443205-60eafd4715eb.json')
-    credentials = service_account.Credentials.from_service_account_file(
-        creds_template_path, scopes=["https://www.googleapis.com/auth/drive"]
-    )
 
-    # Build the Google Drive service object.
-    google_drive_service = build('drive', 'v3', credentials=credentials)
+def render_invoice(invoice, output_dir):
+    """
+    Renders the PDF of an invoice built by build_invoice with Jasper into output_dir (see get_run_output_dir). Its NIC
+    JSON is written by the e-invoice export of generate_report, see builder.einvoice_export.
+
+    This is a module level function so that it can run in a worker process.
+
+    Returns:
+    - dict: The 'report_name', 'application_name' (target Drive folder), 'pdf_path' and 'content_hash' of the
+            rendered invoice.
+    """
+    report_name = invoice["report_name"]
+    pdf_path = generate_report_using_jasper(invoice["fields"], invoice["billing_summary"], report_name,
+                                            invoice["application_name"], output_dir)
+    return {"report_name": report_name, "application_name": invoice["application_name"], "pdf_path": pdf_path,
+            "content_hash": invoice["content_hash"]}
+
+
+def render_invoice_batch(invoices, combined_pdf_path, output_dir):
+    """
+    Renders the PDFs of several invoices built by build_invoice with a single PDF export.
+
+    Every invoice is filled on its own, then all of them are exported one after the other into the combined PDF
+    '<combined_pdf_path>.pdf' for review. That PDF is split into one PDF per invoice, at the path in output_dir that
+    render_invoice writes it to.
+
+    Returns:
+    - list: The render result of each invoice as with render_invoice, plus the path of the combined PDF under
+            'combined_pdf_path'.
+    """
+    engine = get_jasper_engine(get_report_template_path())
+    jasper_prints = []
+    for invoice in invoices:
+        with span('fill', lender=invoice["application_name"]):
+            jasper_prints.append(engine.fill(get_report_parameters(invoice["fields"], invoice["billing_summary"])))
+    with span('combined_export', invoices=len(invoices)):
+        page_counts = engine.export_pdf_batch(jasper_prints, combined_pdf_path)
+    pdf_paths = [f"{get_report_output_path(invoice['report_name'], output_dir)}.pdf" for invoice in invoices]
+    with span('split'):
+        split_pdf(f"{combined_pdf_path}.pdf", page_counts, pdf_paths)
+    return [{"report_name": invoice["report_name"], "application_name": invoice["application_name"],
+             "pdf_path": pdf_path, "content_hash": invoice["content_hash"],
+             "combined_pdf_path": f"{combined_pdf_path}.pdf"} for invoice, pdf_path in zip(invoices, pdf_paths)]
+
+
+def build_invoices(invoices_for_month, invoice_summaries, payment_details, invoice_date, organization_application):
+    """
+    Builds the invoices of a month one by one as invoice_summaries yields them, see build_invoice.
+    """
+    for invoice_summary in invoice_summaries:
+        # The span only covers building, not the work on the invoice after it is yielded
+        with span('build_invoice', lender=invoice_summary.get("application_name")):
+            invoice = build_invoice(invoices_for_month, invoice_summary, payment_details, invoice_date,
+                                    organization_application)
+        increment('invoices_built')
+        yield invoice
+
+
+def skip_unchanged_invoices(invoices, fingerprints, unchanged_invoice_keys):
+    """
+    Leaves out the invoices whose fingerprint is the stored one, appending their keys to unchanged_invoice_keys.
+    """
+    for invoice in invoices:
+        if fingerprints.get(invoice["invoice_key"]) == invoice["fingerprint"]:
+            unchanged_invoice_keys.append(invoice["invoice_key"])
+            increment('invoices_unchanged')
+        else:
+            yield invoice
+
 
-    parent_folder_id = "1ixhKIqNF1ep-JmjAl887VEGYepQjDgy2"
+def record_rendered_invoice(invoice, rendered_invoice, einvoice_writer, ledger):
+    """
+    Writes the NIC payload of a rendered invoice (its path goes under 'json_path' of rendered_invoice) and records the
+    invoice in the ledger.
 
-    # Check if the folder exists, create it if not
-    folder_id = get_folder_id(google_drive_service, target_folder_name, parent_folder_id)
-    if not folder_id:
-        folder_id = create_folder(google_drive_service, target_folder_name, parent_folder_id)
+    Returns:
+    - tuple: The invoice key and fingerprint (see builder.invoice_fingerprint) and the ledger key (lender, month,
+             invoice number) of the invoice, all that complete_month needs once it is uploaded.
+    """
+    with span('json_write', lender=invoice["application_name"]):
+        rendered_invoice["json_path"] = einvoice_writer.write(invoice["report_name"], invoice["json_data"])
+    ledger.record_invoice(invoice, rendered_invoice)
+    increment('invoices_rendered')
+    return (invoice["invoice_key"], invoice["fingerprint"],
+            (invoice["invoice_summary"].get("organization").get("name"), invoice["month"], invoice["invoice_number"]))
+
+
+def complete_month(invoices_for_month, fingerprints, rendered_invoices, rendered_keys, upload_results, ledger):
+    """
+    Records the upload results of the rendered invoices of a month and prints the totals of the month.
 
-    file_metadata = {'name': os.path.basename(file_path), 'parents': [folder_id]}
-    media = MediaFileUpload(file_path, resumable=True)
+    Every upload result goes into the ledger and under 'upload' of its render result. The fingerprint of every invoice
+    that was not a failed upload is stored, so an incremental run skips it next time.
 
-    # Upload the file to Google Drive
-    file = google_drive_service.files().create(body=file_metadata, media_body=media, fields='id').execute()
-    print(f"File uploaded successfully! File ID: {file.get('id')}")
+    Parameters:
+    - invoices_for_month (str): The billed month, e.g. 'October-2025'.
+    - fingerprints (dict): The stored fingerprints of the month, see load_fingerprints.
+    - rendered_invoices (list): The render results, see render_invoice.
+    - rendered_keys (list): The keys of each rendered invoice, see record_rendered_invoice.
+    - upload_results (list): The upload result of each rendered invoice, see DriveUploader.upload.
+    - ledger (InvoiceLedger): The invoice ledger.
+    """
+    for (_, _, ledger_key), upload_result in zip(rendered_keys, upload_results):
+        ledger.record_upload(*ledger_key, upload_result)
+    if not rendered_invoices:
+        return
+    for (invoice_key, fingerprint, _), rendered_invoice, upload_result in zip(rendered_keys, rendered_invoices,
+                                                                              upload_results):
+        rendered_invoice["upload"] = upload_result
+        if upload_result["status"] != "failed":
+            fingerprints[invoice_key] = fingerprint
+    save_fingerprints(invoices_for_month, fingerprints)
+    upload_statuses = Counter(upload_result["status"] for upload_result in upload_results)
+    print(f"{len(rendered_invoices)} invoices rendered, {upload_statuses['created']} uploaded, "
+          f"{upload_statuses['updated']} updated, {upload_statuses['skipped']} unchanged, "
+          f"{upload_statuses['failed']} failed uploads")
+
+
+def _render_invoices(invoices, workers, output_dir):
+    # Yields (invoice, render result) pairs in the order of invoices while invoices are still being built
+    invoices = iter(invoices)
+    first_invoice = next(invoices, None)
+    if first_invoice is None:
+        return
+    # Compile the template here once, so the render workers only load the compiled report
+    with span('compile_template'):
+        compile_template(get_report_template_path())
+    invoices = itertools.chain([first_invoice], invoices)
+    if workers <= 1:
+        for invoice in invoices:
+            with span('render', lender=invoice["application_name"]):
+                rendered_invoice = render_invoice(invoice, output_dir)
+            yield invoice, rendered_invoice
+        return
+    # Spawned rather than forked workers: a forked child would share the parent's JVM state and open HTTP
+    # connections. Every worker starts its own JVM once (only when there is work for it) and renders many invoices
+    # with it.
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        # Keep two invoices queued per worker, enough to keep them busy without building the whole month ahead.
+        # Results are taken in submission order, so the output order does not depend on which worker finishes first
+        pending_renders = deque()
+        for invoice in invoices:
+            pending_renders.append((invoice, executor.submit(render_invoice, invoice, output_dir)))
+            if len(pending_renders) >= 2 * workers:
+                invoice, future = pending_renders.popleft()
+                yield invoice, _wait_for_render(invoice, future)
+        while pending_renders:
+            invoice, future = pending_renders.popleft()
+            yield invoice, _wait_for_render(invoice, future)
+
+
+def _render_invoices_combined(invoices, combined_pdf_path, output_dir):
+    # Every invoice of the month is built before the first one is rendered, as they are exported together
+    invoices = list(invoices)
+    if not invoices:
+        return
+    with span('compile_template'):
+        compile_template(get_report_template_path())
+    os.makedirs(os.path.dirname(combined_pdf_path), exist_ok=True)
+    yield from zip(invoices, render_invoice_batch(invoices, combined_pdf_path, output_dir))
+
+
+def _wait_for_render(invoice, future):
+    # Spans recorded inside the render workers stay in their processes, this one measures how long the month waits
+    with span('render_wait', lender=invoice["application_name"]):
+        return future.result()
+
+
+def generate_report(invoices_for_month, invoice_summaries, payment_details, invoice_date, organization_application,
+                    workers=1, upload_workers=DEFAULT_UPLOAD_WORKERS, incremental=False,
+                    einvoice_format=DEFAULT_EINVOICE_FORMAT, einvoice_dir=DEFAULT_EINVOICE_DIR, combined_pdf=False,
+                    combined_pdf_dir=DEFAULT_COMBINED_PDF_DIR, partial=False):
+    """
+    Builds and renders the invoices of a month and uploads them to Drive.
+
+    Invoices are built, rendered and uploaded one by one as invoice_summaries yields them, so a generator of
+    summaries (see iter_invoice_summaries_for_month) gets its first PDF before the rest of the month is aggregated.
+    Every PDF is queued for upload as soon as it is rendered, so uploads run while the next invoices render; the PDFs
+    go to a new directory of the run (see get_run_output_dir), so no PDF is rewritten while it uploads. The
+    input fingerprint of every successfully uploaded invoice is stored, see builder.invoice_fingerprint, and every
+    rendered invoice is recorded in the invoice ledger with its upload result, see builder.invoice_ledger.
+
+    With combined_pdf, the invoices are instead all built first and exported together into one PDF for the month,
+    which is then split into the PDFs to upload, see render_invoice_batch. This pays the PDF export setup once per
+    month instead of once per invoice, and leaves a single document to review.
+
+    Parameters:
+    - invoices_for_month (str): The billed month, e.g. 'October-2025'.
+    - invoice_summaries (iterable): Combined invoice summaries, see combine_invoice_summaries_and_add_billing_summary.
+    - payment_details (dict): Payment details keyed by '<Month - Year>-<Bank name>'.
+    - invoice_date (str): The invoice date, formatted as 'dd-mm-yyyy'.
+    - organization_application (dict): Application name keyed by bank name.
+    - workers (int): Number of processes rendering invoices in parallel. With 1 the invoices are rendered one after
+                     another in this process.
+    - upload_workers (int): Maximum number of concurrent Drive uploads.
+    - incremental (bool): If True, only invoices whose inputs changed since the last run of the month are rendered
+                          and uploaded.
+    - einvoice_format (str): How the NIC payloads are written: 'ndjson' (one line per invoice) or 'bulk' (one JSON
+                             array) in one batch file for the month, or 'files' (one pretty-printed file per invoice).
+    - einvoice_dir (str): Directory the NIC payloads are written to.
+    - combined_pdf (bool): If True, render the invoices in this process with a single PDF export and keep the
+                           combined PDF as 'INVOICES_<month start>_<month end>.pdf' in combined_pdf_dir. With
+                           incremental, it only holds the invoices that changed.
+    - combined_pdf_dir (str): Directory the combined PDF is written to.
+    - partial (bool): If True, invoice_summaries only holds the invoices of some lenders. As with incremental, the
+                      NIC payloads of the month's batch that this run does not write again are kept, otherwise the
+                      batch is replaced by the invoices of this run, see EInvoiceWriter.
+
+    Returns:
+    - list: One result per rendered invoice, in the order of invoice_summaries whatever the worker counts: the render
+            result of render_invoice with the path of its NIC payload under 'json_path' and the Drive upload result
+            (see DriveUploader.upload) under 'upload'.
+    """
+    if combined_pdf and workers > 1:
+        raise ValueError("A combined PDF is rendered in a single process, it cannot be used with several workers")
+    fingerprints = load_fingerprints(invoices_for_month)
+    invoices = build_invoices(invoices_for_month, invoice_summaries, payment_details, invoice_date,
+                              organization_application)
+    unchanged_invoice_keys = []
+    if incremental:
+        invoices = skip_unchanged_invoices(invoices, fingerprints, unchanged_invoice_keys)
+
+    rendered_invoices = []
+    # Only the keys and fingerprint of a rendered invoice are kept, not the invoice itself
+    rendered_keys = []
+    output_dir = get_run_output_dir()
+    einvoice_writer = EInvoiceWriter(einvoice_dir, einvoice_format,
+                                     f"EINVOICES_{get_month_start_end_dates_for_report_name(invoices_for_month)}",
+                                     keep_previous=incremental or partial)
+    if combined_pdf:
+        combined_pdf_path = os.path.abspath(os.path.join(
+            combined_pdf_dir, f"INVOICES_{get_month_start_end_dates_for_report_name(invoices_for_month)}"))
+        rendered = _render_invoices_combined(invoices, combined_pdf_path, output_dir)
+    else:
+        rendered = _render_invoices(invoices, workers, output_dir)
+    with InvoiceLedger() as ledger:
+        with einvoice_writer, DriveUploader(max_workers=upload_workers) as uploader:
+            for invoice, rendered_invoice in rendered:
+                uploader.submit(rendered_invoice["pdf_path"], rendered_invoice["application_name"],
+                                rendered_invoice["content_hash"])
+                rendered_keys.append(record_rendered_invoice(invoice, rendered_invoice, einvoice_writer, ledger))
+                rendered_invoices.append(rendered_invoice)
+            with span('upload_wait'):
+                upload_results = uploader.results()
+        if incremental:
+            print(f"{len(unchanged_invoice_keys)} invoices unchanged since the last run, skipped")
+        complete_month(invoices_for_month, fingerprints, rendered_invoices, rendered_keys, upload_results, ledger)
+    if combined_pdf and rendered_invoices:
+        print(f"Combined PDF of the {len(rendered_invoices)} invoices: {rendered_invoices[0]['combined_pdf_path']}")
+    return rendered_invoices
@@ -5,3 +5,15 @@ from data.google_ds_reader import get_payment_details
 from data.google_ds_reader import get_custom_billing_data_for_teal_and_mp_bhulekh_services
 from data.google_ds_reader import get_custom_billing_data_for_sync_services
 from data.google_ds_reader import get_api_rate_card_data
+from data.google_ds_reader import get_data_from_google_sheet_ranges
+from data.google_ds_reader import get_all_sheet_data
+
+from data.google_clients import get_credentials
+from data.google_clients import get_sheets_service
+from data.google_clients import get_drive_service
+from data.google_ds_reader import index_by_month
+from data.records import Lender, ApiDetail, RateCardEntry, PaymentDetail, BillingRow, CustomBillingRow
+from data.money import ZERO, to_money, round_to_paise, round_to_rupee
+from data.data_source import DataSource
+from data.google_ds_reader import GoogleSheetsDataSource, get_data_source
+from data.local_data_sources import CsvDataSource, ParquetDataSource, SqliteDataSource
\ No newline at end of file
@@ -0,0 +1,38 @@
+from abc import ABC, abstractmethod
+
+
+class DataSource(ABC):
+    """
+    Where the reader layer gets the tabs of the billing workbook from.
+
+    A tab is identified by its A1 range, e.g. 'Rate Card!A:G'. A backend returns every tab as a value range in the
+    shape of the Sheets API: {'values': [header row, row, ...]} with every cell as text. The get_* functions of
+    data.google_ds_reader decode these values the same way whatever the backend. A backend that does not implement
+    read_ranges cannot be created.
+    """
+
+    @abstractmethod
+    def read_ranges(self, data_ranges):
+        """
+        Reads several tabs at once.
+
+        Parameters:
+        - data_ranges (list): The A1 ranges of the tabs, e.g. ['Rate Card!A:G', 'API Details!A:C'].
+
+        Returns:
+        - dict: The value range of each tab, keyed by the requested range.
+        """
+
+    def describe(self):
+        """
+        Returns a short description of the source for logs and traces, e.g. 'csv:/exports/october'.
+        """
+        return type(self).__name__
+
+
+def get_tab_name(data_range):
+    """
+    Returns the tab name of an A1 range: 'Lender Information!A:M' -> 'Lender Information'.
+    """
+    tab_name, separator, _ = data_range.rpartition('!')
+    return tab_name if separator else data_range
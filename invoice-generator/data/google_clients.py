@@ -0,0 +1,96 @@
+import json
+import os
+import threading
+
+import google_auth_httplib2
+import httplib2
+from google.oauth2.service_account import Credentials
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+
+CREDENTIALS_FILE_NAME = 'invoice-generation-443205-60eafd4715eb.json'
+SHEETS_SCOPES = ('https://www.googleapis.com/auth/spreadsheets',)
+DRIVE_SCOPES = ('https://www.googleapis.com/auth/drive',)
+
+_lock = threading.Lock()
+_service_account_info = None
+# Credentials keyed by scopes. A single Credentials object keeps its access token and refreshes it only when it
+# expires, so sharing it avoids a token request per API client.
+_credentials = {}
+# Parsed discovery documents keyed by (service name, version)
+_discovery_documents = {}
+# httplib2.Http is not thread safe, so every thread gets its own connection pool and service objects
+_thread_local = threading.local()
+
+
+def _get_service_account_info():
+    global _service_account_info
+    if _service_account_info is None:
+        current_dir = os.getcwd()
+        creds_template_path = os.path.join(os.path.join(current_dir, 'creds'), CREDENTIALS_FILE_NAME)
+        with open(creds_template_path, encoding='utf-8') as creds_file:
+            _service_account_info = json.load(creds_file)
+    return _service_account_info
+
+
+def get_credentials(scopes):
+    """
+    Returns the process-wide service account credentials for the given scopes.
+
+    The service account JSON is read once per process and one Credentials object is kept per set of scopes, so the
+    access token it holds is reused until it expires.
+
+    Parameters:
+    - scopes (tuple): The OAuth scopes the credentials are requested for.
+
+    Returns:
+    - Credentials: The shared service account credentials.
+    """
+    scopes = tuple(scopes)
+    with _lock:
+        credentials = _credentials.get(scopes)
+        if credentials is None:
+            credentials = Credentials.from_service_account_info(_get_service_account_info(), scopes=list(scopes))
+            _credentials[scopes] = credentials
+        return credentials
+
+
+def _get_discovery_document(service_name, version):
+    key = (service_name, version)
+    with _lock:
+        document = _discovery_documents.get(key)
+        if document is None:
+            document = json.loads(get_static_doc(service_name, version))
+            _discovery_documents[key] = document
+        return document
+
+
+def _get_service(service_name, version, scopes):
+    services = getattr(_thread_local, 'services', None)
+    if services is None:
+        services = _thread_local.services = {}
+    key = (service_name, version, tuple(scopes))
+    service = services.get(key)
+    if service is None:
+        # One Http per thread keeps the TLS connection to googleapis.com open between requests
+        http = getattr(_thread_local, 'http', None)
+        if http is None:
+            http = _thread_local.http = httplib2.Http()
+        authorized_http = google_auth_httplib2.AuthorizedHttp(get_credentials(scopes), http=http)
+        service = build_from_document(_get_discovery_document(service_name, version), http=authorized_http)
+        services[key] = service
+    return service
+
+
+def get_sheets_service():
+    """
+    Returns the Google Sheets v4 service for the calling thread, building it on first use.
+    """
+    return _get_service('sheets', 'v4', SHEETS_SCOPES)
+
+
+def get_drive_service():
+    """
+    Returns the Google Drive v3 service for the calling thread, building it on first use.
+    """
+    return _get_service('drive', 'v3', DRIVE_SCOPES)
@@ -1,124 +1,254 @@
-import os
 import sys
-
-from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
-
-
-def get_data_from_google_sheet(data_range):
-    current_dir = os.getcwd()
-    creds_template_path = os.path.join(os.path.join(current_dir, 'creds'), 'invoice-generation-443205-60eafd4715eb.json')
-
-    # Provide the path to your service account credentials JSON file
-    creds = Credentials.from_service_account_file(creds_template_path,
-                                                  scopes=['https://www.googleapis.com/auth/spreadsheets'])
-    # Build the service object
-    service = build('sheets', 'v4', credentials=creds)
-    # Call the Sheets API
-    sheet = service.spreadsheets()
-    # Mahesh RBIH Spread Sheet
-    return sheet.values().get(spreadsheetId='1UOw_RzlRyXt5iSDM-VrjENxRJ9nLvmuJheG_vrRRLx4', range=data_range).execute()
-    # Mahesh Spread Sheet
-    # return sheet.values().get(spreadsheetId='18tjuL9goTKgTFe4Kpux9OXeWdR-D4spjZgWKZud6mdQ', range=data_range).execute()
-
-
-def get_lenders():
-    lenders_data = []
-    data = get_data_from_google_sheet('Lender Information!A:M')
-    values = data.get('values', [])
+from collections import defaultdict
+
+from data.data_source import DataSource
+from data.google_clients import get_sheets_service
+from data.local_data_sources import DATA_SOURCE_TYPES
+from data.records import ApiDetail, BillingRow, CustomBillingRow, Lender, PaymentDetail, RateCardEntry, decode_rows
+from data.sheet_snapshot import get_snapshot_dir, get_spreadsheet_revision, load_snapshot, save_snapshot
+from tracing import increment, span
+
+# Mahesh RBIH Spread Sheet
+SPREADSHEET_ID = '1UOw_RzlRyXt5iSDM-VrjENxRJ9nLvmuJheG_vrRRLx4'
+# Mahesh Spread Sheet
+# SPREADSHEET_ID = '18tjuL9goTKgTFe4Kpux9OXeWdR-D4spjZgWKZud6mdQ'
+
+LENDERS_RANGE = 'Lender Information!A:M'
+API_DETAILS_RANGE = 'API Details!A:C'
+PAYMENT_DETAILS_RANGE = 'Payment Details!A:F'
+TEAL_AND_MP_BHULEKH_RANGE = 'Teal and MP Bhulekh!A:K'
+SP_INVOICES_RANGE = 'SP Invoices!A:G'
+RATE_CARD_RANGE = 'Rate Card!A:G'
+
+
+def get_data_from_google_sheet(data_range, offline=False):
+    return get_data_from_google_sheet_ranges([data_range], offline=offline)[data_range]
+
+
+def get_data_from_google_sheet_ranges(data_ranges, offline=False):
+    """
+    Fetches several ranges of the spreadsheet with a single batchGet request.
+
+    Every range read is kept as an on-disk snapshot together with the spreadsheet revision it was read at. Ranges
+    whose snapshot matches the current revision are served from disk, so only the ranges of a changed spreadsheet
+    are downloaded again.
+
+    Parameters:
+    - data_ranges (list): The A1 ranges to read, e.g. ['Rate Card!A:G', 'API Details!A:C'].
+    - offline (bool): If True, read only from the local snapshots without calling any Google API.
+
+    Returns:
+    - dict: The value range returned for each requested range, keyed by the requested range.
+    """
+    if offline:
+        value_ranges = {}
+        for data_range in data_ranges:
+            snapshot = load_snapshot(SPREADSHEET_ID, data_range)
+            if snapshot is None:
+                raise FileNotFoundError(f"No local snapshot of '{data_range}' found in "
+                                        f"{get_snapshot_dir(SPREADSHEET_ID)}, run once online to create it")
+            value_ranges[data_range] = snapshot['value_range']
+        return value_ranges
+
+    revision = get_spreadsheet_revision(SPREADSHEET_ID)
+    value_ranges = {}
+    stale_ranges = []
+    for data_range in data_ranges:
+        snapshot = load_snapshot(SPREADSHEET_ID, data_range)
+        if snapshot is not None and snapshot.get('revision') == revision:
+            value_ranges[data_range] = snapshot['value_range']
+        else:
+            stale_ranges.append(data_range)
+
+    if stale_ranges:
+        sheet = get_sheets_service().spreadsheets()
+        data = sheet.values().batchGet(spreadsheetId=SPREADSHEET_ID, ranges=stale_ranges).execute()
+        # Value ranges come back in request order; the 'range' they report is normalised by the API
+        # (e.g. "'Rate Card'!A1:G120"), so pair them with the requested ranges by position.
+        for data_range, value_range in zip(stale_ranges, data.get('valueRanges', [])):
+            save_snapshot(SPREADSHEET_ID, data_range, value_range, revision)
+            value_ranges[data_range] = value_range
+    return value_ranges
+
+
+class GoogleSheetsDataSource(DataSource):
+    """
+    Reads the tabs from the billing spreadsheet with one batchGet request, see get_data_from_google_sheet_ranges.
+    """
+
+    def __init__(self, offline=False):
+        self.offline = offline
+
+    def describe(self):
+        return f"google:{SPREADSHEET_ID}" + (" (offline)" if self.offline else "")
+
+    def read_ranges(self, data_ranges):
+        return get_data_from_google_sheet_ranges(data_ranges, offline=self.offline)
+
+
+def get_data_source(kind='google', path=None, offline=False):
+    """
+    Creates the data source the sheet data is read from.
+
+    Parameters:
+    - kind (str): 'google' for the billing spreadsheet, or a local backend: 'csv' or 'parquet' (a directory with
+                  one '<tab name>.csv' or '<tab name>.parquet' file per tab) or 'sqlite' (a database with one table
+                  per tab), see data.local_data_sources.
+    - path (str): The directory or database file of a local backend.
+    - offline (bool): For 'google', read only from the local snapshots without calling any Google API.
+
+    Returns:
+    - DataSource: The data source.
+
+    Raises:
+    - ValueError: If the kind is unknown, or a local backend is given no path.
+    """
+    if kind == 'google':
+        return GoogleSheetsDataSource(offline=offline)
+    data_source_type = DATA_SOURCE_TYPES.get(kind)
+    if data_source_type is None:
+        raise ValueError(f"Unknown data source '{kind}', expected one of: google, {', '.join(DATA_SOURCE_TYPES)}")
+    if not path:
+        raise ValueError(f"The {kind} data source needs a path")
+    return data_source_type(path)
+
+
+def _get_data_source(data_source, offline):
+    # The Google spreadsheet unless another source is given
+    return data_source if data_source is not None else GoogleSheetsDataSource(offline=offline)
+
+
+def _parse_lenders(values):
     if not values:
         print('No data found.')
         sys.exit(0)
     else:
-        for count in range(1, len(values)):
-            org = values[count]
-            lenders_data.append({'ID': org[0], 'Bank Name': org[1],
-                                 'Name Description': org[2], 'PAN number': org[3],
-                                 'GST number': org[4], 'Street': org[5], 'Location': org[6],
-                                 'City': org[7], 'Postal Code': org[8], 'State': org[9],
-                                 'Country': org[10], 'State code': org[11], 'Application name': org[12]})
-        return lenders_data
-
-
-def get_api_details():
-    apis_details_data = []
-    data = get_data_from_google_sheet('API Details!A:C')
-    values = data.get('values', [])
+        return decode_rows(Lender, values)
+
+
+def get_lenders(offline=False, data_source=None):
+    data = _get_data_source(data_source, offline).read_ranges([LENDERS_RANGE])[LENDERS_RANGE]
+    return _parse_lenders(data.get('values', []))
+
+
+def _parse_api_details(values):
     if not values:
         print('No data found.')
         sys.exit(0)
     else:
-        for count in range(1, len(values)):
-            api_details = values[count]
-            apis_details_data.append({'SP Name': api_details[0], 'Lender API Name': api_details[1],
-                                      'SP API Name': api_details[2]})
-        return apis_details_data
-
-
-def get_payment_details():
-    result_payment_details = {}
-    data = get_data_from_google_sheet('Payment Details!A:F')
-    values = data.get('values', [])
-    print(values)
+        return decode_rows(ApiDetail, values)
+
+
+def get_api_details(offline=False, data_source=None):
+    data = _get_data_source(data_source, offline).read_ranges([API_DETAILS_RANGE])[API_DETAILS_RANGE]
+    return _parse_api_details(data.get('values', []))
+
+
+def _parse_payment_details(values):
     if not values:
         print('No data found.')
         sys.exit(0)
     else:
-        for count in range(1, len(values)):
-            value = values[count]
-            result_payment_details[f"{value[0]}-{value[1]}"] = {'Month - Year': value[0], 'Bank name': value[1],
-                                                                'Previous Balance': value[2],
-                                                                'Payment Received': value[3], 'Adjustments': value[4],
-                                                                'PO Number': value[5]}
-        return result_payment_details
-
-
-def get_custom_billing_data_for_teal_and_mp_bhulekh_services():
-    result_custom_billing_data = []
-    data = get_data_from_google_sheet('Teal and MP Bhulekh!A:K')
-    values = data.get('values', [])
+        return {f"{payment_detail.month_year}-{payment_detail.bank_name}": payment_detail
+                for payment_detail in decode_rows(PaymentDetail, values)}
+
+
+def get_payment_details(offline=False, data_source=None):
+    data = _get_data_source(data_source, offline).read_ranges([PAYMENT_DETAILS_RANGE])[PAYMENT_DETAILS_RANGE]
+    return _parse_payment_details(data.get('values', []))
+
+
+def _parse_custom_billing_data_for_teal_and_mp_bhulekh_services(values):
     if not values:
         print('No data found.')
         sys.exit(0)
     else:
-        for count in range(1, len(values)):
-            value = values[count]
-            result_custom_billing_data.append(
-                {'Month - Year': value[0], 'Bank name': value[1], 'API name': value[2],
-                 'Provider Name': value[3], 'Document Type': value[4], 'Successful hits': value[5],
-                 'Failed hits': value[6], 'Unit Cost': value[7], 'Invoice number': value[8], 'Amount': value[9],
-                 'Use Amount Value': value[10]})
-        return result_custom_billing_data
-
-
-def get_custom_billing_data_for_sync_services():
-    result_custom_billing_data = []
-    data = get_data_from_google_sheet('SP Invoices!A:G')
-    values = data.get('values', [])
+        return decode_rows(CustomBillingRow, values)
+
+
+def get_custom_billing_data_for_teal_and_mp_bhulekh_services(offline=False, data_source=None):
+    data = _get_data_source(data_source, offline).read_ranges([TEAL_AND_MP_BHULEKH_RANGE])[TEAL_AND_MP_BHULEKH_RANGE]
+    return _parse_custom_billing_data_for_teal_and_mp_bhulekh_services(data.get('values', []))
+
+
+def _parse_custom_billing_data_for_sync_services(values):
     if not values:
         print('No data found.')
         sys.exit(0)
     else:
-        for count in range(1, len(values)):
-            value = values[count]
-            result_custom_billing_data.append(
-                {'Month - Year': value[0], 'Bank name': value[1], 'Successful hits': value[2],
-                 'Failed hits': value[3], 'API name': value[4], 'Provider Name': value[5],
-                 'Invoice number': value[6]})
-        return result_custom_billing_data
-
-
-def get_api_rate_card_data():
-    rate_card_data = []
-    data = get_data_from_google_sheet('Rate Card!A:G')
-    values = data.get('values', [])
+        return decode_rows(BillingRow, values)
+
+
+def get_custom_billing_data_for_sync_services(offline=False, data_source=None):
+    data = _get_data_source(data_source, offline).read_ranges([SP_INVOICES_RANGE])[SP_INVOICES_RANGE]
+    return _parse_custom_billing_data_for_sync_services(data.get('values', []))
+
+
+def _parse_api_rate_card_data(values):
     if not values:
         print('No data found.')
         sys.exit(0)
     else:
-        for count in range(1, len(values)):
-            value = values[count]
-            rate_card_data.append({'SP Name': value[0], 'Lender API Name': value[1], 'SP API Name': value[2],
-                                   'Plan Type': value[3], 'Min APIs Hits': value[4], 'Max APIs Hits': value[5],
-                                   'Price': value[6]})
-        return rate_card_data
+        return decode_rows(RateCardEntry, values)
+
+
+def get_api_rate_card_data(offline=False, data_source=None):
+    data = _get_data_source(data_source, offline).read_ranges([RATE_CARD_RANGE])[RATE_CARD_RANGE]
+    return _parse_api_rate_card_data(data.get('values', []))
+
+
+def index_by_month(billing_data):
+    """
+    Groups billing rows by their 'Month - Year' value, keeping the sheet order within each month.
+
+    Parameters:
+    - billing_data (list): Rows as returned by get_custom_billing_data_for_sync_services or
+                           get_custom_billing_data_for_teal_and_mp_bhulekh_services.
+
+    Returns:
+    - dict: The rows of each month keyed by 'Month - Year', e.g. 'October-2025'. Empty if the tab has at most one
+            row, which was never billed.
+    """
+    billing_data_by_month = defaultdict(list)
+    if billing_data is None or len(billing_data) <= 1:
+        return {}
+    for row in billing_data:
+        billing_data_by_month[row.month_year].append(row)
+    return dict(billing_data_by_month)
+
+
+def get_all_sheet_data(offline=False, data_source=None):
+    """
+    Reads every tab needed for invoice generation in one bulk read: a single batchGet round-trip for the Google
+    spreadsheet, one file or table read per tab for the local backends.
+
+    Parameters:
+    - offline (bool): If True, build the datasets only from the local snapshots of a previous online run.
+    - data_source (DataSource): Where to read the tabs from instead of the Google spreadsheet, see get_data_source.
+
+    Returns:
+    - dict: The parsed datasets keyed by 'rate_card_data', 'api_details', 'organizations', 'payment_details',
+            'custom_invoice_data' and 'teal_and_mp_bhulekh_invoice_data', each in the same shape as returned by the
+            matching get_* function, plus 'custom_invoice_data_by_month' and
+            'teal_and_mp_bhulekh_invoice_data_by_month' holding the billing rows indexed by 'Month - Year'.
+    """
+    data_source = _get_data_source(data_source, offline)
+    with span('fetch', source=data_source.describe()):
+        data = data_source.read_ranges([RATE_CARD_RANGE, API_DETAILS_RANGE, LENDERS_RANGE, PAYMENT_DETAILS_RANGE,
+                                        SP_INVOICES_RANGE, TEAL_AND_MP_BHULEKH_RANGE])
+    with span('parse'):
+        custom_invoice_data = _parse_custom_billing_data_for_sync_services(data[SP_INVOICES_RANGE].get('values', []))
+        teal_and_mp_bhulekh_invoice_data = _parse_custom_billing_data_for_teal_and_mp_bhulekh_services(
+            data[TEAL_AND_MP_BHULEKH_RANGE].get('values', []))
+        sheet_data = {
+            'rate_card_data': _parse_api_rate_card_data(data[RATE_CARD_RANGE].get('values', [])),
+            'api_details': _parse_api_details(data[API_DETAILS_RANGE].get('values', [])),
+            'organizations': _parse_lenders(data[LENDERS_RANGE].get('values', [])),
+            'payment_details': _parse_payment_details(data[PAYMENT_DETAILS_RANGE].get('values', [])),
+            'custom_invoice_data': custom_invoice_data,
+            'custom_invoice_data_by_month': index_by_month(custom_invoice_data),
+            'teal_and_mp_bhulekh_invoice_data': teal_and_mp_bhulekh_invoice_data,
+            'teal_and_mp_bhulekh_invoice_data_by_month': index_by_month(teal_and_mp_bhulekh_invoice_data),
+        }
+    increment('billing_rows_read', len(custom_invoice_data) + len(teal_and_mp_bhulekh_invoice_data))
+    return sheet_data
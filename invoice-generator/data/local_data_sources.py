@@ -0,0 +1,135 @@
+"""
+Local backends of the reader layer, for exports of the billing warehouse.
+
+Each backend holds the same tabs as the Google spreadsheet, named after the tab (e.g. 'SP Invoices') with the sheet
+headers as column names. Columns are matched by header when the rows are decoded, so their order does not matter.
+Every tab is read in one go and handed to the decoders as text, exactly like the Sheets API returns it.
+"""
+import csv
+import os
+import pathlib
+import sqlite3
+from abc import abstractmethod
+from contextlib import closing
+from decimal import Decimal
+
+from data.data_source import DataSource, get_tab_name
+
+try:
+    import pandas as pd
+except ImportError:  # Only the Parquet backend needs pandas
+    pd = None
+
+
+def _cell_text(value):
+    # Typed cells of SQLite and Parquet as the text a sheet would show: whole numbers without a '.0', so that hit
+    # counts stored as floats still parse as integers, and missing values as empty cells
+    if value is None:
+        return ''
+    if isinstance(value, float):
+        if value != value:
+            return ''
+        return str(int(value)) if value.is_integer() else str(value)
+    if isinstance(value, Decimal):
+        return format(value, 'f')
+    return str(value)
+
+
+class LocalDataSource(DataSource):
+    """A directory or database holding one table per tab."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def describe(self):
+        return f"{self.KIND}:{self.path}"
+
+    @abstractmethod
+    def read_tab(self, tab_name):
+        """
+        Returns the rows of a tab, header first, with every cell as text.
+        """
+
+    def read_ranges(self, data_ranges):
+        return {data_range: {'values': self.read_tab(get_tab_name(data_range))} for data_range in data_ranges}
+
+
+class _FileDataSource(LocalDataSource):
+    """A directory with one file per tab, e.g. 'SP Invoices.csv'."""
+    EXTENSION = None
+
+    def get_tab_path(self, tab_name):
+        tab_path = os.path.join(self.path, f"{tab_name}{self.EXTENSION}")
+        if not os.path.isfile(tab_path):
+            raise FileNotFoundError(f"No file for the '{tab_name}' tab, expected {tab_path}")
+        return tab_path
+
+
+class CsvDataSource(_FileDataSource):
+    """
+    Reads every tab from a CSV file of a directory, '<tab name>.csv' with the headers in the first row.
+    """
+    KIND = 'csv'
+    EXTENSION = '.csv'
+
+    def read_tab(self, tab_name):
+        # utf-8-sig drops the byte order mark spreadsheet programs write at the start of CSV exports
+        with open(self.get_tab_path(tab_name), newline='', encoding='utf-8-sig') as f:
+            return list(csv.reader(f))
+
+
+class ParquetDataSource(_FileDataSource):
+    """
+    Reads every tab from a Parquet file of a directory, '<tab name>.parquet'.
+
+    Needs pandas with a Parquet engine (pyarrow).
+    """
+    KIND = 'parquet'
+    EXTENSION = '.parquet'
+
+    def read_tab(self, tab_name):
+        if pd is None:
+            raise ImportError("The Parquet data source needs pandas, install it with 'pip install pandas pyarrow'")
+        frame = pd.read_parquet(self.get_tab_path(tab_name))
+        # Missing values of any dtype (NaN, NaT, NA) become None, the other cells keep their Python value
+        frame = frame.astype(object).where(frame.notna(), None)
+        return [[str(column) for column in frame.columns]] + [
+            [_cell_text(value) for value in row] for row in frame.itertuples(index=False, name=None)]
+
+
+class SqliteDataSource(LocalDataSource):
+    """
+    Reads every tab from a table of a SQLite database, named after the tab (e.g. "SP Invoices").
+    """
+    KIND = 'sqlite'
+
+    def read_tab(self, tab_name):
+        with self._connect() as connection:
+            return self._read_table(connection, tab_name)
+
+    def read_ranges(self, data_ranges):
+        # One connection for all the tabs of the batch
+        with self._connect() as connection:
+            return {data_range: {'values': self._read_table(connection, get_tab_name(data_range))}
+                    for data_range in data_ranges}
+
+    def _connect(self):
+        if not os.path.isfile(self.path):
+            raise FileNotFoundError(f"SQLite database {self.path} not found")
+        # Read-only, so the export is never modified. A sqlite3 connection used as a context manager only ends the
+        # transaction, closing() also closes it
+        return closing(sqlite3.connect(f"{pathlib.Path(self.path).resolve().as_uri()}?mode=ro", uri=True))
+
+    @staticmethod
+    def _read_table(connection, tab_name):
+        quoted_name = '"' + tab_name.replace('"', '""') + '"'
+        try:
+            cursor = connection.execute(f"SELECT * FROM {quoted_name}")
+        except sqlite3.OperationalError as ex:
+            raise ValueError(f"Cannot read the '{tab_name}' tab from the SQLite database: {ex}")
+        header = [column[0] for column in cursor.description]
+        return [header] + [[_cell_text(value) for value in row] for row in cursor]
+
+
+DATA_SOURCE_TYPES = {data_source_type.KIND: data_source_type
+                     for data_source_type in (CsvDataSource, ParquetDataSource, SqliteDataSource)}
@@ -0,0 +1,46 @@
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+# Money is carried as Decimal from the sheet cells to the invoice; amounts are only rounded where an invoice shows
+# them: billing lines to the paisa, taxes and totals to the rupee, always half-up.
+ZERO = Decimal('0')
+PAISA = Decimal('0.01')
+RUPEE = Decimal('1')
+
+
+def to_money(value):
+    """
+    Converts an amount read from the sheet or computed in the pipeline to a Decimal.
+
+    Floats go through their shortest text form, so 0.09 becomes Decimal('0.09') and not the binary value
+    Decimal('0.0899999999999999966693309261245...').
+
+    Parameters:
+    - value (Decimal, int, float or str): The amount.
+
+    Returns:
+    - Decimal: The amount.
+
+    Raises:
+    - ValueError: If the value is not a number.
+    """
+    if isinstance(value, Decimal):
+        return value
+    try:
+        return Decimal(str(value).strip())
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount format: {value}")
+
+
+def round_to_paise(amount):
+    """
+    Rounds an amount half-up to the paisa.
+    """
+    # Adding zero turns a negative zero such as Decimal('-0.00') into Decimal('0.00')
+    return to_money(amount).quantize(PAISA, rounding=ROUND_HALF_UP) + ZERO
+
+
+def round_to_rupee(amount):
+    """
+    Rounds an amount half-up to the rupee.
+    """
+    return to_money(amount).quantize(RUPEE, rounding=ROUND_HALF_UP) + ZERO
@@ -0,0 +1,144 @@
+from dataclasses import dataclass
+from operator import itemgetter
+from typing import ClassVar
+
+
+# Every record lists its columns as (sheet header, position). Decoders locate the columns by header, so reordering
+# the columns of a tab does not break parsing; the position is only used when a header cannot be found.
+
+@dataclass(slots=True)
+class Lender:
+    COLUMNS: ClassVar[tuple] = (('ID', 0), ('Bank Name', 1), ('Name Description', 2), ('PAN number', 3),
+                                ('GST number', 4), ('Street', 5), ('Location', 6), ('City', 7), ('Postal Code', 8),
+                                ('State', 9), ('Country', 10), ('State code', 11), ('Application name', 12))
+
+    id: str
+    bank_name: str
+    name_description: str
+    pan_number: str
+    gst_number: str
+    street: str
+    location: str
+    city: str
+    postal_code: str
+    state: str
+    country: str
+    state_code: str
+    application_name: str
+
+
+@dataclass(slots=True)
+class ApiDetail:
+    COLUMNS: ClassVar[tuple] = (('SP Name', 0), ('Lender API Name', 1), ('SP API Name', 2))
+
+    sp_name: str
+    lender_api_name: str
+    sp_api_name: str
+
+
+@dataclass(slots=True)
+class RateCardEntry:
+    COLUMNS: ClassVar[tuple] = (('SP Name', 0), ('Lender API Name', 1), ('SP API Name', 2), ('Plan Type', 3),
+                                ('Min APIs Hits', 4), ('Max APIs Hits', 5), ('Price', 6))
+
+    sp_name: str
+    lender_api_name: str
+    sp_api_name: str
+    plan_type: str
+    min_api_hits: str
+    max_api_hits: str
+    price: str
+
+
+@dataclass(slots=True)
+class PaymentDetail:
+    COLUMNS: ClassVar[tuple] = (('Month - Year', 0), ('Bank name', 1), ('Previous Balance', 2),
+                                ('Payment Received', 3), ('Adjustments', 4), ('PO Number', 5))
+
+    month_year: str
+    bank_name: str
+    previous_balance: str
+    payment_received: str
+    adjustments: str
+    po_number: str
+
+
+@dataclass(slots=True)
+class BillingRow:
+    """A row of the 'SP Invoices' tab."""
+    COLUMNS: ClassVar[tuple] = (('Month - Year', 0), ('Bank name', 1), ('Successful hits', 2), ('Failed hits', 3),
+                                ('API name', 4), ('Provider Name', 5), ('Invoice number', 6))
+
+    month_year: str
+    bank_name: str
+    successful_hits: str
+    failed_hits: str
+    api_name: str
+    provider_name: str
+    invoice_number: str
+
+
+@dataclass(slots=True)
+class CustomBillingRow:
+    """A row of the 'Teal and MP Bhulekh' tab."""
+    COLUMNS: ClassVar[tuple] = (('Month - Year', 0), ('Bank name', 1), ('API name', 2), ('Provider Name', 3),
+                                ('Document Type', 4), ('Successful hits', 5), ('Failed hits', 6), ('Unit Cost', 7),
+                                ('Invoice number', 8), ('Amount', 9), ('Use Amount Value', 10))
+
+    month_year: str
+    bank_name: str
+    api_name: str
+    provider_name: str
+    document_type: str
+    successful_hits: str
+    failed_hits: str
+    unit_cost: str
+    invoice_number: str
+    amount: str
+    use_amount_value: str
+
+
+def compile_row_decoder(record_type, header_row):
+    """
+    Builds a function that turns a sheet row into a record, with the column positions resolved once from the header.
+
+    The Sheets API leaves out empty trailing cells, so short rows are padded with empty strings instead of failing
+    with an IndexError.
+
+    Parameters:
+    - record_type (type): One of the record classes of this module.
+    - header_row (list): The first row of the tab.
+
+    Returns:
+    - function: Decoder taking a row (list) and returning a record_type instance.
+    """
+    header_positions = {}
+    for position, header in enumerate(header_row):
+        header_positions.setdefault(str(header).strip().lower(), position)
+    positions = [header_positions.get(header.lower(), default_position)
+                 for header, default_position in record_type.COLUMNS]
+    width = max(positions) + 1
+    get_values = itemgetter(*positions)
+    padding = [''] * width
+
+    def decode(row):
+        if len(row) < width:
+            row = row + padding[len(row):]
+        return record_type(*get_values(row))
+
+    return decode
+
+
+def decode_rows(record_type, values):
+    """
+    Decodes the rows of a tab, using its first row as the header.
+
+    Parameters:
+    - record_type (type): One of the record classes of this module.
+    - values (list): The rows of the tab, header first.
+
+    Returns:
+    - list: One record_type instance per data row.
+    """
+    decode = compile_row_decoder(record_type, values[0])
+    return [decode(row) for row in values[1:]]
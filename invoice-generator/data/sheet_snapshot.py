@@ -0,0 +1,80 @@
+import json
+import os
+import re
+import tempfile
+from datetime import datetime
+
+from data.google_clients import get_drive_service
+
+SNAPSHOT_DIR_NAME = '.sheet_snapshots'
+
+
+def get_snapshot_dir(spreadsheet_id):
+    current_dir = os.getcwd()
+    return os.path.join(os.path.join(current_dir, SNAPSHOT_DIR_NAME), spreadsheet_id)
+
+
+def _get_snapshot_path(spreadsheet_id, data_range):
+    # 'Lender Information!A:M' -> 'Lender_Information_A_M.json'
+    file_name = re.sub(r'[^A-Za-z0-9]+', '_', data_range).strip('_')
+    return os.path.join(get_snapshot_dir(spreadsheet_id), f"{file_name}.json")
+
+
+def get_spreadsheet_revision(spreadsheet_id):
+    """
+    Returns the current revision marker of the spreadsheet from its Drive metadata.
+
+    Drive bumps 'version' on every change to the file, which makes it a cheap way to tell whether a snapshot is still
+    current without downloading any sheet values.
+
+    Parameters:
+    - spreadsheet_id (str): The ID of the Google spreadsheet.
+
+    Returns:
+    - str: The revision marker, '<version>@<modifiedTime>'.
+    """
+    metadata = get_drive_service().files().get(fileId=spreadsheet_id, fields='version, modifiedTime',
+                                               supportsAllDrives=True).execute()
+    return f"{metadata.get('version')}@{metadata.get('modifiedTime')}"
+
+
+def load_snapshot(spreadsheet_id, data_range):
+    """
+    Loads the stored snapshot of a sheet range.
+
+    Parameters:
+    - spreadsheet_id (str): The ID of the Google spreadsheet.
+    - data_range (str): The A1 range the snapshot was taken of, e.g. 'Rate Card!A:G'.
+
+    Returns:
+    - dict or None: The snapshot with 'revision', 'fetched_at' and 'value_range' keys, or None if there is none.
+    """
+    snapshot_path = _get_snapshot_path(spreadsheet_id, data_range)
+    if not os.path.isfile(snapshot_path):
+        return None
+    with open(snapshot_path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_snapshot(spreadsheet_id, data_range, value_range, revision):
+    """
+    Stores the value range of a sheet range together with the spreadsheet revision it was read at.
+
+    Parameters:
+    - spreadsheet_id (str): The ID of the Google spreadsheet.
+    - data_range (str): The A1 range that was read.
+    - value_range (dict): The value range returned by the Sheets API.
+    - revision (str): The spreadsheet revision the values belong to.
+    """
+    snapshot_dir = get_snapshot_dir(spreadsheet_id)
+    os.makedirs(snapshot_dir, exist_ok=True)
+    snapshot = {
+        'range': data_range,
+        'revision': revision,
+        'fetched_at': datetime.now().isoformat(timespec='seconds'),
+        'value_range': value_range,
+    }
+    # Write to a temporary file first so that an interrupted run never leaves a truncated snapshot behind
+    with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=snapshot_dir, suffix='.tmp', delete=False) as f:
+        json.dump(snapshot, f, ensure_ascii=False)
+    os.replace(f.name, _get_snapshot_path(spreadsheet_id, data_range))
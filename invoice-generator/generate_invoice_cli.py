@@ -0,0 +1,142 @@
+"""
+Headless entry point of the invoice generator, runs the same pipeline as the Tk window without a display.
+
+Example:
+    python generate_invoice_cli.py --month October-2025 --invoice-date 28-10-2025 --lenders "Bank of Baroda" ARTHAN
+    python generate_invoice_cli.py --month October-2025 --source sqlite --source-path exports/billing.sqlite
+    python generate_invoice_cli.py --month October-2025 November-2025 --preview
+"""
+import argparse
+import sys
+from datetime import datetime
+
+sys.path.append('./lib')
+
+from builder.drive_uploader import DEFAULT_UPLOAD_WORKERS
+from builder.einvoice_export import DEFAULT_EINVOICE_DIR, DEFAULT_EINVOICE_FORMAT, EINVOICE_FORMATS
+from builder.invoice_preview import format_preview_table
+from builder.report_builder import DEFAULT_COMBINED_PDF_DIR
+from data.google_ds_reader import get_data_source
+from data.local_data_sources import DATA_SOURCE_TYPES
+from pipeline.async_pipeline import DEFAULT_QUEUE_SIZE, generate_invoices_for_months_async
+from pipeline.invoice_pipeline import generate_invoices_for_months, preview_invoices_for_months
+from tracing import enable_tracing, export_trace
+
+MONTH_FORMAT = "%B-%Y"
+INVOICE_DATE_FORMAT = "%d-%m-%Y"
+
+
+def _month(value):
+    try:
+        return datetime.strptime(value, MONTH_FORMAT).strftime(MONTH_FORMAT)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid month '{value}', expected Month-Year, e.g. October-2025")
+
+
+def _invoice_date(value):
+    try:
+        datetime.strptime(value, INVOICE_DATE_FORMAT)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid invoice date '{value}', expected dd-mm-yyyy, e.g. 28-10-2025")
+    return value
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(prog='generate', description="Generate RBiH invoices without the Tk window.")
+    parser.add_argument('--month', dest='months', type=_month, nargs='+', required=True,
+                        help="Month(s) to invoice as Month-Year, e.g. October-2025 November-2025")
+    parser.add_argument('--invoice-date', type=_invoice_date, default=datetime.now().strftime(INVOICE_DATE_FORMAT),
+                        help="Invoice date as dd-mm-yyyy (default: today)")
+    parser.add_argument('--lenders', nargs='+',
+                        help="Bank names or application names to invoice (default: all lenders)")
+    parser.add_argument('--offline', action='store_true',
+                        help="Read the sheet data only from the local snapshots of an earlier run")
+    parser.add_argument('--source', choices=['google', *DATA_SOURCE_TYPES], default='google',
+                        help="Where to read the sheet tabs from: the Google spreadsheet, or a local export with one "
+                             "CSV or Parquet file per tab ('<tab name>.csv') or one SQLite table per tab "
+                             "(default: google)")
+    parser.add_argument('--source-path',
+                        help="Directory (csv, parquet) or database file (sqlite) of a local --source")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Number of processes rendering invoices in parallel (default: 1)")
+    parser.add_argument('--upload-workers', type=int, default=DEFAULT_UPLOAD_WORKERS,
+                        help=f"Maximum number of concurrent Drive uploads (default: {DEFAULT_UPLOAD_WORKERS})")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Only regenerate invoices whose inputs changed since the last run of the month")
+    parser.add_argument('--columnar', action='store_true',
+                        help="Combine the billing rows in bulk with NumPy, for months with many line items")
+    parser.add_argument('--einvoice-format', choices=EINVOICE_FORMATS, default=DEFAULT_EINVOICE_FORMAT,
+                        help="How the NIC e-invoice payloads are written: one batch file per month with one line "
+                             "per invoice (ndjson) or one JSON array (bulk), or one pretty-printed file per invoice "
+                             f"(files) (default: {DEFAULT_EINVOICE_FORMAT})")
+    parser.add_argument('--einvoice-dir', default=DEFAULT_EINVOICE_DIR,
+                        help=f"Directory the NIC e-invoice payloads are written to (default: {DEFAULT_EINVOICE_DIR})")
+    parser.add_argument('--combined-pdf', action='store_true',
+                        help="Export each month's invoices together into one PDF for review, split into the PDFs "
+                             "to upload, instead of exporting every invoice on its own")
+    parser.add_argument('--combined-pdf-dir', default=DEFAULT_COMBINED_PDF_DIR,
+                        help=f"Directory the combined PDFs are written to (default: {DEFAULT_COMBINED_PDF_DIR})")
+    parser.add_argument('--async-stages', action='store_true',
+                        help="Run the fetch, render and upload stages at the same time, connected by bounded queues, "
+                             "so months also overlap")
+    parser.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE,
+                        help=f"With --async-stages, maximum number of invoices waiting to be rendered and to be "
+                             f"uploaded (default: {DEFAULT_QUEUE_SIZE})")
+    parser.add_argument('--preview', action='store_true',
+                        help="Dry run: print the totals, taxes, amounts due and anomalies of every lender without "
+                             "rendering, writing or uploading any invoice")
+    parser.add_argument('--trace', metavar='PATH',
+                        help="Record per-stage timings and counters of the run and write them to PATH")
+    parser.add_argument('--trace-format', choices=['json', 'flame'], default='json',
+                        help="Trace output: 'json' for spans, counters and per-lender durations, 'flame' for "
+                             "folded stacks to load in a flame graph viewer (default: json)")
+    return parser
+
+
+def main(argv=None):
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    if args.source != 'google' and not args.source_path:
+        parser.error(f"--source {args.source} needs --source-path")
+    if args.combined_pdf and args.workers > 1:
+        parser.error("--combined-pdf renders in a single process and cannot be used with --workers")
+    if args.combined_pdf and args.async_stages:
+        parser.error("--combined-pdf exports a whole month at once and cannot be used with --async-stages")
+    data_source = get_data_source(args.source, args.source_path, offline=args.offline)
+    if args.trace:
+        enable_tracing()
+    try:
+        if args.preview:
+            print(format_preview_table(preview_invoices_for_months(args.months, args.invoice_date,
+                                                                   offline=args.offline, lenders=args.lenders,
+                                                                   columnar=args.columnar, data_source=data_source)))
+        elif args.async_stages:
+            rendered_invoices_by_month = generate_invoices_for_months_async(
+                args.months, args.invoice_date, offline=args.offline, lenders=args.lenders, workers=args.workers,
+                upload_workers=args.upload_workers, incremental=args.incremental, columnar=args.columnar,
+                data_source=data_source, einvoice_format=args.einvoice_format, einvoice_dir=args.einvoice_dir,
+                queue_size=args.queue_size)
+        else:
+            rendered_invoices_by_month = generate_invoices_for_months(
+                args.months, args.invoice_date, offline=args.offline, lenders=args.lenders, workers=args.workers,
+                upload_workers=args.upload_workers, incremental=args.incremental, columnar=args.columnar,
+                data_source=data_source, einvoice_format=args.einvoice_format, einvoice_dir=args.einvoice_dir,
+                combined_pdf=args.combined_pdf, combined_pdf_dir=args.combined_pdf_dir)
+    finally:
+        # A trace of a failed run is the most useful one, so it is written either way
+        if args.trace:
+            export_trace(args.trace, args.trace_format)
+    if args.preview:
+        return 0
+    # Failed uploads are only printed while the run goes on, the exit status tells a scheduled run about them
+    failed_uploads = [rendered_invoice["pdf_path"] for rendered_invoices in rendered_invoices_by_month.values()
+                      for rendered_invoice in rendered_invoices if rendered_invoice["upload"]["status"] == "failed"]
+    if failed_uploads:
+        print(f"{len(failed_uploads)} invoices were not uploaded to Drive:", *failed_uploads, sep='\n',
+              file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
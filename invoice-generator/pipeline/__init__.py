@@ -0,0 +1,7 @@
+from pipeline.invoice_pipeline import get_transaction_summary
+from pipeline.invoice_pipeline import get_teal_mp_bhulekh_transaction_summary
+from pipeline.invoice_pipeline import filter_invoice_summaries_by_lender
+from pipeline.invoice_pipeline import generate_invoices_for_months
+from pipeline.invoice_pipeline import iter_invoice_summaries_for_month
+from pipeline.async_pipeline import generate_invoices_for_months_async
+from pipeline.invoice_pipeline import preview_invoices_for_months
\ No newline at end of file
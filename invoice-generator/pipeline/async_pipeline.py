@@ -0,0 +1,244 @@
+"""
+Asynchronous orchestration of the invoice pipeline, with every stage running at the same time:
+
+    fetch --> build (thread) --render queue--> render (Jasper executor) --upload queue--> upload (Drive threads)
+
+The sheet data is read while the JVM starts and loads the report template. Invoices are built in a thread and each one
+is rendered while earlier ones upload, across months too: the next month renders while the last uploads of the
+previous one are still running, where generate_invoices_for_months waits for them. Both queues are bounded, so a slow
+stage holds the faster ones back instead of piling up invoices in memory, and the run takes about as long as its
+slowest stage.
+
+Example:
+    generate_invoices_for_months_async(['October-2025', 'November-2025'], '28-10-2025', upload_workers=8)
+"""
+import asyncio
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from builder.drive_uploader import DEFAULT_UPLOAD_WORKERS, DriveUploader
+from builder.einvoice_export import DEFAULT_EINVOICE_DIR, DEFAULT_EINVOICE_FORMAT, EInvoiceWriter
+from builder.invoice_fingerprint import load_fingerprints
+from builder.invoice_ledger import InvoiceLedger
+from builder.jasper_engine import compile_template, detach_thread, get_jasper_engine
+from builder.report_builder import build_invoices, complete_month, get_month_start_end_dates_for_report_name, \
+    get_report_template_path, get_run_output_dir, record_rendered_invoice, render_invoice, skip_unchanged_invoices
+from data.google_ds_reader import get_all_sheet_data
+from pipeline.invoice_pipeline import get_organization_application, iter_month_invoice_summaries
+from tracing import span
+
+# Invoices waiting in each queue, per stage
+DEFAULT_QUEUE_SIZE = 8
+
+
+class _MonthRun:
+    """The fingerprints, NIC payload batch and render and upload results of one month going through the stages."""
+
+    def __init__(self, invoices_for_month, incremental, einvoice_format, einvoice_dir, partial):
+        self.invoices_for_month = invoices_for_month
+        self.incremental = incremental
+        self.fingerprints = load_fingerprints(invoices_for_month)
+        self.unchanged_invoice_keys = []
+        batch_name = f"EINVOICES_{get_month_start_end_dates_for_report_name(invoices_for_month)}"
+        # Only a run of some invoices keeps the other payloads of the month's batch, see generate_report
+        self.einvoice_writer = EInvoiceWriter(einvoice_dir, einvoice_format, batch_name,
+                                              keep_previous=incremental or partial)
+        self.rendered_invoices = []
+        self.rendered_keys = []
+        # Upload results keyed by the index of the rendered invoice, uploads finish in any order
+        self.upload_results = {}
+        self.all_rendered = False
+        self.completed = False
+
+    def add_rendered_invoice(self, invoice, rendered_invoice, ledger):
+        # Returns the index of the rendered invoice, to pass with its upload result
+        self.rendered_keys.append(record_rendered_invoice(invoice, rendered_invoice, self.einvoice_writer, ledger))
+        self.rendered_invoices.append(rendered_invoice)
+        return len(self.rendered_invoices) - 1
+
+    def add_upload_result(self, index, upload_result, ledger):
+        self.upload_results[index] = upload_result
+        self._complete_if_done(ledger)
+
+    def finish_rendering(self, ledger):
+        self.einvoice_writer.close()
+        self.all_rendered = True
+        self._complete_if_done(ledger)
+
+    def _complete_if_done(self, ledger):
+        if self.completed or not self.all_rendered or len(self.upload_results) < len(self.rendered_invoices):
+            return
+        self.completed = True
+        if self.incremental:
+            print(f"{len(self.unchanged_invoice_keys)} invoices of {self.invoices_for_month} unchanged since the last "
+                  f"run, skipped")
+        complete_month(self.invoices_for_month, self.fingerprints, self.rendered_invoices, self.rendered_keys,
+                       [self.upload_results[index] for index in range(len(self.rendered_invoices))], ledger)
+
+
+def _load_report_template():
+    # Runs in the render thread: starts the JVM and loads the compiled template there before the first invoice
+    template_path = get_report_template_path()
+    compile_template(template_path)
+    get_jasper_engine(template_path).load()
+
+
+def _compile_report_template():
+    # Compiling a template that is not in .jasper_cache yet starts the JVM in the calling thread, which the JVM then
+    # waits for at exit unless it is detached
+    try:
+        compile_template(get_report_template_path())
+    finally:
+        detach_thread()
+
+
+def _render_invoice(invoice, output_dir):
+    with span('render', lender=invoice["application_name"]):
+        return render_invoice(invoice, output_dir)
+
+
+def _build_stage(months, sheet_data, invoice_date, lenders, columnar, incremental, einvoice_format, einvoice_dir,
+                 month_runs, put):
+    # Runs in a thread: combines the billing rows and builds the invoices, handing them to the render queue through
+    # put, which waits while the queue is full
+    organization_application = get_organization_application(sheet_data['organizations'])
+    for invoices_for_month, invoice_summaries in iter_month_invoice_summaries(months, sheet_data, lenders=lenders,
+                                                                             columnar=columnar):
+        month_run = _MonthRun(invoices_for_month, incremental, einvoice_format, einvoice_dir, bool(lenders))
+        month_runs.append(month_run)
+        invoices = build_invoices(invoices_for_month, invoice_summaries, sheet_data['payment_details'],
+                                  invoice_date, organization_application)
+        if incremental:
+            invoices = skip_unchanged_invoices(invoices, month_run.fingerprints, month_run.unchanged_invoice_keys)
+        for invoice in invoices:
+            put((month_run, invoice))
+        # Marks the end of the month
+        put((month_run, None))
+    put(None)
+
+
+async def _render_stage(render_queue, upload_queue, render_executor, renders_in_flight, upload_stage_count, ledger):
+    loop = asyncio.get_running_loop()
+    output_dir = get_run_output_dir()
+    # (month run, invoice, render future) in queue order, so the NIC payloads of a month are written in order
+    pending_renders = deque()
+
+    async def finish_oldest_render():
+        month_run, invoice, render_future = pending_renders.popleft()
+        if invoice is None:
+            month_run.finish_rendering(ledger)
+            return
+        rendered_invoice = await render_future
+        index = month_run.add_rendered_invoice(invoice, rendered_invoice, ledger)
+        await upload_queue.put((month_run, index))
+
+    while True:
+        item = await render_queue.get()
+        if item is None:
+            break
+        month_run, invoice = item
+        render_future = loop.run_in_executor(render_executor, _render_invoice, invoice, output_dir) \
+            if invoice is not None else None
+        pending_renders.append((month_run, invoice, render_future))
+        while pending_renders and (pending_renders[0][1] is None or len(pending_renders) > renders_in_flight):
+            await finish_oldest_render()
+    while pending_renders:
+        await finish_oldest_render()
+    for _ in range(upload_stage_count):
+        await upload_queue.put(None)
+
+
+async def _upload_stage(upload_queue, uploader, ledger):
+    while True:
+        item = await upload_queue.get()
+        if item is None:
+            return
+        month_run, index = item
+        rendered_invoice = month_run.rendered_invoices[index]
+        upload_result = await asyncio.wrap_future(uploader.submit(rendered_invoice["pdf_path"],
+                                                                  rendered_invoice["application_name"],
+                                                                  rendered_invoice["content_hash"]))
+        month_run.add_upload_result(index, upload_result, ledger)
+
+
+async def run_invoice_pipeline(months, invoice_date, offline=False, lenders=None, workers=1,
+                               upload_workers=DEFAULT_UPLOAD_WORKERS, incremental=False, columnar=False,
+                               data_source=None, einvoice_format=DEFAULT_EINVOICE_FORMAT,
+                               einvoice_dir=DEFAULT_EINVOICE_DIR, queue_size=DEFAULT_QUEUE_SIZE):
+    """
+    Generates the invoices of one or more months with the fetch, build, render and upload stages running at the same
+    time. Produces the same invoices, NIC payloads, ledger entries and uploads as generate_invoices_for_months.
+
+    Parameters:
+    - months, invoice_date, offline, lenders, incremental, columnar, data_source, einvoice_format, einvoice_dir: See
+      generate_invoices_for_months.
+    - workers (int): Number of processes rendering invoices in parallel. With 1 the invoices are rendered one after
+                     another in a thread of this process that keeps the JVM.
+    - upload_workers (int): Maximum number of concurrent Drive uploads.
+    - queue_size (int): Maximum number of invoices waiting to be rendered, and to be uploaded.
+
+    Returns:
+    - dict: The results of the rendered invoices of each month, keyed by month, see generate_report.
+    """
+    loop = asyncio.get_running_loop()
+    render_queue = asyncio.Queue(maxsize=queue_size)
+    upload_queue = asyncio.Queue(maxsize=queue_size)
+    upload_stage_count = max(1, upload_workers)
+    month_runs = []
+    stopped = threading.Event()
+
+    def put(item):
+        if stopped.is_set():
+            raise asyncio.CancelledError()
+        asyncio.run_coroutine_threadsafe(render_queue.put(item), loop).result()
+
+    if workers <= 1:
+        # A single thread makes every Jasper call, so the report it loads while the sheet data is read is the one
+        # that renders
+        render_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='jasper-render')
+        renders_in_flight = 1
+        warm_up = loop.run_in_executor(render_executor, _load_report_template)
+    else:
+        # Spawned workers, see _render_invoices of builder.report_builder. The template is compiled here once, so
+        # they only load the compiled report
+        render_executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        renders_in_flight = 2 * workers
+        warm_up = asyncio.to_thread(_compile_report_template)
+
+    with render_executor, InvoiceLedger() as ledger, DriveUploader(max_workers=upload_workers) as uploader:
+        stages = []
+        try:
+            with span('fetch_and_warm_up'):
+                sheet_data, _ = await asyncio.gather(
+                    asyncio.to_thread(get_all_sheet_data, offline=offline, data_source=data_source), warm_up)
+            build_stage = asyncio.to_thread(_build_stage, months, sheet_data, invoice_date, lenders, columnar,
+                                            incremental, einvoice_format, einvoice_dir, month_runs, put)
+            render_stage = _render_stage(render_queue, upload_queue, render_executor, renders_in_flight,
+                                         upload_stage_count, ledger)
+            upload_stages = [_upload_stage(upload_queue, uploader, ledger) for _ in range(upload_stage_count)]
+            stages = [asyncio.ensure_future(stage) for stage in (build_stage, render_stage, *upload_stages)]
+            await asyncio.gather(*stages)
+        except BaseException:
+            stopped.set()
+            for stage in stages:
+                stage.cancel()
+            # Make room in the render queue in case the build thread is waiting for it, it then sees the stop
+            while not render_queue.empty():
+                render_queue.get_nowait()
+            for month_run in month_runs:
+                month_run.einvoice_writer.discard()
+            raise
+        finally:
+            if workers <= 1:
+                # The render thread started the JVM, which waits for it at exit unless it is detached
+                await loop.run_in_executor(render_executor, detach_thread)
+    return {month_run.invoices_for_month: month_run.rendered_invoices for month_run in month_runs}
+
+
+def generate_invoices_for_months_async(months, invoice_date, **kwargs):
+    """
+    Runs run_invoice_pipeline to completion in a new event loop, for callers without one such as the CLI.
+    """
+    return asyncio.run(run_invoice_pipeline(months, invoice_date, **kwargs))
@@ -0,0 +1,261 @@
+from builder.drive_uploader import DEFAULT_UPLOAD_WORKERS
+from builder.einvoice_export import DEFAULT_EINVOICE_DIR, DEFAULT_EINVOICE_FORMAT
+from builder.invoice_preview import preview_month
+from builder.report_builder import DEFAULT_COMBINED_PDF_DIR, generate_report
+from data.google_ds_reader import get_all_sheet_data
+from data.money import to_money
+from summary.columnar_combine import combine_billing_rows_columnar
+from summary.rate_card import compile_rate_card
+from summary.report_summary import combine_invoice_summaries_and_add_billing_summary, get_organization_map, \
+    iter_invoice_summaries
+from tracing import increment, span
+
+
+def get_transaction(custom_invoice_details, organization_application, api_details_by_provider_and_api_name):
+    return {"application_name": organization_application.get(custom_invoice_details.bank_name),
+            "provider_api_name": api_details_by_provider_and_api_name.get(
+                custom_invoice_details.provider_name + custom_invoice_details.api_name),
+            "lender_api_name": custom_invoice_details.api_name,
+            "destination_info": custom_invoice_details.provider_name,
+            "total_transactions_count": int(custom_invoice_details.successful_hits)
+                                        + int(custom_invoice_details.failed_hits),
+            "successful_transactions_count": int(custom_invoice_details.successful_hits),
+            "failed_transactions_count": int(custom_invoice_details.failed_hits),
+            "invoice_number": custom_invoice_details.invoice_number}
+
+
+def get_transaction_summary(invoices_for_month, custom_invoice_data_by_month, organization_application,
+                            api_details_by_provider_and_api_name):
+    # Only the rows of the requested month are visited, see index_by_month
+    return [get_transaction(custom_invoice_details, organization_application, api_details_by_provider_and_api_name)
+            for custom_invoice_details in custom_invoice_data_by_month.get(invoices_for_month, [])]
+
+
+def get_teal_mp_bhulekh_transaction(custom_invoice_details, organization_application,
+                                    api_details_by_provider_and_api_name):
+    return {"application_name": organization_application.get(custom_invoice_details.bank_name),
+            "provider_api_name": api_details_by_provider_and_api_name.get(
+                custom_invoice_details.provider_name + custom_invoice_details.api_name),
+            "lender_api_name": custom_invoice_details.api_name,
+            "destination_info": custom_invoice_details.provider_name,
+            "total_transactions_count": int(custom_invoice_details.successful_hits)
+                                        + int(custom_invoice_details.failed_hits),
+            "successful_transactions_count": int(custom_invoice_details.successful_hits),
+            "failed_transactions_count": int(custom_invoice_details.failed_hits),
+            "document_type": custom_invoice_details.failed_hits,
+            "unit_cost": to_money(custom_invoice_details.unit_cost),
+            "invoice_number": custom_invoice_details.invoice_number,
+            "amount": custom_invoice_details.amount,
+            "use_amount_value": custom_invoice_details.use_amount_value
+            }
+
+
+def get_teal_mp_bhulekh_transaction_summary(invoices_for_month, teal_and_mp_bhulekh_invoice_data_by_month,
+                                            organization_application,
+                                            api_details_by_provider_and_api_name):
+    # Only the rows of the requested month are visited, see index_by_month
+    return [get_teal_mp_bhulekh_transaction(custom_invoice_details, organization_application,
+                                            api_details_by_provider_and_api_name)
+            for custom_invoice_details in teal_and_mp_bhulekh_invoice_data_by_month.get(invoices_for_month, [])]
+
+
+def iter_invoice_summaries_for_month(invoices_for_month, sheet_data, rate_card, organization_application,
+                                     api_details_by_provider_and_api_name, org_map):
+    """
+    Yields the combined invoice summaries of a month one invoice at a time.
+
+    The billing rows of the month are first grouped by invoice (application, invoice number, lender), which only
+    holds the rows themselves. Each group is then priced and combined on its own and yielded right away, so the first
+    invoice can be rendered before the others are aggregated and no stage holds the summaries of the whole month.
+    Invoices come out in the same order, with the same billing lines, as with
+    combine_invoice_summaries_and_add_billing_summary over the whole month.
+
+    Parameters:
+    - invoices_for_month (str): The billed month, e.g. 'October-2025'.
+    - sheet_data (dict): The sheet data, see get_all_sheet_data.
+    - rate_card (RateCard): The compiled rate card.
+    - organization_application (dict): Application name keyed by bank name.
+    - api_details_by_provider_and_api_name (dict): SP API name keyed by SP name + lender API name.
+    - org_map (dict): Lenders keyed by application name, see get_organization_map.
+    """
+    invoice_rows = {}
+    with span('group_rows', month=invoices_for_month):
+        for rows_by_month, is_custom in ((sheet_data['custom_invoice_data_by_month'], False),
+                                         (sheet_data['teal_and_mp_bhulekh_invoice_data_by_month'], True)):
+            for custom_invoice_details in rows_by_month.get(invoices_for_month, []):
+                application_name = organization_application.get(custom_invoice_details.bank_name)
+                organization = org_map.get(application_name)
+                # Rows of unknown lenders are left out, as combine_invoice_summaries_and_add_billing_summary does
+                if organization is None:
+                    continue
+                key = (application_name, custom_invoice_details.invoice_number, organization['id'])
+                invoice_rows.setdefault(key, ([], []))[is_custom].append(custom_invoice_details)
+
+    for (application_name, _, _), (rows, custom_rows) in invoice_rows.items():
+        # The span is closed before yielding, so it does not count the time spent on the invoice downstream
+        with span('combine', lender=application_name, rows=len(rows) + len(custom_rows)):
+            transaction_summary = [get_transaction(row, organization_application,
+                                                   api_details_by_provider_and_api_name)
+                                   for row in rows]
+            custom_summary = [get_teal_mp_bhulekh_transaction(row, organization_application,
+                                                              api_details_by_provider_and_api_name)
+                              for row in custom_rows]
+            invoice_summaries = list(iter_invoice_summaries(transaction_summary, org_map, rate_card,
+                                                            is_custom=False))
+            invoice_summaries.extend(iter_invoice_summaries(custom_summary, org_map, rate_card, is_custom=True))
+            combined_records = combine_invoice_summaries_and_add_billing_summary(invoice_summaries)
+        increment('billing_rows_combined', len(rows) + len(custom_rows))
+        yield from combined_records
+
+
+def is_lender_selected(invoice_summary, selected_lenders):
+    """
+    Tells whether an invoice belongs to one of the selected lenders, given as lower case bank or application names.
+    """
+    return (str(invoice_summary.get("organization").get("name")).lower() in selected_lenders
+            or str(invoice_summary.get("application_name")).lower() in selected_lenders)
+
+
+def filter_invoice_summaries_by_lender(invoice_summaries, lenders):
+    """
+    Keeps only the invoices of the given lenders.
+
+    Parameters:
+    - invoice_summaries (list): Combined invoice summaries, see combine_invoice_summaries_and_add_billing_summary.
+    - lenders (iterable): Bank names or application names (case-insensitive) of the lenders to keep.
+
+    Returns:
+    - list: The invoice summaries of the selected lenders.
+    """
+    selected_lenders = {lender.strip().lower() for lender in lenders}
+    return [invoice_summary for invoice_summary in invoice_summaries
+            if is_lender_selected(invoice_summary, selected_lenders)]
+
+
+def get_organization_application(organizations):
+    # Get application name associated with lender which is getting used in database to calculate total hits
+    return {org.bank_name: org.application_name for org in organizations}
+
+
+def iter_month_invoice_summaries(months, sheet_data, lenders=None, columnar=False):
+    """
+    Yields every month with its combined invoice summaries, from one read of the sheet data.
+
+    The rate card is compiled once for all months. The summaries of a month are produced one invoice at a time as
+    they are consumed (see iter_invoice_summaries_for_month), or all at once with the columnar engine.
+
+    Parameters:
+    - months (list): The months to generate, formatted as 'Month-Year', e.g. ['October-2025', 'November-2025'].
+    - sheet_data (dict): The sheet data, see get_all_sheet_data.
+    - lenders (list): Bank names or application names to keep, all lenders if None.
+    - columnar (bool): If True, combine each month's billing rows in bulk with the NumPy engine (see
+                       summary.columnar_combine).
+
+    Yields:
+    - tuple: The month and an iterable of its invoice summaries.
+    """
+    # Compile the rate card once for all months, this also rejects overlapping or missing slabs
+    with span('compile_rate_card'):
+        rate_card = compile_rate_card(sheet_data['rate_card_data'])
+    organization_application = get_organization_application(sheet_data['organizations'])
+    # API details by provider name
+    api_details_by_provider_and_api_name = {
+        f"{api_detail.sp_name}{api_detail.lender_api_name}": api_detail.sp_api_name for api_detail in
+        sheet_data['api_details']
+    }
+    org_map = get_organization_map(sheet_data['organizations'])
+    selected_lenders = {lender.strip().lower() for lender in lenders} if lenders else None
+
+    for invoices_for_month in months:
+        if columnar:
+            with span('combine', month=invoices_for_month, engine='columnar'):
+                invoice_summaries = combine_billing_rows_columnar(
+                    get_transaction_summary(invoices_for_month, sheet_data['custom_invoice_data_by_month'],
+                                            organization_application, api_details_by_provider_and_api_name),
+                    get_teal_mp_bhulekh_transaction_summary(invoices_for_month,
+                                                            sheet_data['teal_and_mp_bhulekh_invoice_data_by_month'],
+                                                            organization_application,
+                                                            api_details_by_provider_and_api_name),
+                    org_map, rate_card)
+        else:
+            # Combined invoice summaries of the month, produced one invoice at a time while earlier ones render
+            invoice_summaries = iter_invoice_summaries_for_month(invoices_for_month, sheet_data, rate_card,
+                                                                 organization_application,
+                                                                 api_details_by_provider_and_api_name, org_map)
+        if selected_lenders:
+            invoice_summaries = (invoice_summary for invoice_summary in invoice_summaries
+                                 if is_lender_selected(invoice_summary, selected_lenders))
+        yield invoices_for_month, invoice_summaries
+
+
+def generate_invoices_for_months(months, invoice_date, offline=False, lenders=None, workers=1,
+                                 upload_workers=DEFAULT_UPLOAD_WORKERS, incremental=False, columnar=False,
+                                 data_source=None, einvoice_format=DEFAULT_EINVOICE_FORMAT,
+                                 einvoice_dir=DEFAULT_EINVOICE_DIR, combined_pdf=False,
+                                 combined_pdf_dir=DEFAULT_COMBINED_PDF_DIR):
+    """
+    Generates the invoices of one or more months from a single read of the spreadsheet.
+
+    The sheet tabs are fetched and the billing rows indexed by month once, so a quarter or a backfill costs one
+    download and each month only visits its own rows. Within a month, every invoice goes on to rendering and upload
+    as soon as its rows are combined, see iter_invoice_summaries_for_month.
+
+    Parameters:
+    - months (list): The months to generate, formatted as 'Month-Year', e.g. ['October-2025', 'November-2025'].
+    - invoice_date (str): The invoice date printed on every invoice, formatted as 'dd-mm-yyyy'.
+    - offline (bool): If True, read the sheet data only from the local snapshots.
+    - lenders (list): Bank names or application names to generate invoices for, all lenders if None.
+    - workers (int): Number of processes rendering invoices in parallel, see generate_report.
+    - upload_workers (int): Maximum number of concurrent Drive uploads.
+    - incremental (bool): If True, only regenerate invoices whose inputs changed since the last run.
+    - columnar (bool): If True, combine each month's billing rows in bulk with the NumPy engine (see
+                       summary.columnar_combine) instead of streaming them invoice by invoice.
+    - data_source (DataSource): Where to read the sheet data from, the Google spreadsheet if None. See
+                                data.google_ds_reader.get_data_source for the local CSV, Parquet and SQLite backends.
+    - einvoice_format (str): 'ndjson', 'bulk' or 'files', how the NIC payloads are written, see generate_report.
+    - einvoice_dir (str): Directory the NIC payloads are written to.
+    - combined_pdf (bool): If True, export each month's invoices together into one combined PDF that is split into
+                           the PDFs to upload, see generate_report.
+    - combined_pdf_dir (str): Directory the combined PDFs are written to.
+
+    Returns:
+    - dict: The results of the rendered invoices of each month, keyed by month, see generate_report.
+    """
+    # Read every tab (rate card, API details, lenders, payment details, SP invoices, Teal and MP Bhulekh) in one
+    # batchGet request, reusing the local snapshots of tabs that have not changed since they were read, or from the
+    # given local data source
+    sheet_data = get_all_sheet_data(offline=offline, data_source=data_source)
+    organization_application = get_organization_application(sheet_data['organizations'])
+    payment_details = sheet_data['payment_details']
+    rendered_invoices_by_month = {}
+    for invoices_for_month, invoice_summaries in iter_month_invoice_summaries(months, sheet_data, lenders=lenders,
+                                                                             columnar=columnar):
+        with span('generate_month', month=invoices_for_month):
+            rendered_invoices_by_month[invoices_for_month] = generate_report(
+                invoices_for_month, invoice_summaries, payment_details, invoice_date, organization_application,
+                workers=workers, upload_workers=upload_workers, incremental=incremental,
+                einvoice_format=einvoice_format, einvoice_dir=einvoice_dir, combined_pdf=combined_pdf,
+                combined_pdf_dir=combined_pdf_dir, partial=bool(lenders))
+    return rendered_invoices_by_month
+
+
+def preview_invoices_for_months(months, invoice_date, offline=False, lenders=None, columnar=False, data_source=None):
+    """
+    Dry run of generate_invoices_for_months: reads the sheet data, combines the billing rows and computes the taxes
+    and amounts due of every invoice, without rendering, writing or uploading anything. See builder.invoice_preview.
+
+    Parameters:
+    - months, invoice_date, offline, lenders, columnar, data_source: See generate_invoices_for_months.
+
+    Returns:
+    - list: One row per month and lender with its totals and anomalies, see preview_month and format_preview_table.
+    """
+    sheet_data = get_all_sheet_data(offline=offline, data_source=data_source)
+    organization_application = get_organization_application(sheet_data['organizations'])
+    rows = []
+    for invoices_for_month, invoice_summaries in iter_month_invoice_summaries(months, sheet_data, lenders=lenders,
+                                                                             columnar=columnar):
+        with span('preview_month', month=invoices_for_month):
+            rows.extend(preview_month(invoices_for_month, invoice_summaries, sheet_data['payment_details'],
+                                      invoice_date, organization_application))
+    return rows
@@ -1 +1,5 @@
 from summary.report_summary import get_invoice_summary, combine_invoice_summaries_and_add_billing_summary
+from summary.report_summary import get_organization_map, iter_invoice_summaries
+
+from summary.rate_card import RateCard, RateCardError, compile_rate_card
+from summary.columnar_combine import combine_billing_rows_columnar
\ No newline at end of file
@@ -0,0 +1,238 @@
+"""
+Columnar engine for combining billing rows into invoices, for months with many line items (e.g. per-day rows).
+
+It produces the same combined records as get_invoice_summary followed by
+combine_invoice_summaries_and_add_billing_summary, but prices, groups and sums the rows as NumPy arrays. Money is
+carried as scaled integers (price units of 10^-d rupees, line totals in paise), so the bulk arithmetic is exact and
+rounds half-up exactly like data.money. A month whose amounts do not fit in 64-bit integers (e.g. a unit cost with
+many decimal places) or with a unit cost that is not a finite number is combined by the row by row path instead.
+
+NumPy is optional: it is only imported by this engine, the default row by row path does not need it.
+"""
+from decimal import Decimal
+
+from builder.amount_format import format_inr_batch
+from data.money import to_money, round_to_paise
+from summary.rate_card import RateCard, compile_rate_card
+from summary.report_summary import combine_invoice_summaries_and_add_billing_summary, iter_invoice_summaries
+
+try:
+    import numpy as np
+except ImportError:  # Only the columnar engine needs numpy
+    np = None
+
+# Price of the rows an SP API has no rate for, always at position 0 of the price table
+_NO_PRICE_ID = 0
+# Largest value of the int64 arrays the amounts are computed in
+_INT64_MAX = 2 ** 63 - 1
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("The columnar engine needs numpy, install it with 'pip install numpy'")
+
+
+class _PriceTable:
+    """Distinct unit costs, so that rows carry a small integer price ID instead of a Decimal."""
+
+    def __init__(self):
+        self.prices = [Decimal('0')]
+        self._price_ids = {}
+
+    def get_price_id(self, price):
+        # Keyed by the text as well as the value, so that every ID keeps the exact Decimal it was created from
+        key = (price, str(price))
+        price_id = self._price_ids.get(key)
+        if price_id is None:
+            price_id = self._price_ids[key] = len(self.prices)
+            self.prices.append(price)
+        return price_id
+
+
+def _price_rows(rate_card, api_hits, sp_api_names, price_table):
+    # Returns the price ID of every row: each SP API prices all of its rows at once by bisection of its slabs
+    price_ids = np.full(len(api_hits), _NO_PRICE_ID, dtype=np.int64)
+    api_codes = {}
+    api_index = np.array([api_codes.setdefault(sp_api_name, len(api_codes)) for sp_api_name in sp_api_names],
+                         dtype=np.int64)
+    for sp_api_name, api_code in api_codes.items():
+        api_rates = rate_card.get_api_rates(sp_api_name)
+        if api_rates is None:
+            continue
+        rows = np.flatnonzero(api_index == api_code)
+        hits = api_hits[rows]
+        flat_price_id = (price_table.get_price_id(api_rates.flat_price) if api_rates.flat_price is not None
+                         else _NO_PRICE_ID)
+        row_price_ids = np.full(len(rows), flat_price_id, dtype=np.int64)
+        if api_rates.slab_min_hits:
+            slab_min_hits = np.array(api_rates.slab_min_hits, dtype=np.int64)
+            slab_max_hits = np.array(api_rates.slab_max_hits, dtype=np.int64)
+            slab_price_ids = np.array([price_table.get_price_id(price) for price in api_rates.slab_prices],
+                                      dtype=np.int64)
+            # The slab with the largest lower bound not above the hits is the only one that can hold them, and a
+            # max of 0 means "more than min hits", see RateCard.get_unit_cost
+            slab_index = np.searchsorted(slab_min_hits, hits, side='right') - 1
+            clipped_index = np.maximum(slab_index, 0)
+            max_hits = slab_max_hits[clipped_index]
+            in_slab = (slab_index >= 0) & ((max_hits == 0) | (hits <= max_hits))
+            row_price_ids = np.where(in_slab, slab_price_ids[clipped_index], row_price_ids)
+        price_ids[rows] = row_price_ids
+    return price_ids
+
+
+def _to_scaled_prices(prices):
+    # Returns the prices as Python ints in units of 1/scale rupees, scale being the smallest power of ten (at least
+    # paise) that makes every price an integer, or None if a price is not a finite number
+    if not all(price.is_finite() for price in prices):
+        return None, None
+    decimal_places = max([2] + [-price.as_tuple().exponent for price in prices])
+    scaled_prices = []
+    for price in prices:
+        # From the digits, Decimal arithmetic would round prices with more digits than its context precision
+        sign, digits, exponent = price.as_tuple()
+        scaled_price = int(''.join(map(str, digits))) * 10 ** (exponent + decimal_places)
+        scaled_prices.append(-scaled_price if sign else scaled_price)
+    return scaled_prices, 10 ** decimal_places
+
+
+def _round_to_paise(scaled_amounts, scale):
+    # Half-up rounding of amounts in units of 1/scale rupees to paise, as data.money.round_to_paise
+    divisor = scale // 100
+    if divisor == 1:
+        return scaled_amounts
+    return np.sign(scaled_amounts) * ((np.abs(scaled_amounts) + divisor // 2) // divisor)
+
+
+def _combine_billing_rows(transaction_summary, custom_summary, org_map, rate_card):
+    # The row by row path, exact whatever the amounts, see combine_billing_rows_columnar
+    invoice_summaries = list(iter_invoice_summaries(transaction_summary, org_map, rate_card, is_custom=False))
+    invoice_summaries.extend(iter_invoice_summaries(custom_summary, org_map, rate_card, is_custom=True))
+    return combine_invoice_summaries_and_add_billing_summary(invoice_summaries)
+
+
+def _sum_by_group(values, group_of_rows, group_count):
+    # Integer sums (np.bincount would sum in floating point), as a list of Python ints
+    sums = np.zeros(group_count, dtype=np.int64)
+    np.add.at(sums, group_of_rows, values)
+    return sums.tolist()
+
+
+def combine_billing_rows_columnar(transaction_summary, custom_summary, org_map, rate_card_data):
+    """
+    Prices and combines the billing rows of a month into one record per invoice.
+
+    Parameters:
+    - transaction_summary (list): Transactions priced with the rate card, see get_transaction_summary.
+    - custom_summary (list): Transactions with their own unit cost, see get_teal_mp_bhulekh_transaction_summary.
+    - org_map (dict): Lenders keyed by application name, see get_organization_map.
+    - rate_card_data (RateCard or list): The compiled rate card, or the rows of the rate card sheet.
+
+    Returns:
+    - list: The combined records, equal to those of combine_invoice_summaries_and_add_billing_summary over
+            get_invoice_summary of both lists.
+
+    Raises:
+    - ImportError: If numpy is not installed.
+    """
+    _require_numpy()
+    rate_card = rate_card_data if isinstance(rate_card_data, RateCard) else compile_rate_card(rate_card_data)
+    transactions = transaction_summary + custom_summary
+    row_count = len(transactions)
+    if row_count == 0:
+        return []
+
+    # Load the rows as columns
+    total_transactions = np.array([tx.get("total_transactions_count") for tx in transactions], dtype=np.int64)
+    successful_transactions = np.array([tx.get("successful_transactions_count") for tx in transactions],
+                                       dtype=np.int64)
+    failed_transactions = np.array([tx.get("failed_transactions_count") for tx in transactions], dtype=np.int64)
+
+    # Price every row, the rate card rows in bulk and the custom rows with their own unit cost
+    price_table = _PriceTable()
+    custom_start = len(transaction_summary)
+    price_ids = np.empty(row_count, dtype=np.int64)
+    price_ids[:custom_start] = _price_rows(rate_card, successful_transactions[:custom_start],
+                                           [tx.get("provider_api_name") for tx in transaction_summary], price_table)
+    price_ids[custom_start:] = [price_table.get_price_id(to_money(tx.get("unit_cost"))) for tx in custom_summary]
+    scaled_prices, scale = _to_scaled_prices(price_table.prices)
+    # NumPy integers wrap around silently, so hits times price (plus the half unit added when rounding) must fit
+    max_transactions = int(np.abs(total_transactions).max())
+    if scaled_prices is None or max(map(abs, scaled_prices)) * max_transactions + scale > _INT64_MAX:
+        return _combine_billing_rows(transaction_summary, custom_summary, org_map, rate_card)
+    line_paise = _round_to_paise(total_transactions * np.array(scaled_prices, dtype=np.int64)[price_ids], scale)
+
+    # Custom rows flagged 'Use Amount Value' are billed their amount instead of hits times unit cost
+    uses_amount = np.zeros(row_count, dtype=bool)
+    for row, tx in enumerate(custom_summary, start=custom_start):
+        if tx.get("use_amount_value") == 'Y':
+            uses_amount[row] = True
+            amount_paise = int(round_to_paise(to_money(tx.get("amount"))).scaleb(2))
+            if abs(amount_paise) > _INT64_MAX:
+                return _combine_billing_rows(transaction_summary, custom_summary, org_map, rate_card)
+            line_paise[row] = amount_paise
+
+    # Group by (application name, invoice number, lender ID) in order of first appearance, leaving out the rows of
+    # unknown lenders
+    group_keys = {}
+    group_index = np.empty(row_count, dtype=np.int64)
+    for row, tx in enumerate(transactions):
+        organization = org_map.get(tx.get("application_name"))
+        if organization is None:
+            group_index[row] = -1
+            continue
+        key = (tx.get("application_name"), tx.get("invoice_number"), organization["id"])
+        group_index[row] = group_keys.setdefault(key, len(group_keys))
+    rows = np.flatnonzero(group_index >= 0)
+    # Rows of each invoice, in row order
+    rows = rows[np.argsort(group_index[rows], kind='stable')]
+    group_count = len(group_keys)
+    group_of_rows = group_index[rows]
+    group_starts = np.searchsorted(group_of_rows, np.arange(group_count + 1))
+
+    # Sum the counts and costs of every invoice in bulk
+    group_total_transactions = _sum_by_group(total_transactions[rows], group_of_rows, group_count)
+    group_successful_transactions = _sum_by_group(successful_transactions[rows], group_of_rows, group_count)
+    group_failed_transactions = _sum_by_group(failed_transactions[rows], group_of_rows, group_count)
+    # The totals of the invoices must fit as well
+    if int(np.abs(line_paise).max()) * row_count > _INT64_MAX:
+        return _combine_billing_rows(transaction_summary, custom_summary, org_map, rate_card)
+    group_total_paise = _sum_by_group(line_paise[rows], group_of_rows, group_count)
+
+    # Only the output records are built row by row
+    unit_cost_texts = [f"{price:.2f}" for price in price_table.prices]
+    line_paise_list = line_paise.tolist()
+    line_totals = format_inr_batch(Decimal(line_paise_list[row]).scaleb(-2) for row in rows.tolist())
+    price_id_list = price_ids.tolist()
+    total_transaction_list = total_transactions.tolist()
+    uses_amount_list = uses_amount.tolist()
+    rows = rows.tolist()
+    group_starts = group_starts.tolist()
+
+    combined_records = []
+    for group, (application_name, invoice_number, _) in enumerate(group_keys):
+        group_rows = rows[group_starts[group]:group_starts[group + 1]]
+        billing_summary = []
+        for sr_no, row in enumerate(group_rows, start=1):
+            tx = transactions[row]
+            billing_summary.append({
+                "sr_no": sr_no,
+                "service_name": tx.get("lender_api_name"),
+                "provider": tx.get("destination_info"),
+                "unit_cost": "-" if uses_amount_list[row] else unit_cost_texts[price_id_list[row]],
+                "count": total_transaction_list[row],
+                "total_cost": line_totals[group_starts[group] + sr_no - 1]
+            })
+        combined_records.append({
+            'application_name': application_name,
+            'invoice_number': invoice_number,
+            'organization': org_map.get(application_name),
+            'transaction_summary': {
+                'application_name': transactions[group_rows[0]].get("application_name"),
+                'total_transactions': group_total_transactions[group],
+                'successful_transactions': group_successful_transactions[group],
+                'failed_transactions': group_failed_transactions[group],
+                'total_cost': Decimal(group_total_paise[group]).scaleb(-2),
+                'billing_summary': billing_summary
+            }
+        })
+    return combined_records
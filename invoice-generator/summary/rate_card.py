@@ -0,0 +1,134 @@
+from bisect import bisect_right
+
+from data.money import ZERO, to_money
+
+FLAT_PLAN_TYPE = 'flat'
+SLAB_PLAN_TYPE = 'slab'
+
+
+class RateCardError(ValueError):
+    """Raised when the rate card sheet holds slabs that overlap, leave gaps or cannot be parsed."""
+
+
+class _ApiRates:
+    """Prices of one SP API: slabs sorted by their lower bound and the flat price, if any."""
+    __slots__ = ('slab_min_hits', 'slab_max_hits', 'slab_prices', 'flat_price')
+
+    def __init__(self, slabs, flat_price):
+        slabs = sorted(slabs)
+        self.slab_min_hits = [min_hits for min_hits, _, _ in slabs]
+        self.slab_max_hits = [max_hits for _, max_hits, _ in slabs]
+        self.slab_prices = [price for _, _, price in slabs]
+        self.flat_price = flat_price
+
+    def get_unit_cost(self, api_hits):
+        # The slab with the largest lower bound not above api_hits is the only one that can hold it
+        index = bisect_right(self.slab_min_hits, api_hits) - 1
+        if index >= 0:
+            max_hits = self.slab_max_hits[index]
+            # A max of 0 means "more than min hits"
+            if max_hits == 0 or api_hits <= max_hits:
+                return self.slab_prices[index]
+        if self.flat_price is not None:
+            return self.flat_price
+        return ZERO
+
+
+class RateCard:
+    """
+    Rate card compiled for pricing, see compile_rate_card.
+    """
+    __slots__ = ('_rates_by_api',)
+
+    def __init__(self, rates_by_api):
+        self._rates_by_api = rates_by_api
+
+    def get_unit_cost(self, api_hits, sp_api_name):
+        """
+        Returns the unit cost (Decimal) of an SP API for the given number of hits, 0 if the rate card has no price
+        for it.
+        """
+        api_rates = self._rates_by_api.get(sp_api_name)
+        if api_rates is None:
+            return ZERO
+        return api_rates.get_unit_cost(api_hits)
+
+    def get_api_rates(self, sp_api_name):
+        """
+        Returns the prices of an SP API, or None if the rate card has none: an object with the slab bounds and prices
+        sorted by lower bound ('slab_min_hits', 'slab_max_hits', 'slab_prices') and the 'flat_price' (or None).
+        """
+        return self._rates_by_api.get(sp_api_name)
+
+    def get_unit_costs(self, hits_and_api_names):
+        """
+        Prices many transactions at once.
+
+        Parameters:
+        - hits_and_api_names (iterable): (api_hits, sp_api_name) pairs.
+
+        Returns:
+        - list: The unit cost of every pair, in the same order.
+        """
+        rates_by_api = self._rates_by_api
+        unit_costs = []
+        for api_hits, sp_api_name in hits_and_api_names:
+            api_rates = rates_by_api.get(sp_api_name)
+            unit_costs.append(api_rates.get_unit_cost(api_hits) if api_rates is not None else ZERO)
+        return unit_costs
+
+
+def _validate_slabs(sp_api_name, slabs):
+    slabs = sorted(slabs)
+    for min_hits, max_hits, _ in slabs:
+        if max_hits != 0 and max_hits < min_hits:
+            raise RateCardError(f"Rate card slab {min_hits}-{max_hits} of '{sp_api_name}' ends before it starts")
+    for (prev_min, prev_max, _), (next_min, next_max, _) in zip(slabs, slabs[1:]):
+        if prev_max == 0 or next_min <= prev_max:
+            raise RateCardError(f"Rate card slabs {prev_min}-{prev_max or 'more'} and {next_min}-{next_max or 'more'} "
+                                f"of '{sp_api_name}' overlap")
+        if next_min > prev_max + 1:
+            raise RateCardError(f"Rate card of '{sp_api_name}' has no slab for {prev_max + 1}-{next_min - 1} hits")
+
+
+def compile_rate_card(rate_card_data):
+    """
+    Compiles the rows of the rate card sheet into a RateCard that prices a transaction by bisection.
+
+    Prices (as Decimal, see data.money) and slab bounds are parsed once here instead of on every lookup. Rows are
+    read in sheet order, the same order the linear scan used to follow: the first 'flat' row of an SP API is its
+    price for any number of hits that no earlier slab covers, and rows after it are never reached. Repeated identical
+    slabs (the same SP API listed under several lender API names) are merged.
+
+    Parameters:
+    - rate_card_data (list): RateCardEntry records as returned by get_api_rate_card_data.
+
+    Returns:
+    - RateCard: The compiled rate card.
+
+    Raises:
+    - RateCardError: If the slabs of an SP API overlap, leave a gap, or a price or bound is not a number.
+    """
+    slabs_by_api = {}
+    flat_price_by_api = {}
+    for rate_card in rate_card_data:
+        sp_api_name = rate_card.sp_api_name
+        if sp_api_name in flat_price_by_api:
+            continue
+        try:
+            if rate_card.plan_type == FLAT_PLAN_TYPE:
+                flat_price_by_api[sp_api_name] = to_money(rate_card.price)
+            elif rate_card.plan_type == SLAB_PLAN_TYPE:
+                slab = (int(rate_card.min_api_hits), int(rate_card.max_api_hits), to_money(rate_card.price))
+                slabs = slabs_by_api.setdefault(sp_api_name, [])
+                if slab not in slabs:
+                    slabs.append(slab)
+        except (ValueError, TypeError) as ex:
+            raise RateCardError(f"Invalid rate card row for '{sp_api_name}': {ex}")
+
+    rates_by_api = {}
+    for sp_api_name in slabs_by_api.keys() | flat_price_by_api.keys():
+        slabs = slabs_by_api.get(sp_api_name, [])
+        _validate_slabs(sp_api_name, slabs)
+        rates_by_api[sp_api_name] = _ApiRates(slabs, flat_price_by_api.get(sp_api_name))
+    return RateCard(rates_by_api)
@@ -2,59 +2,71 @@
 from collections import defaultdict
 
 import builder
+from data.money import ZERO, round_to_paise, to_money
+from summary.rate_card import RateCard, compile_rate_card
 
 
 def get_unit_cost(api_hits, sp_api_name, rate_card_data):
-    # Iterate through the rate_card_data
-    for rate_card in rate_card_data:
-        # Check if SP API Name matches
-        if rate_card['SP API Name'] == sp_api_name:
-            # If Plan Type is 'flat', return the price directly
-            if rate_card['Plan Type'] == 'flat':
-                return float(rate_card['Price'])
-            # If Plan Type is 'slab', check if the api_hits fall between Min and Max APIs Hits
-            elif rate_card['Plan Type'] == 'slab':
-                min_hits = int(rate_card['Min APIs Hits'])
-                max_hits = int(rate_card['Max APIs Hits'])
-                # Handle the case for slabs where max is 0, meaning "more than min hits"
-                if min_hits <= api_hits and (max_hits == 0 or api_hits <= max_hits):
-                    return float(rate_card['Price'])
-    # If no matching slab or flat rate is found
-    return 0.0
+    # Accept both the compiled rate card and the raw rows of the rate card sheet
+    if not isinstance(rate_card_data, RateCard):
+        rate_card_data = compile_rate_card(rate_card_data)
+    return rate_card_data.get_unit_cost(api_hits, sp_api_name)
 
 
-def get_invoice_summary(transaction_summary, organizations, rate_card_data, is_custom=False):
-    invoice_summaries = []
-    org_map = {
-        org['Application name']: {
-            "id": org['ID'],
-            "name": org['Bank Name'],
-            "name_description": org['Name Description'],
-            "street": org['Street'],
-            "location": org['Location'],
-            "city": org['City'],
-            "postal_code": org['Postal Code'],
-            "state": org['State'],
-            "country": org['Country'],
-            "gstin": org['GST number'],
-            "pan_number": org['PAN number'],
-            "state_code": org['State code'],
-            "address": f"{org['Street']}, {org['Location']}, {org['City']}, {org['Postal Code']}, {org['State']}, {org['Country']}"
+def get_organization_map(organizations):
+    """
+    Returns the invoice view of every lender (id, name, address, GSTIN, ...) keyed by application name.
+    """
+    return {
+        org.application_name: {
+            "id": org.id,
+            "name": org.bank_name,
+            "name_description": org.name_description,
+            "street": org.street,
+            "location": org.location,
+            "city": org.city,
+            "postal_code": org.postal_code,
+            "state": org.state,
+            "country": org.country,
+            "gstin": org.gst_number,
+            "pan_number": org.pan_number,
+            "state_code": org.state_code,
+            "address": f"{org.street}, {org.location}, {org.city}, {org.postal_code}, {org.state}, {org.country}"
         }
         for org in organizations
     }
 
-    for tx in transaction_summary:
+
+def get_invoice_summary(transaction_summary, organizations, rate_card_data, is_custom=False):
+    return list(iter_invoice_summaries(transaction_summary, get_organization_map(organizations), rate_card_data,
+                                       is_custom))
+
+
+def iter_invoice_summaries(transaction_summary, org_map, rate_card_data, is_custom=False):
+    """
+    Prices transactions and yields their invoice summaries one at a time, see get_invoice_summary.
+
+    Parameters:
+    - transaction_summary (list): Transactions, see pipeline.invoice_pipeline.get_transaction_summary.
+    - org_map (dict): Lenders keyed by application name, see get_organization_map.
+    - rate_card_data (RateCard or list): The compiled rate card, or the rows of the rate card sheet.
+    - is_custom (bool): True for transactions that carry their own unit cost (Teal and MP Bhulekh).
+    """
+    if is_custom:
+        unit_costs = [tx.get("unit_cost") for tx in transaction_summary]
+    else:
+        # Compile the rate card once (a no-op when the caller passes a compiled one) and price every transaction
+        # in one batch
+        rate_card = rate_card_data if isinstance(rate_card_data, RateCard) else compile_rate_card(rate_card_data)
+        unit_costs = rate_card.get_unit_costs(
+            (tx.get("successful_transactions_count"), tx.get("provider_api_name")) for tx in transaction_summary)
+
+    for tx, unit_cost in zip(transaction_summary, unit_costs):
         invoice_summary = {}
         invoice_summary["application_name"] = tx.get("application_name")
         org_summary = org_map.get(tx.get('application_name'))
         invoice_summary["invoice_number"] = tx.get('invoice_number')
         invoice_summary["organization"] = org_summary
-        if is_custom:
-            unit_cost = tx.get("unit_cost")
-        else:
-            unit_cost = get_unit_cost(tx.get("successful_transactions_count"), tx.get("provider_api_name"),
-                                      rate_card_data)
 
         # Creating a summary of the transaction and appending it to the user's transactions.
         invoice_summary["transaction_summary"] = {
@@ -71,8 +83,7 @@ def get_invoice_summary(transaction_summary, organizations, rate_card_data, is_c
             "amount": tx.get("amount"),
             "use_amount_value": tx.get("use_amount_value")
         }
-        invoice_summaries.append(invoice_summary)
-    return invoice_summaries
+        yield invoice_summary
 
 
 def combine_invoice_summaries_and_add_billing_summary(data):
@@ -86,13 +97,12 @@ def combine_invoice_summaries_and_add_billing_summary(data):
             'total_transactions': 0,
             'successful_transactions': 0,
             'failed_transactions': 0,
-            'total_cost': 0.0,  # Initialize total cost
+            'total_cost': ZERO,  # Initialize total cost
             'billing_summary': []
         }
     })
 
     for entry in data:
-        print(entry)
         if entry['organization'] is not None:
             key = (entry['application_name'], entry['invoice_number'], entry['organization']['id'])
             transaction_summary = entry['transaction_summary']
@@ -110,14 +120,15 @@ def combine_invoice_summaries_and_add_billing_summary(data):
                 'successful_transactions']
             combined_records[key]['transaction_summary']['failed_transactions'] += transaction_summary[
                 'failed_transactions']
-            total_cost = 0
             use_unit_cost = True
             if transaction_summary.get('use_amount_value') == 'Y':
-                total_cost = transaction_summary.get('amount')
+                total_cost = round_to_paise(to_money(transaction_summary.get('amount')))
                 use_unit_cost = False
             else:
-                # Add to billing_summary and calculate the total cost for this specific entry
-                total_cost = str(transaction_summary['total_transactions'] * transaction_summary['unit_cost'])
+                # Add to billing_summary and calculate the total cost for this specific entry, rounded to the paisa
+                # as printed so that the billing lines add up to the invoice total
+                total_cost = round_to_paise(
+                    transaction_summary['total_transactions'] * transaction_summary['unit_cost'])
             billing_entry = {
                 "sr_no": len(combined_records[key]['transaction_summary']['billing_summary']) + 1,
                 "service_name": transaction_summary['lender_api_name'],
@@ -130,12 +141,8 @@ def combine_invoice_summaries_and_add_billing_summary(data):
             # Add billing entry to billing_summary
             combined_records[key]['transaction_summary']['billing_summary'].append(billing_entry)
 
-            if use_unit_cost:
-                # Calculate total cost by summing up individual billing total costs
-                combined_records[key]['transaction_summary']['total_cost'] += (
-                        transaction_summary['total_transactions'] * transaction_summary['unit_cost'])
-            else:
-                combined_records[key]['transaction_summary']['total_cost'] += float(total_cost)
+            # Calculate total cost by summing up individual billing total costs
+            combined_records[key]['transaction_summary']['total_cost'] += total_cost
 
     # Convert the combined records dictionary to a list
     final_result = list(combined_records.values())
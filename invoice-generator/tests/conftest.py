@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The modules are imported the way the scripts import them, from the invoice-generator directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
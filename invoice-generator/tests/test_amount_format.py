@@ -0,0 +1,84 @@
+"""
+Golden tests of builder.amount_format: every amount must be formatted and spelled out exactly as babel and num2words
+did before the fast paths, see format_to_inr and get_amount_in_words of the first report builder.
+"""
+from decimal import Decimal
+
+import pytest
+from babel.numbers import format_currency
+from num2words import num2words
+
+from builder.amount_format import amount_to_words, format_inr, format_inr_batch
+
+AMOUNTS = [
+    # ints
+    0, 1, 7, 99, 999, 1000, 12345, 99999, 100000, 999999, 1000000, 9999999, 10000000, 123456789, 10000000000,
+    -1, -1000, -100000, -10000000,
+    # floats, with rounding half-even to paise and float artifacts
+    0.0, -0.0, 0.1, 0.5, 0.005, 0.015, 0.125, 1.005, 2.675, 1234.5, 99999.995, 99999.994, 0.30000000000000004,
+    123456.789, 1e16, -0.004, -2.675, -1234567.891,
+    # Decimals
+    Decimal('0'), Decimal('-0'), Decimal('0.00'), Decimal('-0.00'), Decimal('1.5'), Decimal('1.50'),
+    Decimal('1.005'), Decimal('1.015'), Decimal('99999.995'), Decimal('100000.00'), Decimal('9999999.999'),
+    Decimal('10000000.00'), Decimal('1E+7'), Decimal('1.23E+5'), Decimal('-1234567.895'), Decimal('12.345678901234'),
+    # strings
+    '0', '-0', '0.00', '1234', '1234.5', '100000', '-99999.995', '10000000.01', '1E+3',
+]
+
+WORD_AMOUNTS = [
+    0, 1, 21, 100, 101, 999, 1000, 1001, 99999, 100000, 100001, 999999, 1000000, 9999999, 10000000, 123456789,
+    0.5, 1.25, 2.675, 1234.5, 100000.01, 10000000.99,
+    Decimal('0'), Decimal('1.5'), Decimal('1.50'), Decimal('1.05'), Decimal('4132.00'), Decimal('100000.00'),
+    Decimal('10000000.10'), Decimal('5964'),
+]
+
+
+def _babel_format_inr(value):
+    return format_currency(value, 'INR', locale='en_IN').replace('₹', '')
+
+
+def _num2words_amount(amount):
+    amount_in_words = num2words(amount, to='currency', lang='en_IN')
+    amount_in_words = amount_in_words.replace("euro", "rupees").replace("cents", "paise")
+    amount_in_words = amount_in_words.replace(" zero paise", "").replace(',', '')
+    return amount_in_words.capitalize()
+
+
+@pytest.mark.parametrize('value', AMOUNTS, ids=repr)
+def test_format_inr_matches_babel(value):
+    assert format_inr(value) == _babel_format_inr(value)
+
+
+@pytest.mark.parametrize('value', AMOUNTS, ids=repr)
+def test_format_inr_matches_babel_when_cached(value):
+    format_inr(value)
+    assert format_inr(value) == _babel_format_inr(value)
+
+
+def test_format_inr_signed_zero():
+    assert format_inr(0.0) == '0.00'
+    assert format_inr(-0.0) == '-0.00'
+    assert format_inr(Decimal('-0')) == _babel_format_inr(Decimal('-0'))
+
+
+def test_format_inr_lakh_and_crore_grouping():
+    assert format_inr(99999) == '99,999.00'
+    assert format_inr(100000) == '1,00,000.00'
+    assert format_inr(9999999.99) == '99,99,999.99'
+    assert format_inr(10000000) == '1,00,00,000.00'
+    assert format_inr(Decimal('-123456789.125')) == '-12,34,56,789.12'
+
+
+def test_format_inr_batch_matches_babel():
+    assert format_inr_batch(AMOUNTS) == [_babel_format_inr(value) for value in AMOUNTS]
+
+
+@pytest.mark.parametrize('amount', WORD_AMOUNTS, ids=repr)
+def test_amount_to_words_matches_num2words(amount):
+    assert amount_to_words(amount) == _num2words_amount(amount)
+
+
+def test_amount_to_words_caches_equal_amounts_apart():
+    # Equal amounts of another type or exponent may be spelled out differently by num2words
+    for amount in (1, 1.0, Decimal('1'), Decimal('1.00'), 1.5, Decimal('1.5'), Decimal('1.50')):
+        assert amount_to_words(amount) == _num2words_amount(amount)
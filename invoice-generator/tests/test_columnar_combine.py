@@ -0,0 +1,93 @@
+"""
+The columnar engine must give the same combined records as the row by row path, including amounts that do not fit
+in its int64 arithmetic.
+"""
+from decimal import Decimal
+
+import pytest
+
+from data.records import RateCardEntry
+from summary.columnar_combine import combine_billing_rows_columnar
+from summary.rate_card import compile_rate_card
+from summary.report_summary import combine_invoice_summaries_and_add_billing_summary, iter_invoice_summaries
+
+pytest.importorskip('numpy')
+
+ORG_MAP = {
+    'BANKA': {'id': '1', 'name': 'Bank A', 'state': 'Maharashtra'},
+    'BANKB': {'id': '2', 'name': 'Bank B', 'state': 'Karnataka'},
+}
+
+RATE_CARD = compile_rate_card([
+    RateCardEntry('PROTEAN', 'PAN', 'PAN_VERIFY', 'slab', '1', '1000', '1.50'),
+    RateCardEntry('PROTEAN', 'PAN', 'PAN_VERIFY', 'slab', '1001', '0', '1.25'),
+    RateCardEntry('SATSURE', 'LAND', 'LAND_RECORDS', 'flat', '0', '0', '2.3456'),
+])
+
+
+def _transaction(application_name, invoice_number, provider_api_name, hits, failed_hits=0):
+    return {"application_name": application_name, "provider_api_name": provider_api_name,
+            "lender_api_name": provider_api_name, "destination_info": "PROTEAN",
+            "total_transactions_count": hits + failed_hits, "successful_transactions_count": hits,
+            "failed_transactions_count": failed_hits, "invoice_number": invoice_number}
+
+
+def _custom_transaction(application_name, invoice_number, unit_cost, hits, amount='0', use_amount_value='N'):
+    return {"application_name": application_name, "provider_api_name": None, "lender_api_name": "Land records",
+            "destination_info": "TEAL", "total_transactions_count": hits, "successful_transactions_count": hits,
+            "failed_transactions_count": 0, "unit_cost": Decimal(unit_cost), "invoice_number": invoice_number,
+            "amount": amount, "use_amount_value": use_amount_value}
+
+
+def _combine_rows(transaction_summary, custom_summary):
+    invoice_summaries = list(iter_invoice_summaries(transaction_summary, ORG_MAP, RATE_CARD, is_custom=False))
+    invoice_summaries.extend(iter_invoice_summaries(custom_summary, ORG_MAP, RATE_CARD, is_custom=True))
+    return combine_invoice_summaries_and_add_billing_summary(invoice_summaries)
+
+
+def _assert_same_as_rows(transaction_summary, custom_summary):
+    combined_records = combine_billing_rows_columnar(transaction_summary, custom_summary, ORG_MAP, RATE_CARD)
+    assert combined_records == _combine_rows(transaction_summary, custom_summary)
+    return combined_records
+
+
+def test_same_records_as_row_path():
+    transaction_summary = [
+        _transaction('BANKA', 'INV-1', 'PAN_VERIFY', 999, failed_hits=3),
+        _transaction('BANKA', 'INV-1', 'PAN_VERIFY', 1001),
+        _transaction('BANKB', 'INV-2', 'LAND_RECORDS', 7),
+        _transaction('BANKB', 'INV-2', 'UNKNOWN_API', 12),
+        _transaction('UNKNOWN', 'INV-3', 'PAN_VERIFY', 5),
+    ]
+    custom_summary = [
+        _custom_transaction('BANKA', 'INV-1', '0.125', 3),
+        _custom_transaction('BANKB', 'INV-4', '10', 1, amount='1234.565', use_amount_value='Y'),
+    ]
+    combined_records = _assert_same_as_rows(transaction_summary, custom_summary)
+    assert [record['invoice_number'] for record in combined_records] == ['INV-1', 'INV-2', 'INV-4']
+
+
+@pytest.mark.parametrize('unit_cost, hits, total_cost', [
+    # A float artifact read from the sheet makes the price scale 10^17
+    ('0.30000000000000004', 1000, Decimal('300.00')),
+    ('0.1234567890123456', 5000000, Decimal('617283.95')),
+    ('123456789012.3456789', 100000000, Decimal('12345678901234567890.00')),
+])
+def test_amounts_beyond_int64_match_row_path(unit_cost, hits, total_cost):
+    custom_summary = [_custom_transaction('BANKA', 'INV-1', unit_cost, hits),
+                      _custom_transaction('BANKA', 'INV-1', '2.50', 4)]
+    combined_records = _assert_same_as_rows([_transaction('BANKB', 'INV-2', 'PAN_VERIFY', 10)], custom_summary)
+    assert combined_records[1]['transaction_summary']['total_cost'] == total_cost + Decimal('10.00')
+
+
+def test_amount_value_beyond_int64_matches_row_path():
+    custom_summary = [_custom_transaction('BANKA', 'INV-1', '1', 1, amount='123456789012345678.90',
+                                          use_amount_value='Y')]
+    _assert_same_as_rows([], custom_summary)
+
+
+def test_invoice_total_beyond_int64_matches_row_path():
+    # Every line fits, their sum does not
+    custom_summary = [_custom_transaction('BANKA', 'INV-1', '1', 1, amount='50000000000000000.00',
+                                          use_amount_value='Y') for _ in range(3)]
+    _assert_same_as_rows([], custom_summary)
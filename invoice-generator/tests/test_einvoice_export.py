@@ -0,0 +1,68 @@
+"""
+A run that writes only some invoices of a month (incremental, or a few lenders) must keep the others in the batch, a
+run of the whole month must replace it.
+"""
+import json
+import os
+
+import pytest
+
+from builder.einvoice_export import BULK_FORMAT, NDJSON_FORMAT, EInvoiceWriter
+
+
+def _payload(invoice_number, total):
+    return {"DocDtls": {"Typ": "INV", "No": invoice_number}, "ValDtls": {"TotInvVal": total}}
+
+
+def _write_batch(output_dir, export_format, payloads, keep_previous=False):
+    with EInvoiceWriter(str(output_dir), export_format, 'EINVOICES_20251001_20251031',
+                        keep_previous=keep_previous) as einvoice_writer:
+        for payload in payloads:
+            einvoice_writer.write(payload["DocDtls"]["No"], payload)
+    return einvoice_writer.batch_path
+
+
+def _read_batch(batch_path, export_format):
+    with open(batch_path, encoding='utf-8') as f:
+        if export_format == NDJSON_FORMAT:
+            return [json.loads(line) for line in f]
+        return json.load(f)
+
+
+@pytest.mark.parametrize('export_format', [NDJSON_FORMAT, BULK_FORMAT])
+def test_partial_run_keeps_other_invoices(tmp_path, export_format):
+    _write_batch(tmp_path, export_format, [_payload(f"INV-{number}", 100 * number) for number in range(1, 6)])
+    batch_path = _write_batch(tmp_path, export_format, [_payload("INV-3", 350), _payload("INV-6", 600)],
+                              keep_previous=True)
+    payloads = _read_batch(batch_path, export_format)
+    assert [payload["DocDtls"]["No"] for payload in payloads] == ["INV-1", "INV-2", "INV-4", "INV-5", "INV-3",
+                                                                   "INV-6"]
+    assert payloads[4]["ValDtls"]["TotInvVal"] == 350
+
+
+@pytest.mark.parametrize('export_format', [NDJSON_FORMAT, BULK_FORMAT])
+def test_full_run_drops_deleted_invoices(tmp_path, export_format):
+    _write_batch(tmp_path, export_format, [_payload(f"INV-{number}", 100 * number) for number in range(1, 4)])
+    # INV-2 was deleted from the sheet and INV-3 renumbered to INV-4
+    batch_path = _write_batch(tmp_path, export_format, [_payload("INV-1", 100), _payload("INV-4", 300)])
+    assert [payload["DocDtls"]["No"] for payload in _read_batch(batch_path, export_format)] == ["INV-1", "INV-4"]
+
+
+@pytest.mark.parametrize('export_format', [NDJSON_FORMAT, BULK_FORMAT])
+def test_full_run_without_invoices_removes_batch(tmp_path, export_format):
+    batch_path = _write_batch(tmp_path, export_format, [_payload("INV-1", 100)])
+    _write_batch(tmp_path, export_format, [], keep_previous=True)
+    assert os.path.exists(batch_path)
+    _write_batch(tmp_path, export_format, [])
+    assert not os.path.exists(batch_path)
+
+
+@pytest.mark.parametrize('export_format', [NDJSON_FORMAT, BULK_FORMAT])
+def test_failed_run_keeps_previous_batch(tmp_path, export_format):
+    batch_path = _write_batch(tmp_path, export_format, [_payload("INV-1", 100)])
+    with pytest.raises(RuntimeError):
+        with EInvoiceWriter(str(tmp_path), export_format, 'EINVOICES_20251001_20251031') as einvoice_writer:
+            einvoice_writer.write("INV-1", _payload("INV-1", 200))
+            raise RuntimeError("render failed")
+    assert _read_batch(batch_path, export_format) == [_payload("INV-1", 100)]
+    assert sorted(path.name for path in tmp_path.iterdir()) == [os.path.basename(batch_path)]
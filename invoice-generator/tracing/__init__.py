@@ -0,0 +1,2 @@
+from tracing.tracer import Tracer, enable_tracing, disable_tracing, get_tracer
+from tracing.tracer import span, increment, export_trace
\ No newline at end of file
@@ -0,0 +1,170 @@
+import json
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+
+# Shared no-op context returned by span() while tracing is off, so instrumented code costs one function call
+_NO_SPAN = nullcontext()
+
+
+class Tracer:
+    """
+    Records timing spans, counters and per-lender stage durations of a run.
+
+    Spans nest per thread: a span opened inside another one is recorded under its path, e.g.
+    'generate_month;render'. Spans and counters may be recorded from several threads at once.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._start = time.perf_counter()
+        self.spans = []
+        self.counters = defaultdict(int)
+        self.lender_durations = defaultdict(lambda: defaultdict(float))
+
+    def _get_stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextmanager
+    def span(self, name, lender=None, **attributes):
+        stack = self._get_stack()
+        stack.append(name)
+        path = ';'.join(stack)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            stack.pop()
+            span = {'name': name, 'path': path, 'thread': threading.current_thread().name,
+                    'start': start - self._start, 'duration': duration}
+            if lender is not None:
+                span['lender'] = lender
+            if attributes:
+                span['attributes'] = attributes
+            with self._lock:
+                self.spans.append(span)
+                if lender is not None:
+                    self.lender_durations[lender][name] += duration
+
+    def increment(self, counter, amount=1):
+        with self._lock:
+            self.counters[counter] += amount
+
+    def get_trace(self):
+        """
+        Returns the recorded trace: 'spans' (name, path, thread, start and duration in seconds, lender, attributes),
+        'stages' (count and total seconds per span name), 'counters' and 'lenders' (seconds per stage per lender).
+        """
+        with self._lock:
+            spans = list(self.spans)
+            counters = dict(self.counters)
+            lenders = {lender: dict(durations) for lender, durations in self.lender_durations.items()}
+        stages = {}
+        for span in spans:
+            stage = stages.setdefault(span['name'], {'count': 0, 'seconds': 0.0})
+            stage['count'] += 1
+            stage['seconds'] += span['duration']
+        return {'spans': spans, 'stages': stages, 'counters': counters, 'lenders': lenders}
+
+    def get_folded_stacks(self):
+        """
+        Returns the spans in the folded stack format of flame graph tools (flamegraph.pl, speedscope): one
+        'outer;inner <microseconds>' line per stack, with the self time of each stack.
+        """
+        with self._lock:
+            spans = list(self.spans)
+        # Self time: the time of a stack minus the time of the stacks directly under it
+        self_times = defaultdict(float)
+        for span in spans:
+            self_times[span['path']] += span['duration']
+            parent_path, _, _ = span['path'].rpartition(';')
+            if parent_path:
+                self_times[parent_path] -= span['duration']
+        return '\n'.join(f"{path} {max(0, round(seconds * 1_000_000))}" for path, seconds in self_times.items())
+
+
+_tracer = None
+
+
+def enable_tracing():
+    """
+    Starts recording spans and counters for the rest of the process, with a new empty trace.
+
+    Returns:
+    - Tracer: The active tracer.
+    """
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+
+def disable_tracing():
+    """
+    Stops recording and returns the tracer that was active, or None.
+    """
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+def get_tracer():
+    """
+    Returns the active tracer, or None when tracing is off (the default).
+    """
+    return _tracer
+
+
+def span(name, lender=None, **attributes):
+    """
+    Times the enclosed block as a span, or does nothing when tracing is off.
+
+    Usage:
+        with span('render', lender=application_name):
+            ...
+
+    Parameters:
+    - name (str): The stage name.
+    - lender (str): The lender the work is done for; the duration is added to its per-stage durations.
+    - attributes: Extra values recorded with the span.
+    """
+    if _tracer is None:
+        return _NO_SPAN
+    return _tracer.span(name, lender, **attributes)
+
+
+def increment(counter, amount=1):
+    """
+    Adds amount to a counter (rows read, invoices rendered, bytes uploaded, ...), or does nothing when tracing is off.
+    """
+    if _tracer is not None:
+        _tracer.increment(counter, amount)
+
+
+def export_trace(path, trace_format='json'):
+    """
+    Writes the trace of the active tracer to a file.
+
+    Parameters:
+    - path (str): The output file.
+    - trace_format (str): 'json' for the full trace (see Tracer.get_trace), 'flame' for folded stacks (see
+                          Tracer.get_folded_stacks).
+
+    Raises:
+    - ValueError: If tracing is off or the format is unknown.
+    """
+    if _tracer is None:
+        raise ValueError("Tracing is not enabled, call enable_tracing first")
+    if trace_format == 'json':
+        content = json.dumps(_tracer.get_trace(), indent=2, default=str)
+    elif trace_format == 'flame':
+        content = _tracer.get_folded_stacks()
+    else:
+        raise ValueError(f"Unknown trace format '{trace_format}', expected 'json' or 'flame'")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)